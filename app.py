@@ -1,7 +1,7 @@
 """
 SmartML Dashboard - Main Flask Application
 """
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, send_file
 from flask_cors import CORS
 import pandas as pd
 import numpy as np
@@ -9,28 +9,239 @@ import os
 import json
 from config import Config
 from utils.helpers import (allowed_file, save_uploaded_file, get_dataset_info, 
-                          get_summary_statistics, detect_problem_type, get_feature_target_split)
+                          get_summary_statistics, detect_problem_type, select_feature_columns,
+                          dataset_id_from_hash, derive_dataset_id)
+from utils.ingest import read_csv_optimized
+from utils.column_index import ColumnIndex
+from utils.row_hash import compute_row_hashes
+from utils.dataset_store import DatasetStore
+from utils.cache import MemoryBudgetCache
+from utils.plot_store import PlotStore
+from utils.chunked_upload import ChunkedUpload, UploadConflict
+from utils.jobs import JobManager, JobQueueFull, FINISHED_STATES
 from ml_modules.preprocessing import DataPreprocessor
+from ml_modules.pipeline import FeaturePipeline
 from ml_modules.visualization import DataVisualizer
-from ml_modules.regression import RegressionModel
-from ml_modules.classification import ClassificationModel
-from ml_modules.clustering import ClusteringModel
-from ml_modules.dimensionality import DimensionalityReduction
+from utils.model_registry import ModelRegistry
+from ml_modules import training
+from ml_modules.training import train, is_supported, init_job_worker
 
 app = Flask(__name__)
 app.config.from_object(Config)
 Config.init_app(app)
 CORS(app)
 
-# Store data in session (in production, use Redis or database)
-datasets = {}
-trained_models = {}  # Store trained models for predictions
+# Datasets live on disk as memory-mapped Arrow files shared by all workers,
+# with the most recently used ones kept in memory up to a byte budget
+dataset_store = DatasetStore(Config.DATASET_FOLDER)
+datasets = MemoryBudgetCache(
+    Config.DATASET_CACHE_MAX_BYTES,
+    loader=lambda dataset_id: dataset_store.load(dataset_id) if dataset_store.exists(dataset_id) else None
+)
+# Trained models for predictions, by stable key (on disk, the recently used ones also in memory)
+trained_models = ModelRegistry(Config.MODEL_CACHE_FOLDER, Config.MODEL_CACHE_MAX_BYTES)
+training.model_registry = trained_models
+# Fitted feature pipelines, one per dataset version and column selection (also kept on disk)
+pipelines = MemoryBudgetCache(Config.PIPELINE_CACHE_MAX_BYTES, spill_folder=Config.PIPELINE_FOLDER)
+# Encoded feature matrices with their train/test split, reused across training runs
+feature_matrices = MemoryBudgetCache(Config.FEATURE_CACHE_MAX_BYTES)
+# Rendered dataset plots, keyed by dataset version, plot type and parameters (also kept on disk)
+plot_cache = MemoryBudgetCache(Config.PLOT_CACHE_MAX_BYTES, spill_folder=Config.PLOT_CACHE_FOLDER)
+# Plot images are stored once and returned as /plots/<key> URLs instead of inline base64
+plot_store = PlotStore()
+DataVisualizer.plot_store = plot_store
+DataVisualizer.render_workers = Config.RENDER_WORKERS
+# Model plots (e.g. tree images) are keyed by model fingerprint in the same render cache
+DataVisualizer.render_cache = plot_cache
+# Training runs submitted with "async": true, each in its own process
+jobs = JobManager(initializer=init_job_worker, initargs=(plot_store.folder, trained_models.folder))
+
+def encoding_options():
+    """Settings that change how features are encoded, part of every pipeline and matrix key"""
+    return {
+        'max_categories': Config.ONEHOT_MAX_CATEGORIES,
+        'high_cardinality': Config.HIGH_CARDINALITY_ENCODING,
+        'hash_buckets': Config.FEATURE_HASH_BUCKETS,
+        'sparse_min_features': Config.SPARSE_MIN_FEATURES
+    }
+
+def get_pipeline(session_id, df, columns, scale=False):
+    """Return the fitted feature pipeline for these columns of a dataset version, fitting it once"""
+    key = derive_dataset_id(session_id, 'pipeline', {
+        'columns': list(columns), 'scale': scale, 'encoding': encoding_options()
+    })
+    pipeline = pipelines.get(key)
+    if pipeline is None:
+        pipeline = FeaturePipeline(scale=scale).fit(df, columns)
+        pipelines.put(key, pipeline, persist=True)
+    return pipeline
+
+def get_feature_matrix(session_id, target_column, feature_columns, task):
+    """
+    Return the encoded features, target and train/test split for a training request
+    
+    Cached by dataset version, target, feature list and encoding options, so
+    runs that only change hyperparameters go straight to fitting.
+    
+    Returns:
+        dict with 'X', 'y', 'pipeline' and 'split' (train and test row positions)
+    """
+    key = derive_dataset_id(session_id, 'features', {
+        'target': target_column,
+        'features': list(feature_columns),
+        'task': task,
+        'test_size': Config.TEST_SIZE,
+        'random_state': Config.RANDOM_STATE,
+        'encoding': encoding_options()
+    })
+    entry = feature_matrices.get(key)
+    if entry is None:
+        from sklearn.model_selection import train_test_split
+        df = datasets.get(session_id)
+        pipeline = get_pipeline(session_id, df, feature_columns)
+        y = df[target_column].reset_index(drop=True)
+        # Splitting row positions gives the same split as splitting X and y directly
+        train_idx, test_idx = train_test_split(
+            np.arange(len(y)), test_size=Config.TEST_SIZE, random_state=Config.RANDOM_STATE,
+            stratify=y if task == 'classification' else None
+        )
+        entry = feature_matrices.put(key, {
+            'X': pipeline.transform(df.reset_index(drop=True)),
+            'y': y,
+            'pipeline': pipeline,
+            'split': (train_idx, test_idx)
+        })
+    return entry
+
+def run_training(task, algorithm, data, job_X=None, **inputs):
+    """
+    Train a model and respond with its results, or with "async": true in the
+    request, queue the training as a background job and respond with its ID
+    
+    job_X: what a job process gets instead of X (e.g. a dataset ID and columns
+           to load from the dataset store rather than a frame sent over a pipe)
+    """
+    inputs.update(test_size=Config.TEST_SIZE, random_state=Config.RANDOM_STATE)
+    if task in ('regression', 'classification'):
+        # Same dataset version, features and parameters: same key, so retraining replaces the model
+        inputs['model_key'] = derive_dataset_id(data.get('session_id'), 'model', {
+            'task': task,
+            'algorithm': algorithm,
+            'params': {k: v for k, v in data.items() if k not in ('session_id', 'async', 'time_limit')},
+            'features': inputs['pipeline'].input_columns_,
+            'test_size': Config.TEST_SIZE,
+            'random_state': Config.RANDOM_STATE,
+            'encoding': encoding_options()
+        })
+    if not data.get('async'):
+        return jsonify({
+            'success': True,
+            'results': train(task, algorithm, data, **inputs)
+        })
+    
+    if job_X is not None:
+        inputs['X'] = job_X
+    time_limit = data.get('time_limit')
+    try:
+        job_id = jobs.submit(train, args=(task, algorithm, data), kwargs=inputs,
+                             info={'task': task, 'algorithm': algorithm, 'session_id': data.get('session_id')},
+                             time_limit=float(time_limit) if time_limit else None)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    return jsonify({'success': True, 'job_id': job_id, 'status': 'queued', 'status_url': f'/jobs/{job_id}'}), 202
 
 @app.route('/')
 def index():
     """Homepage"""
     return render_template('index.html')
 
+def cached_upload_response(session_id, filename):
+    """Return the stored upload profile of a dataset, or None if it was never profiled"""
+    if not dataset_store.exists(session_id):
+        return None
+    cached = dataset_store.load_meta(session_id)
+    if 'info' not in cached:
+        return None
+    return {
+        'success': True,
+        'session_id': session_id,
+        'filename': filename,
+        'info': cached['info'],
+        'stats': cached['stats'],
+        'validation': cached['validation'],
+        'preview': cached['preview'],
+        'cached': True
+    }
+
+def load_column_index(session_id):
+    """Read a dataset's column index from the store, building it if it is missing"""
+    if not dataset_store.exists(session_id):
+        return None
+    meta = dataset_store.load_meta(session_id)
+    if 'column_index' in meta:
+        return ColumnIndex.from_dict(meta['column_index'])
+    column_index = ColumnIndex.build(datasets.get(session_id))
+    meta['column_index'] = column_index.to_dict()
+    dataset_store.save_meta(session_id, meta)
+    return column_index
+
+# Column statistics are read by most requests, so keep recently used ones in memory
+column_indexes = MemoryBudgetCache(Config.COLUMN_INDEX_CACHE_MAX_BYTES, loader=load_column_index)
+
+def get_row_hashes(session_id, df):
+    """Stored row hashes of a dataset, computed and saved if it has none yet"""
+    row_hashes = dataset_store.load_row_hashes(session_id)
+    if row_hashes is None or len(row_hashes) != len(df):
+        row_hashes = compute_row_hashes(df)
+        dataset_store.save_row_hashes(session_id, row_hashes)
+    return row_hashes
+
+def register_dataset(session_id, filename, content_hash, df, ingest_stats):
+    """Profile a freshly ingested dataset, store it and build the upload response"""
+    # Hash every row once at ingest; duplicate counts and dedup reuse the hashes
+    row_hashes = compute_row_hashes(df)
+    
+    # Build the column index once and derive info, stats and validation from it
+    column_index = ColumnIndex.build(df, ingest_stats=ingest_stats, row_hashes=row_hashes)
+    info = get_dataset_info(df, column_index=column_index)
+    stats = get_summary_statistics(df, column_index=column_index)
+    
+    # Validate data
+    preprocessor = DataPreprocessor(df, lazy=True)
+    validation = preprocessor.validate_data(column_index=column_index)
+    
+    response = {
+        'info': info,
+        'stats': stats,
+        'validation': validation,
+        'preview': df.head(10).to_dict('records')
+    }
+    
+    # Store dataset with its column index so re-uploads and later requests skip rescanning
+    dataset_store.save(session_id, df, meta={
+        'filename': filename,
+        'content_hash': content_hash,
+        'column_index': column_index.to_dict(),
+        **response
+    })
+    dataset_store.save_row_hashes(session_id, row_hashes)
+    datasets.put(session_id, df)
+    column_indexes.put(session_id, column_index)
+    dataset_store.add_version(session_id, {
+        'session_id': session_id,
+        'parent': None,
+        'operation': 'upload',
+        'params': {'filename': filename},
+        'shape': info['shape']
+    })
+    
+    return {
+        'success': True,
+        'session_id': session_id,
+        'filename': filename,
+        **response
+    }
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload"""
@@ -46,39 +257,113 @@ def upload_file():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type. Only CSV files allowed'}), 400
         
-        # Save file
-        filepath = save_uploaded_file(file)
+        # Save file (hashing its bytes on the way to disk)
+        filepath, content_hash = save_uploaded_file(file)
         if not filepath:
             return jsonify({'error': 'Error saving file'}), 500
         
-        # Load dataset
-        df = pd.read_csv(filepath)
+        # Dataset ID is derived from the file content, so identical uploads share it
+        session_id = dataset_id_from_hash(content_hash)
+        
+        # Identical bytes were already ingested: return the cached profile
+        cached = cached_upload_response(session_id, file.filename)
+        if cached:
+            os.remove(filepath)
+            return jsonify(cached)
         
-        # Store dataset with session ID
-        session_id = str(hash(file.filename))
-        datasets[session_id] = df
+        # Load dataset in chunks with compact dtypes
+        try:
+            df, ingest_stats = read_csv_optimized(filepath)
+        finally:
+            os.remove(filepath)
         
-        # Get dataset info
-        info = get_dataset_info(df)
-        stats = get_summary_statistics(df)
+        return jsonify(register_dataset(session_id, file.filename, content_hash, df, ingest_stats))
         
-        # Validate data
-        preprocessor = DataPreprocessor(df)
-        validation = preprocessor.validate_data()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/chunked/init', methods=['POST'])
+def init_chunked_upload():
+    """Start a resumable upload for files larger than MAX_CONTENT_LENGTH"""
+    try:
+        data = request.json or {}
+        filename = data.get('filename', '')
+        
+        if not allowed_file(filename):
+            return jsonify({'error': 'Invalid file type. Only CSV files allowed'}), 400
+        
+        upload = ChunkedUpload.create(filename)
         
         return jsonify({
             'success': True,
-            'session_id': session_id,
-            'filename': file.filename,
-            'info': info,
-            'stats': stats,
-            'validation': validation,
-            'preview': df.head(10).to_dict('records')
+            'upload_id': upload.upload_id,
+            'chunk_size': Config.UPLOAD_CHUNK_SIZE
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/upload/chunked/<upload_id>', methods=['GET'])
+def chunked_upload_status(upload_id):
+    """Report how much of a chunked upload has arrived, so clients can resume"""
+    try:
+        upload = ChunkedUpload(upload_id)
+        if not upload.exists():
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        return jsonify({'success': True, **upload.status()})
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/chunked/<upload_id>/<int:index>', methods=['PUT'])
+def upload_chunk(upload_id, index):
+    """Append chunk number `index` (raw request body) to a chunked upload"""
+    try:
+        upload = ChunkedUpload(upload_id)
+        if not upload.exists():
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        status = upload.append_chunk(index, request.stream)
+        
+        return jsonify({'success': True, **status})
+        
+    except UploadConflict as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload/chunked/<upload_id>/finalize', methods=['POST'])
+def finalize_chunked_upload(upload_id):
+    """Assemble a chunked upload into a dataset"""
+    try:
+        upload = ChunkedUpload(upload_id)
+        if not upload.exists():
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        filename = upload.status()['filename']
+        content_hash = upload.content_hash()
+        session_id = dataset_id_from_hash(content_hash)
+        
+        response = cached_upload_response(session_id, filename)
+        if response is None:
+            df, ingest_stats = upload.finalize()
+            response = register_dataset(session_id, filename, content_hash, df, ingest_stats)
+        
+        upload.cleanup()
+        return jsonify(response)
+        
+    except UploadConflict as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/visualize', methods=['POST'])
 def visualize_data():
     """Generate visualizations"""
@@ -86,17 +371,32 @@ def visualize_data():
         data = request.json
         session_id = data.get('session_id')
         
-        if session_id not in datasets:
+        df = datasets.get(session_id)
+        if df is None:
             return jsonify({'error': 'Dataset not found'}), 404
         
-        df = datasets[session_id]
-        visualizer = DataVisualizer(df)
-        
-        visualizations = {
-            'correlation_heatmap': visualizer.correlation_heatmap(),
-            'distribution_plots': visualizer.distribution_plots(),
-            'boxplots': visualizer.boxplots()
-        }
+        # mode 'data' returns precomputed plot data for the browser to render
+        if data.get('mode') == 'data':
+            visualizer = DataVisualizer(df, dataset_id=session_id, cache=plot_cache,
+                                        column_index=column_indexes.get(session_id))
+            return jsonify({
+                'success': True,
+                'mode': 'data',
+                'visualizations': {
+                    'correlation': visualizer.correlation_data(),
+                    'distributions': visualizer.distribution_data(),
+                    'boxplots': visualizer.boxplot_data()
+                }
+            })
+        
+        visualizer = DataVisualizer(df, dataset_id=session_id, cache=plot_cache)
+        
+        # Rendered concurrently in the render pool (cached renders return at once)
+        visualizations = DataVisualizer.collect({
+            'correlation_heatmap': visualizer.submit_dataset_plot('correlation_heatmap'),
+            'distribution_plots': visualizer.submit_dataset_plot('distribution_plots'),
+            'boxplots': visualizer.submit_dataset_plot('boxplots')
+        })
         
         return jsonify({
             'success': True,
@@ -114,25 +414,140 @@ def preprocess_data():
         session_id = data.get('session_id')
         strategy = data.get('strategy', 'mean')
         
-        if session_id not in datasets:
+        if not dataset_store.exists(session_id):
             return jsonify({'error': 'Dataset not found'}), 404
         
-        df = datasets[session_id]
-        preprocessor = DataPreprocessor(df)
-        
-        # Apply preprocessing
+        # Preprocessed data gets its own ID derived from the parent and the steps,
+        # so every ID always names the same data and can key downstream caches
+        new_session_id = derive_dataset_id(session_id, 'preprocess', {'strategy': strategy})
+        
+        if dataset_store.exists(new_session_id):
+            cached = dataset_store.load_meta(new_session_id)
+            if 'summary' in cached:
+                return jsonify({
+                    'success': True,
+                    'session_id': new_session_id,
+                    'summary': cached['summary'],
+                    'info': cached['info'],
+                    'cached': True
+                })
+        
+        df = datasets.get(session_id)
+        preprocessor = DataPreprocessor(df, lazy=True, row_hashes=get_row_hashes(session_id, df))
+        
+        # Apply preprocessing as one pass over the cached frame
         preprocessor.handle_missing_values(strategy=strategy)
         preprocessor.remove_duplicates()
-        
-        # Update dataset
-        datasets[session_id] = preprocessor.df
+        preprocessor.execute()
         
         summary = preprocessor.get_preprocessing_summary()
+        row_hashes = preprocessor.row_hashes
+        if row_hashes is None:
+            row_hashes = compute_row_hashes(preprocessor.df)
+        
+        # Only re-profile the columns the preprocessing touched
+        column_index = column_indexes.get(session_id).update(
+            preprocessor.df, preprocessor.changed_columns, preprocessor.rows_changed, row_hashes=row_hashes
+        )
+        info = get_dataset_info(preprocessor.df, column_index=column_index)
+        
+        # Store the result as a new version; if no rows changed it only
+        # writes the columns preprocessing touched and shares the rest
+        root = dataset_store.load_meta(session_id).get('root', session_id)
+        dataset_store.save(new_session_id, preprocessor.df, meta={
+            'root': root,
+            'parent': session_id,
+            'operation': 'preprocess',
+            'params': {'strategy': strategy},
+            'column_index': column_index.to_dict(),
+            'transforms': preprocessor.fitted_params,
+            'summary': summary,
+            'info': info
+        }, base=session_id, changed_columns=None if preprocessor.rows_changed else preprocessor.changed_columns)
+        dataset_store.save_row_hashes(new_session_id, row_hashes)
+        datasets.put(new_session_id, preprocessor.df)
+        column_indexes.put(new_session_id, column_index)
+        dataset_store.add_version(root, {
+            'session_id': new_session_id,
+            'parent': session_id,
+            'operation': 'preprocess',
+            'params': {'strategy': strategy},
+            'shape': info['shape']
+        })
         
         return jsonify({
             'success': True,
+            'session_id': new_session_id,
             'summary': summary,
-            'info': get_dataset_info(preprocessor.df)
+            'info': info
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/datasets/<session_id>/versions', methods=['GET'])
+def list_versions(session_id):
+    """List every version in the lineage of a dataset"""
+    try:
+        if not dataset_store.exists(session_id):
+            return jsonify({'error': 'Dataset not found'}), 404
+        
+        root = dataset_store.load_meta(session_id).get('root', session_id)
+        versions = dataset_store.versions(root)
+        if not versions:
+            # Uploaded before versions were recorded
+            versions = [{'session_id': root, 'parent': None, 'operation': 'upload', 'params': {}}]
+        
+        return jsonify({
+            'success': True,
+            'root': root,
+            'versions': versions
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/datasets/<session_id>/checkout', methods=['POST'])
+def checkout_version(session_id):
+    """Switch to a stored version: return the same overview an upload returns"""
+    try:
+        if not dataset_store.exists(session_id):
+            return jsonify({'error': 'Dataset not found'}), 404
+        
+        meta = dataset_store.load_meta(session_id)
+        root = meta.get('root', session_id)
+        filename = dataset_store.load_meta(root).get('filename', meta.get('filename'))
+        if 'stats' in meta:
+            response = cached_upload_response(session_id, filename)
+        else:
+            # Derived versions keep their column index, only the preview reads data
+            df = datasets.get(session_id)
+            column_index = column_indexes.get(session_id)
+            response = {
+                'success': True,
+                'session_id': session_id,
+                'filename': filename,
+                'info': meta['info'],
+                'stats': get_summary_statistics(df, column_index=column_index),
+                'validation': DataPreprocessor(df, lazy=True).validate_data(column_index=column_index),
+                'preview': df.head(10).to_dict('records')
+            }
+        response['parent'] = meta.get('parent')
+        return jsonify(response)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/datasets/<session_id>/diff/<other_id>', methods=['GET'])
+def diff_versions(session_id, other_id):
+    """Compare two versions of a dataset"""
+    try:
+        if not dataset_store.exists(session_id) or not dataset_store.exists(other_id):
+            return jsonify({'error': 'Dataset not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'diff': dataset_store.diff(session_id, other_id)
         })
         
     except Exception as e:
@@ -148,52 +563,49 @@ def run_regression():
         feature_columns = data.get('feature_columns', [])  # Get selected features
         algorithm = data.get('algorithm', 'linear')
         
-        if session_id not in datasets:
+        column_index = column_indexes.get(session_id)
+        if column_index is None:
             return jsonify({'error': 'Dataset not found'}), 404
         
-        df = datasets[session_id]
-        
         # Validate target column is numeric
-        if target_column not in df.columns:
+        if not column_index.has_column(target_column):
             return jsonify({'error': f'Target column "{target_column}" not found'}), 400
         
-        if not pd.api.types.is_numeric_dtype(df[target_column]):
+        if not column_index.is_numeric(target_column):
             return jsonify({
-                'error': f'Target column "{target_column}" must be numeric for regression. Current type: {df[target_column].dtype}. Please select a numeric column (e.g., Age, Price, Salary).'
+                'error': f'Target column "{target_column}" must be numeric for regression. Current type: {column_index.dtype(target_column)}. Please select a numeric column (e.g., Age, Price, Salary).'
             }), 400
         
         # Check if target has very few unique values (likely categorical)
-        n_unique = df[target_column].nunique()
+        n_unique = column_index.nunique(target_column)
         if n_unique <= 10:
             return jsonify({
                 'error': f'Target column "{target_column}" has only {n_unique} unique values. This looks like a classification problem. Please use Classification instead, or select a continuous numeric column.'
             }), 400
         
-        # If features specified, use only those columns + target
+        # If features specified, use only those columns, otherwise all columns except the target;
+        # either way the target and outcome/derived columns are left out
         if feature_columns:
-            selected_cols = feature_columns + [target_column]
-            df_subset = df[selected_cols]
-            X, y = get_feature_target_split(df_subset, target_column)
+            unknown = [col for col in feature_columns if not column_index.has_column(col)]
+            if unknown:
+                return jsonify({'error': f'Feature column "{unknown[0]}" not found'}), 400
+            feature_columns = select_feature_columns(feature_columns, target_column)
+            if not feature_columns:
+                return jsonify({'error': 'None of the selected feature columns can be used as a feature'}), 400
         else:
-            # Use all columns except target
-            X, y = get_feature_target_split(df, target_column)
+            feature_columns = select_feature_columns(list(column_index.columns), target_column)
+        features = get_feature_matrix(session_id, target_column, feature_columns, 'regression')
+        X, y, pipeline = features['X'], features['y'], features['pipeline']
         
         # Check minimum samples
         if len(y) < 4:
             return jsonify({'error': f'Not enough data: Only {len(y)} samples. Need at least 4 samples for regression.'}), 400
         
-        model = RegressionModel(X, y, test_size=0.2)
-        
         # Only Linear Regression supported
-        if algorithm == 'linear':
-            results = model.linear_regression()
-        else:
+        if not is_supported('regression', algorithm):
             return jsonify({'error': 'Invalid algorithm. Only linear regression is supported.'}), 400
         
-        return jsonify({
-            'success': True,
-            'results': results
-        })
+        return run_training('regression', algorithm, data, X=X, y=y, pipeline=pipeline, split=features['split'])
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -207,39 +619,22 @@ def run_classification():
         target_column = data.get('target_column')
         algorithm = data.get('algorithm', 'decision_tree')
         
-        if session_id not in datasets:
+        column_index = column_indexes.get(session_id)
+        if column_index is None:
             return jsonify({'error': 'Dataset not found'}), 404
         
-        df = datasets[session_id]
-        X, y = get_feature_target_split(df, target_column)
-        
-        model = ClassificationModel(X, y)
-        
-        if algorithm == 'decision_tree':
-            max_depth = data.get('max_depth')
-            results = model.decision_tree(max_depth=max_depth)
-        elif algorithm == 'svm':
-            kernel = data.get('kernel', 'rbf')
-            C = data.get('C', 1.0)
-            results = model.support_vector_machine(kernel=kernel, C=C)
-        elif algorithm == 'random_forest':
-            n_estimators = data.get('n_estimators', 100)
-            results = model.random_forest(n_estimators=n_estimators)
-        elif algorithm == 'adaboost':
-            n_estimators = data.get('n_estimators', 50)
-            learning_rate = data.get('learning_rate', 1.0)
-            results = model.adaboost(n_estimators, learning_rate)
-        elif algorithm == 'gradient_boosting':
-            n_estimators = data.get('n_estimators', 100)
-            learning_rate = data.get('learning_rate', 0.1)
-            results = model.gradient_boosting(n_estimators, learning_rate)
-        else:
+        if not column_index.has_column(target_column):
+            return jsonify({'error': f"Target column '{target_column}' not found in dataset"}), 400
+        
+        feature_columns = select_feature_columns(list(column_index.columns), target_column)
+        features = get_feature_matrix(session_id, target_column, feature_columns, 'classification')
+        X, y, pipeline = features['X'], features['y'], features['pipeline']
+        
+        if not is_supported('classification', algorithm):
             return jsonify({'error': 'Invalid algorithm'}), 400
         
-        return jsonify({
-            'success': True,
-            'results': results
-        })
+        return run_training('classification', algorithm, data, X=X, y=y, pipeline=pipeline,
+                            split=features['split'])
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -253,36 +648,20 @@ def run_clustering():
         algorithm = data.get('algorithm', 'kmeans')
         columns = data.get('columns')
         
-        if session_id not in datasets:
+        df = datasets.get(session_id)
+        if df is None:
             return jsonify({'error': 'Dataset not found'}), 404
         
-        df = datasets[session_id]
-        
         # Select columns if specified
-        if columns:
-            X = df[columns]
-        else:
-            X = df.select_dtypes(include=['int64', 'float64'])
-        
-        model = ClusteringModel(X)
-        
-        if algorithm == 'kmeans':
-            n_clusters = data.get('n_clusters', 3)
-            results = model.kmeans(n_clusters=n_clusters)
-        elif algorithm == 'kmeans_elbow':
-            k_range = range(2, data.get('max_k', 11))
-            results = model.kmeans_elbow(k_range=k_range)
-        elif algorithm == 'dbscan':
-            eps = data.get('eps', 0.5)
-            min_samples = data.get('min_samples', 5)
-            results = model.dbscan(eps=eps, min_samples=min_samples)
-        else:
+        if not columns:
+            columns = column_indexes.get(session_id).numeric_columns()
+        X = df[columns]
+        
+        if not is_supported('clustering', algorithm):
             return jsonify({'error': 'Invalid algorithm'}), 400
         
-        return jsonify({
-            'success': True,
-            'results': results
-        })
+        return run_training('clustering', algorithm, data, X=X, job_X=(session_id, columns),
+                            pipeline=get_pipeline(session_id, df, columns, scale=True))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -297,34 +676,62 @@ def run_dimensionality_reduction():
         n_components = data.get('n_components')
         columns = data.get('columns')
         
-        if session_id not in datasets:
+        df = datasets.get(session_id)
+        if df is None:
             return jsonify({'error': 'Dataset not found'}), 404
         
-        df = datasets[session_id]
-        
         # Select columns if specified
-        if columns:
-            X = df[columns]
-        else:
-            X = df.select_dtypes(include=['int64', 'float64'])
+        if not columns:
+            columns = column_indexes.get(session_id).numeric_columns()
+        X = df[columns]
         
-        model = DimensionalityReduction(X)
-        
-        if algorithm == 'pca':
-            results = model.pca_analysis(n_components=n_components)
-        elif algorithm == 'svd':
-            results = model.svd_analysis(n_components=n_components)
-        else:
+        if not is_supported('dimensionality', algorithm):
             return jsonify({'error': 'Invalid algorithm'}), 400
         
+        return run_training('dimensionality', algorithm, data, X=X, job_X=(session_id, columns),
+                            pipeline=get_pipeline(session_id, df, columns, scale=True))
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/ml/predict', methods=['POST'])
+def predict():
+    """Predict a single record with a trained model from the registry"""
+    try:
+        data = request.json
+        model_key = data.get('model_key')
+        input_values = data.get('input_values')
+        
+        if not isinstance(model_key, str) or model_key not in trained_models:
+            return jsonify({'error': 'Model not found. Please train the model again.'}), 404
+        if not isinstance(input_values, (dict, list)):
+            return jsonify({'error': 'input_values must be an object of column values'}), 400
+        
+        try:
+            prediction = trained_models.predict(model_key, input_values)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         return jsonify({
             'success': True,
-            'results': results
+            'prediction': prediction
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/ml/models/<model_key>', methods=['GET'])
+def model_info(model_key):
+    """Describe a trained model: algorithm, target, the input columns a prediction needs and its metrics"""
+    try:
+        entry = trained_models.get(model_key)
+        if entry is None:
+            return jsonify({'error': 'Model not found'}), 404
+        return jsonify({'success': True, 'model': entry['info']})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/detect_problem_type', methods=['POST'])
 def detect_problem():
     """Detect if problem is regression or classification"""
@@ -333,11 +740,11 @@ def detect_problem():
         session_id = data.get('session_id')
         target_column = data.get('target_column')
         
-        if session_id not in datasets:
+        column_index = column_indexes.get(session_id)
+        if column_index is None:
             return jsonify({'error': 'Dataset not found'}), 404
         
-        df = datasets[session_id]
-        problem_type = detect_problem_type(df, target_column)
+        problem_type = detect_problem_type(None, target_column, column_index=column_index)
         
         return jsonify({
             'success': True,
@@ -347,6 +754,74 @@ def detect_problem():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def job_response(state):
+    """Job state for a response, with the results once the job has succeeded"""
+    response = {'success': True, 'job': state}
+    if state['status'] == 'succeeded':
+        response['results'] = jobs.result(state['job_id'])
+    return response
+
+@app.route('/jobs', methods=['GET'])
+def job_stats():
+    """Jobs queued and running in this worker, and the job limits"""
+    return jsonify({'success': True, 'jobs': jobs.stats()})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Poll a job: its state, and its results once it has succeeded"""
+    state = jobs.status(job_id)
+    if state is None:
+        return jsonify({'error': 'Job not found'}), 404
+    response = jsonify(job_response(state))
+    if state['status'] not in FINISHED_STATES:
+        # Clients poll rather than hold a streaming connection, which would tie up a sync worker
+        response.headers['Retry-After'] = str(Config.JOB_RETRY_AFTER)
+    return response
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    state = jobs.cancel(job_id)
+    if state is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if state['status'] in FINISHED_STATES and state['status'] != 'cancelled':
+        return jsonify({'error': f"Job already {state['status']}", 'job': state}), 409
+    return jsonify({'success': True, 'job': state})
+
+@app.route('/plots/<key>', methods=['GET'])
+def get_plot(key):
+    """Serve a stored plot image, as WebP to browsers that accept it"""
+    if not plot_store.exists(key):
+        return jsonify({'error': 'Plot not found'}), 404
+    
+    path, image_format = plot_store.path(key), 'png'
+    if Config.PLOT_WEBP and any(mimetype == 'image/webp' and quality > 0
+                                for mimetype, quality in request.accept_mimetypes):
+        webp_path = plot_store.webp_path(key)
+        if webp_path is not None:
+            path, image_format = webp_path, 'webp'
+    
+    # The key is a hash of the image, so the ETag and URL never change meaning
+    response = send_file(path, mimetype=f'image/{image_format}', etag=f'{key}-{image_format}',
+                         conditional=True, max_age=Config.PLOT_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={Config.PLOT_MAX_AGE}, immutable'
+    if Config.PLOT_WEBP:
+        response.vary.add('Accept')
+    return response
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Report memory usage and hit/miss/eviction counters of the caches"""
+    return jsonify({
+        'success': True,
+        'datasets': datasets.stats(),
+        'column_indexes': column_indexes.stats(),
+        'trained_models': trained_models.stats(),
+        'pipelines': pipelines.stats(),
+        'feature_matrices': feature_matrices.stats(),
+        'plots': plot_cache.stats()
+    })
+
 if __name__ == '__main__':
     # Create upload folder if it doesn't exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -11,10 +11,66 @@ class Config:
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'csv'}
+    DATASET_FOLDER = os.path.join(UPLOAD_FOLDER, 'datasets')  # Arrow IPC copies of uploaded datasets
+    
+    # Chunked upload settings (for files larger than MAX_CONTENT_LENGTH)
+    UPLOAD_CHUNK_FOLDER = os.path.join(UPLOAD_FOLDER, 'partial')
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # Suggested chunk size, must stay below MAX_CONTENT_LENGTH
+    
+    # Ingest settings
+    INGEST_CHUNK_SIZE = 100000  # Rows parsed per CSV chunk
+    CATEGORY_MAX_UNIQUE = 1000  # String columns above this many values stay as objects
+    CATEGORY_MAX_RATIO = 0.5  # ...or above this ratio of unique values to rows
+    
+    # Profiling settings
+    PROFILE_MAX_WORKERS = 4  # Threads used to profile columns in parallel
+    PROFILE_PARALLEL_MIN_CELLS = 1000000  # Smaller frames are profiled on the request thread
+    APPROX_PROFILE_MIN_ROWS = 1000000  # Larger frames are profiled with sketches (approximate figures)
+    APPROX_QUANTILE_SAMPLE_SIZE = 100000  # Sample kept by the quantile sketch
+    HISTOGRAM_BINS = 30  # Bins of the per-column histograms kept in the column index
+    COLUMN_INDEX_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    
+    # Out-of-core preprocessing settings
+    PREPROCESS_CHUNK_SIZE = 100000  # Rows per chunk when preprocessing a CSV that does not fit in memory
+    PREPROCESS_MODE_COUNTERS = 10000  # Values counted per column when looking for modes out of core
+    
+    # Startup settings
+    GUNICORN_PRELOAD = os.environ.get('GUNICORN_PRELOAD', '1') == '1'  # Import the app once in the gunicorn master and fork workers from it
+    PRELOAD_MODULES = [  # Imported before forking in preload mode, so workers share them copy-on-write
+        'sklearn.model_selection', 'sklearn.preprocessing', 'sklearn.impute', 'sklearn.metrics',
+        'sklearn.linear_model', 'sklearn.tree', 'sklearn.svm', 'sklearn.ensemble',
+        'sklearn.cluster', 'sklearn.decomposition'
+    ]
+    # Imported once by the server that plot and job processes are forked from
+    WORKER_PRELOAD_MODULES = ['ml_modules.training', 'matplotlib.pyplot', 'seaborn', 'plotly.express'] + PRELOAD_MODULES
+    
+    # Background job settings (training runs submitted with "async": true)
+    JOB_FOLDER = os.path.join(UPLOAD_FOLDER, 'jobs')  # Job states and results, shared by all workers
+    JOB_WORKERS = max(1, (os.cpu_count() or 1) - 1)  # Training processes running at once, per app worker
+    JOB_MAX_QUEUE = 20  # Jobs waiting for a process; more are rejected with 503
+    JOB_TIME_LIMIT = 600  # Default seconds a job may run before it is stopped
+    JOB_MAX_TIME_LIMIT = 3600  # Upper bound for the time limit a client asks for
+    JOB_RETENTION = 24 * 3600  # Files of finished jobs are deleted after this many seconds
+    JOB_POLL_INTERVAL = 0.2  # Seconds between checks of running jobs
+    JOB_RETRY_AFTER = 1  # Seconds a client should wait before polling an unfinished job again (Retry-After)
     
     # Sample datasets folder
     SAMPLE_DATASETS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_datasets')
     
+    # Memory budgets for the in-process LRU caches
+    DATASET_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Datasets evicted from memory are reloaded from DATASET_FOLDER
+    MODEL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+    MODEL_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'models')  # Evicted models are spilled here
+    PIPELINE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+    FEATURE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Encoded feature matrices and train/test splits
+    PIPELINE_FOLDER = os.path.join(UPLOAD_FOLDER, 'pipelines')  # Fitted feature pipelines, shared by all workers
+    
+    # Feature encoding settings
+    ONEHOT_MAX_CATEGORIES = 1000  # Categorical columns with more categories get a compact encoding
+    HIGH_CARDINALITY_ENCODING = 'frequency'  # 'frequency' (top categories + other) or 'hash'
+    FEATURE_HASH_BUCKETS = 1024  # Columns per categorical column with the 'hash' encoding
+    SPARSE_MIN_FEATURES = 500  # Feature matrices wider than this are built as sparse CSR matrices
+    
     # ML settings
     TEST_SIZE = 0.2
     RANDOM_STATE = 42
@@ -22,10 +78,30 @@ class Config:
     # Visualization settings
     PLOT_STYLE = 'seaborn-v0_8-darkgrid'
     FIGURE_SIZE = (10, 6)
+    PLOT_POINT_BUDGET = 5000  # Larger scatter plots are sampled (stratified by label) or drawn as densities
+    SVM_BOUNDARY_MAX_OPERATIONS = 200000000  # Mesh points x support vectors x features per decision boundary plot
+    SVM_BOUNDARY_MIN_RESOLUTION = 40  # Mesh points per axis of the decision boundary
+    SVM_BOUNDARY_MAX_RESOLUTION = 300
+    SVM_BOUNDARY_BATCH_BYTES = 32 * 1024 * 1024  # Mesh points mapped back to feature space per prediction batch
+    TREE_EXPORT_MAX_DEPTH = 12  # Levels of a decision tree sent to the browser as node arrays
+    TREE_PLOT_IMAGES = False  # Also render trees as images with matplotlib (slow for deep trees, cached per model)
+    PLOT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Rendered dataset plots kept in memory
+    PLOT_CACHE_FOLDER = os.path.join(UPLOAD_FOLDER, 'plots')  # All rendered dataset plots, shared by all workers
+    PLOT_FOLDER = os.path.join(UPLOAD_FOLDER, 'plot_images')  # Plot images served from /plots/<key>
+    PLOT_MAX_AGE = 365 * 24 * 3600  # Plot URLs are content-addressed, so browsers may cache them for good
+    PLOT_WEBP = True  # Serve plots as WebP to browsers that accept it (needs Pillow)
+    RENDER_WORKERS = min(3, (os.cpu_count() or 1) - 1)  # Processes rendering plots concurrently (0 renders on the request thread)
     
     @staticmethod
     def init_app(app):
         """Initialize application with config"""
         # Create upload folder if it doesn't exist
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+        os.makedirs(Config.DATASET_FOLDER, exist_ok=True)
+        os.makedirs(Config.UPLOAD_CHUNK_FOLDER, exist_ok=True)
+        os.makedirs(Config.MODEL_CACHE_FOLDER, exist_ok=True)
+        os.makedirs(Config.PIPELINE_FOLDER, exist_ok=True)
+        os.makedirs(Config.PLOT_CACHE_FOLDER, exist_ok=True)
+        os.makedirs(Config.PLOT_FOLDER, exist_ok=True)
+        os.makedirs(Config.JOB_FOLDER, exist_ok=True)
         os.makedirs(Config.SAMPLE_DATASETS_FOLDER, exist_ok=True)
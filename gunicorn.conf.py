@@ -0,0 +1,23 @@
+"""
+Gunicorn settings for SmartML Dashboard
+
+In preload mode the app is imported once in the master; when_ready then
+imports the plotting and ML libraries that requests load lazily, so every
+worker forked afterwards shares them copy-on-write instead of importing
+them itself. Set GUNICORN_PRELOAD=0 to let each worker import the app.
+"""
+import gc
+from config import Config
+
+preload_app = Config.GUNICORN_PRELOAD
+
+
+def when_ready(server):
+    """Runs in the master, after the app is loaded and before the first worker is forked"""
+    if not preload_app:
+        return
+    from utils.lazy_import import warm_up
+    warm_up(Config.PRELOAD_MODULES)
+    # Keep the collector from touching (and so copying) the objects shared with workers
+    gc.freeze()
+    server.log.info('Preloaded modules shared with workers')
@@ -2,44 +2,54 @@
 Classification Algorithms Module
 Implements various classification algorithms
 """
+import copy
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.svm import SVC
-from sklearn.ensemble import RandomForestClassifier, AdaBoostClassifier, GradientBoostingClassifier
-from sklearn.naive_bayes import GaussianNB
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.metrics import (accuracy_score, precision_score, recall_score, 
-                            f1_score, confusion_matrix, classification_report)
-from ml_modules.visualization import DataVisualizer
+from scipy import sparse as sp
+from config import Config
+from ml_modules.visualization import DataVisualizer, model_fingerprint
+from ml_modules.pipeline import take_rows
 
 class ClassificationModel:
     """Handle classification tasks"""
     
-    def __init__(self, X, y, test_size=0.2, random_state=42):
+    def __init__(self, X, y, test_size=0.2, random_state=42, pipeline=None, feature_names=None,
+                 split_indices=None):
+        # X is a DataFrame, or a scipy sparse matrix whose column names are in feature_names
         self.X = X
         self.y = y
+        # Fitted FeaturePipeline that produced X, used to transform raw prediction inputs
+        self.pipeline = pipeline
+        self.feature_names = list(feature_names) if feature_names is not None else self.X.columns.tolist()
         self.test_size = test_size
         self.random_state = random_state
+        # Precomputed (train, test) row positions, e.g. from the feature matrix cache
+        self.split_indices = split_indices
         self.X_train, self.X_test, self.y_train, self.y_test = None, None, None, None
         self.model = None
         self.predictions = None
         
     def split_data(self):
         """Split data into train and test sets"""
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            self.X, self.y, test_size=self.test_size, random_state=self.random_state, stratify=self.y
-        )
+        from sklearn.model_selection import train_test_split
+        if self.split_indices is not None:
+            train_idx, test_idx = self.split_indices
+            self.X_train, self.X_test = take_rows(self.X, train_idx), take_rows(self.X, test_idx)
+            self.y_train, self.y_test = take_rows(self.y, train_idx), take_rows(self.y, test_idx)
+        else:
+            self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
+                self.X, self.y, test_size=self.test_size, random_state=self.random_state, stratify=self.y
+            )
         return {
-            'train_size': len(self.X_train),
-            'test_size': len(self.X_test),
+            'train_size': self.X_train.shape[0],
+            'test_size': self.X_test.shape[0],
             'feature_count': self.X_train.shape[1],
             'classes': np.unique(self.y).tolist()
         }
     
     def decision_tree(self, max_depth=None, min_samples_split=2):
         """Train Decision Tree Classifier"""
+        from sklearn.tree import DecisionTreeClassifier
         if self.X_train is None:
             self.split_data()
         
@@ -56,18 +66,23 @@ class ClassificationModel:
         results['algorithm'] = 'Decision Tree Classifier'
         
         # Feature importance
-        feature_importance = dict(zip(self.X.columns, self.model.feature_importances_))
-        results['feature_importance_plot'] = DataVisualizer.plot_feature_importance(feature_importance)
+        feature_importance = dict(zip(self.feature_names, self.model.feature_importances_))
+        results['feature_importance_plot'] = DataVisualizer.submit('plot_feature_importance', feature_importance)
         results['feature_importance'] = feature_importance
         
-        # Decision Tree Visualization
+        # Decision Tree structure, rendered in the browser
         class_names = np.unique(self.y).astype(str).tolist()
-        results['tree_plot'] = DataVisualizer.plot_decision_tree(
-            self.model, 
-            feature_names=self.X.columns.tolist(),
-            class_names=class_names,
-            max_depth=3  # Show top 3 levels for clarity
-        )
+        results['tree'] = DataVisualizer.tree_data(self.model, self.feature_names, class_names,
+                                                   max_depth=Config.TREE_EXPORT_MAX_DEPTH)
+        if Config.TREE_PLOT_IMAGES:
+            results['tree_plot'] = DataVisualizer.submit_cached(
+                model_fingerprint([self.model], self.feature_names, class_names, 3),
+                'plot_decision_tree',
+                self.model, 
+                feature_names=self.feature_names,
+                class_names=class_names,
+                max_depth=3  # Show top 3 levels for clarity
+            )
         results['tree_depth'] = int(self.model.get_depth())
         results['n_leaves'] = int(self.model.get_n_leaves())
         
@@ -75,6 +90,7 @@ class ClassificationModel:
     
     def support_vector_machine(self, kernel='rbf', C=1.0):
         """Train SVM Classifier"""
+        from sklearn.svm import SVC
         if self.X_train is None:
             self.split_data()
         
@@ -96,22 +112,13 @@ class ClassificationModel:
         results['C'] = C
         results['algorithm'] = f'Support Vector Machine (kernel={kernel})'
         
-        # Skip decision boundary for large datasets
-        if len(self.X_train) > 500:
-            print("Info: Skipping SVM decision boundary plot for large dataset")
-            results['decision_boundary_plot'] = None
-        else:
-            # Decision boundary visualization (with error handling)
-            try:
-                results['decision_boundary_plot'] = DataVisualizer.plot_svm_decision_boundary(
-                    self.X_train,
-                    self.y_train,
-                    self.model,
-                    self.X.columns.tolist()
-                )
-            except Exception as e:
-                print(f"Warning: Could not generate SVM decision boundary plot: {str(e)}")
-                results['decision_boundary_plot'] = None
+        # Decision boundary of the trained model (a failed render becomes None in DataVisualizer.collect)
+        results['decision_boundary_plot'] = DataVisualizer.submit('plot_svm_decision_boundary',
+            self.X_train,
+            self.y_train,
+            self.model,
+            self.feature_names
+        )
         
         results['n_support_vectors'] = int(len(self.model.support_))
         
@@ -119,6 +126,7 @@ class ClassificationModel:
     
     def random_forest(self, n_estimators=100, max_depth=None):
         """Train Random Forest Classifier"""
+        from sklearn.ensemble import RandomForestClassifier
         if self.X_train is None:
             self.split_data()
         
@@ -135,31 +143,38 @@ class ClassificationModel:
         results['algorithm'] = 'Random Forest Classifier'
         
         # Feature importance with enhanced visualization
-        feature_importance = dict(zip(self.X.columns, self.model.feature_importances_))
-        results['feature_importance_plot'] = DataVisualizer.plot_feature_importance_detailed(
+        feature_importance = dict(zip(self.feature_names, self.model.feature_importances_))
+        results['feature_importance_plot'] = DataVisualizer.submit('plot_feature_importance_detailed',
             feature_importance, 
             title='Random Forest - Feature Importance'
         )
         results['feature_importance'] = feature_importance
         
-        # Sample trees visualization
+        # Sample trees structure, rendered in the browser
         class_names = np.unique(self.y).astype(str).tolist()
-        results['forest_trees_plot'] = DataVisualizer.plot_random_forest_trees(
-            self.model,
-            feature_names=self.X.columns.tolist(),
-            class_names=class_names,
-            n_trees_to_show=3
-        )
+        results['forest_trees'] = DataVisualizer.forest_data(self.model, self.feature_names, class_names,
+                                                             n_trees_to_show=3,
+                                                             max_depth=Config.TREE_EXPORT_MAX_DEPTH)
+        if Config.TREE_PLOT_IMAGES:
+            results['forest_trees_plot'] = DataVisualizer.submit_cached(
+                model_fingerprint(self.model.estimators_[:3], self.feature_names, class_names, n_estimators),
+                'plot_random_forest_trees',
+                self.model,
+                feature_names=self.feature_names,
+                class_names=class_names,
+                n_trees_to_show=3
+            )
         results['n_trees'] = int(n_estimators)
         
         return results
-        results['feature_importance_plot'] = DataVisualizer.plot_feature_importance(feature_importance)
+        results['feature_importance_plot'] = DataVisualizer.submit('plot_feature_importance', feature_importance)
         results['feature_importance'] = feature_importance
         
         return results
     
     def adaboost(self, n_estimators=50, learning_rate=1.0):
         """Train AdaBoost Classifier"""
+        from sklearn.ensemble import AdaBoostClassifier
         if self.X_train is None:
             self.split_data()
         
@@ -177,14 +192,15 @@ class ClassificationModel:
         results['algorithm'] = 'AdaBoost Classifier'
         
         # Feature importance
-        feature_importance = dict(zip(self.X.columns, self.model.feature_importances_))
-        results['feature_importance_plot'] = DataVisualizer.plot_feature_importance(feature_importance)
+        feature_importance = dict(zip(self.feature_names, self.model.feature_importances_))
+        results['feature_importance_plot'] = DataVisualizer.submit('plot_feature_importance', feature_importance)
         results['feature_importance'] = feature_importance
         
         return results
     
     def gradient_boosting(self, n_estimators=100, learning_rate=0.1):
         """Train Gradient Boosting Classifier"""
+        from sklearn.ensemble import GradientBoostingClassifier
         if self.X_train is None:
             self.split_data()
         
@@ -202,14 +218,16 @@ class ClassificationModel:
         results['algorithm'] = 'Gradient Boosting Classifier'
         
         # Feature importance
-        feature_importance = dict(zip(self.X.columns, self.model.feature_importances_))
-        results['feature_importance_plot'] = DataVisualizer.plot_feature_importance(feature_importance)
+        feature_importance = dict(zip(self.feature_names, self.model.feature_importances_))
+        results['feature_importance_plot'] = DataVisualizer.submit('plot_feature_importance', feature_importance)
         results['feature_importance'] = feature_importance
         
         return results
     
     def _calculate_metrics(self):
         """Calculate classification metrics"""
+        from sklearn.metrics import (accuracy_score, precision_score, recall_score,
+                                     f1_score, confusion_matrix, classification_report)
         accuracy = accuracy_score(self.y_test, self.predictions)
         
         # Handle multi-class vs binary
@@ -222,7 +240,7 @@ class ClassificationModel:
         # Confusion matrix
         cm = confusion_matrix(self.y_test, self.predictions)
         labels = np.unique(self.y).tolist()
-        cm_plot = DataVisualizer.plot_confusion_matrix(cm, labels)
+        cm_plot = DataVisualizer.submit('plot_confusion_matrix', cm, labels)
         
         # Classification report
         report = classification_report(self.y_test, self.predictions, output_dict=True)
@@ -241,3 +259,54 @@ class ClassificationModel:
             'classification_report': report,
             'classes': labels
         }
+    
+    def for_prediction(self):
+        """Copy of the trained model without its training data, for the model registry"""
+        if self.model is None:
+            raise ValueError("Model not trained yet. Train a model first.")
+        slim = copy.copy(self)
+        # No rows, but the same layout (frame columns or sparse width) for predict_single
+        slim.X = take_rows(self.X, [])
+        slim.y = slim.X_train = slim.X_test = slim.y_train = slim.y_test = None
+        slim.predictions = slim.split_indices = None
+        return slim
+    
+    def predict_single(self, input_values):
+        """
+        Predict the class of a single input
+        
+        Args:
+            input_values: dict or list/array of feature values; with a pipeline,
+                          a dict of raw dataset column values
+        
+        Returns:
+            dict with predicted class and class probabilities (if available)
+        """
+        if self.model is None:
+            raise ValueError("Model not trained yet. Train a model first.")
+        
+        if isinstance(input_values, dict) and self.pipeline is not None:
+            # Raw column values: encode them exactly like the training data
+            input_array = self.pipeline.transform_record(input_values)
+        elif isinstance(input_values, dict):
+            missing = [feature for feature in self.feature_names if feature not in input_values]
+            if missing:
+                raise ValueError(f"Missing feature: {missing[0]}")
+            input_array = np.array([[input_values[feature] for feature in self.feature_names]])
+        else:
+            input_array = np.array([input_values])
+        
+        if isinstance(input_array, np.ndarray) and hasattr(self.X, 'columns'):
+            # Same feature names as the training frame
+            input_array = pd.DataFrame(input_array, columns=self.feature_names)
+        elif isinstance(input_array, np.ndarray) and sp.issparse(self.X):
+            input_array = sp.csr_matrix(input_array)
+        prediction = self.model.predict(input_array)[0]
+        result = {'prediction': prediction.item() if isinstance(prediction, np.generic) else prediction}
+        
+        if hasattr(self.model, 'predict_proba'):
+            probabilities = self.model.predict_proba(input_array)[0]
+            result['probabilities'] = {
+                str(label): round(float(p), 4) for label, p in zip(self.model.classes_, probabilities)
+            }
+        return result
@@ -4,29 +4,32 @@ Implements K-Means and DBSCAN clustering
 """
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans, DBSCAN
-from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
-from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
 from ml_modules.visualization import DataVisualizer
 
 class ClusteringModel:
     """Handle clustering tasks"""
     
-    def __init__(self, X):
+    def __init__(self, X, pipeline=None):
+        from sklearn.preprocessing import StandardScaler
         self.X = X
         self.X_scaled = None
+        # Fitted FeaturePipeline (scale=True) reused instead of fitting a new scaler
+        self.pipeline = pipeline
         self.model = None
         self.labels = None
         self.scaler = StandardScaler()
         
     def scale_data(self):
         """Scale features for clustering"""
+        if self.pipeline is not None:
+            self.X_scaled = self.pipeline.transform(self.X).to_numpy()
+            return self.X_scaled
         self.X_scaled = self.scaler.fit_transform(self.X)
         return self.X_scaled
     
     def kmeans(self, n_clusters=3, init='k-means++', n_init=10):
         """Perform K-Means clustering"""
+        from sklearn.cluster import KMeans
         if self.X_scaled is None:
             self.scale_data()
         
@@ -48,7 +51,7 @@ class ClusteringModel:
         
         # Enhanced 3D visualization (with timeout protection)
         try:
-            results['cluster_plot'] = DataVisualizer.plot_cluster_results_3d(
+            results['cluster_plot'] = DataVisualizer.submit('plot_cluster_results_3d',
                 self.X_scaled, 
                 self.labels,
                 centers=self.model.cluster_centers_,
@@ -66,6 +69,8 @@ class ClusteringModel:
     
     def kmeans_elbow(self, k_range=range(2, 11)):
         """Find optimal K using elbow method"""
+        from sklearn.cluster import KMeans
+        from sklearn.metrics import silhouette_score
         if self.X_scaled is None:
             self.scale_data()
         
@@ -83,7 +88,7 @@ class ClusteringModel:
             else:
                 silhouette_scores.append(0)
         
-        elbow_plot = DataVisualizer.plot_elbow_curve(inertias, list(k_range))
+        elbow_plot = DataVisualizer.submit('plot_elbow_curve', inertias, list(k_range))
         
         return {
             'k_range': list(k_range),
@@ -95,6 +100,8 @@ class ClusteringModel:
     
     def dbscan(self, eps=0.5, min_samples=5):
         """Perform DBSCAN clustering"""
+        from sklearn.cluster import DBSCAN
+        from sklearn.metrics import silhouette_score
         if self.X_scaled is None:
             self.scale_data()
         
@@ -126,7 +133,7 @@ class ClusteringModel:
                     results['silhouette_score'] = None
         
         # Enhanced 3D visualization
-        results['cluster_plot'] = DataVisualizer.plot_cluster_results_3d(
+        results['cluster_plot'] = DataVisualizer.submit('plot_cluster_results_3d',
             self.X_scaled,
             self.labels,
             centers=None,
@@ -145,6 +152,7 @@ class ClusteringModel:
     
     def _calculate_metrics(self):
         """Calculate clustering metrics"""
+        from sklearn.metrics import silhouette_score, davies_bouldin_score, calinski_harabasz_score
         metrics = {}
         
         # Silhouette Score
@@ -169,5 +177,6 @@ class ClusteringModel:
     
     def _get_2d_projection(self):
         """Get 2D projection using PCA for visualization"""
+        from sklearn.decomposition import PCA
         pca = PCA(n_components=2)
         return pca.fit_transform(self.X_scaled)
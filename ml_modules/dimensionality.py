@@ -4,27 +4,32 @@ Implements PCA and SVD
 """
 import numpy as np
 import pandas as pd
-from sklearn.decomposition import PCA, TruncatedSVD
-from sklearn.preprocessing import StandardScaler
 from ml_modules.visualization import DataVisualizer
 
 class DimensionalityReduction:
     """Handle dimensionality reduction tasks"""
     
-    def __init__(self, X):
+    def __init__(self, X, pipeline=None):
+        from sklearn.preprocessing import StandardScaler
         self.X = X
         self.X_scaled = None
+        # Fitted FeaturePipeline (scale=True) reused instead of fitting a new scaler
+        self.pipeline = pipeline
         self.model = None
         self.X_reduced = None
         self.scaler = StandardScaler()
         
     def scale_data(self):
         """Scale features"""
+        if self.pipeline is not None:
+            self.X_scaled = self.pipeline.transform(self.X).to_numpy()
+            return self.X_scaled
         self.X_scaled = self.scaler.fit_transform(self.X)
         return self.X_scaled
     
     def pca_analysis(self, n_components=None):
         """Perform PCA"""
+        from sklearn.decomposition import PCA
         if self.X_scaled is None:
             self.scale_data()
         
@@ -53,7 +58,7 @@ class DimensionalityReduction:
         }
         
         # Variance plot
-        results['variance_plot'] = DataVisualizer.plot_pca_variance(
+        results['variance_plot'] = DataVisualizer.submit('plot_pca_variance',
             explained_variance, cumulative_variance
         )
         
@@ -78,6 +83,7 @@ class DimensionalityReduction:
     
     def svd_analysis(self, n_components=None):
         """Perform Truncated SVD"""
+        from sklearn.decomposition import TruncatedSVD
         if self.X_scaled is None:
             self.scale_data()
         
@@ -108,7 +114,7 @@ class DimensionalityReduction:
         }
         
         # Variance plot
-        results['variance_plot'] = DataVisualizer.plot_pca_variance(
+        results['variance_plot'] = DataVisualizer.submit('plot_pca_variance',
             explained_variance, cumulative_variance
         )
         
@@ -0,0 +1,234 @@
+"""
+Feature Pipeline Module
+Fitted feature transforms shared by training and prediction
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse as sp
+from config import Config
+from utils.sketches import hash_values
+
+
+def take_rows(data, indices):
+    """Select rows by position from a DataFrame, Series, array or sparse matrix"""
+    if hasattr(data, 'iloc'):
+        return data.iloc[indices]
+    return data[indices]
+
+
+class FeaturePipeline:
+    """
+    Turn raw dataset columns into a model feature matrix
+
+    fit() learns everything the transform needs from one dataset version:
+    fill values for missing data, a fixed category vocabulary per
+    categorical column and, optionally, scaling parameters. transform()
+    then applies exactly those values, so a single prediction row gets the
+    same columns, in the same order, as the training matrix.
+
+    Categorical columns are one-hot encoded with the first category dropped,
+    like pd.get_dummies(drop_first=True); categories not seen during fit
+    encode as all zeros. Columns with more than max_categories categories
+    are encoded compactly instead:
+        'frequency': one column per most frequent category plus '<col>_other'
+        'hash': categories hashed into hash_buckets columns
+
+    sparse: 'auto' builds a scipy CSR matrix instead of a DataFrame when the
+            encoded width exceeds Config.SPARSE_MIN_FEATURES (never for scaled
+            pipelines, since centering makes every entry non-zero)
+    """
+
+    def __init__(self, impute_strategy='median', scale=False, sparse='auto',
+                 max_categories=None, high_cardinality=None, hash_buckets=None):
+        self.impute_strategy = impute_strategy
+        self.scale = scale
+        self.sparse = sparse
+        self.max_categories = max_categories or Config.ONEHOT_MAX_CATEGORIES
+        self.high_cardinality = high_cardinality or Config.HIGH_CARDINALITY_ENCODING
+        self.hash_buckets = hash_buckets or Config.FEATURE_HASH_BUCKETS
+        self.input_columns_ = None
+        self.numeric_columns_ = []
+        self.categorical_columns_ = []
+        self.fill_values_ = {}
+        self.categories_ = {}
+        self.encodings_ = {}
+        self.means_ = None
+        self.scales_ = None
+        self.feature_names_ = None
+        self.sparse_ = False
+
+    def fit(self, df, columns=None):
+        """
+        Learn the transforms from a DataFrame
+        columns: input columns to use (default: all columns of df)
+        """
+        columns = list(df.columns if columns is None else columns)
+        self.input_columns_ = columns
+        self.numeric_columns_ = [col for col in columns if pd.api.types.is_numeric_dtype(df[col])]
+        self.categorical_columns_ = [col for col in columns if col not in self.numeric_columns_]
+
+        self.fill_values_ = {}
+        for col in self.numeric_columns_:
+            values = df[col].astype(np.float64)
+            fill_value = values.mean() if self.impute_strategy == 'mean' else values.median()
+            self.fill_values_[col] = 0.0 if pd.isna(fill_value) else float(fill_value)
+
+        self.categories_ = {}
+        self.encodings_ = {}
+        self.feature_names_ = list(self.numeric_columns_)
+        for col in self.categorical_columns_:
+            series = df[col]
+            counts = series.value_counts(sort=True)
+            counts = counts[counts > 0]
+            self.fill_values_[col] = counts.index[0] if len(counts) else None
+
+            if len(counts) <= self.max_categories:
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    categories = series.cat.categories.tolist()
+                else:
+                    categories = sorted(counts.index.tolist(), key=str)
+                self.encodings_[col] = 'onehot'
+                self.categories_[col] = categories
+                self.feature_names_ += [f'{col}_{category}' for category in categories[1:]]
+            elif self.high_cardinality == 'hash':
+                self.encodings_[col] = 'hash'
+                self.feature_names_ += [f'{col}_hash{bucket}' for bucket in range(self.hash_buckets)]
+            else:
+                categories = counts.index[:self.max_categories].tolist()
+                self.encodings_[col] = 'frequency'
+                self.categories_[col] = categories
+                self.feature_names_ += [f'{col}_{category}' for category in categories] + [f'{col}_other']
+
+        if self.sparse == 'auto':
+            self.sparse_ = not self.scale and len(self.feature_names_) > Config.SPARSE_MIN_FEATURES
+        else:
+            self.sparse_ = bool(self.sparse) and not self.scale
+
+        self.means_ = self.scales_ = None
+        if self.scale:
+            # Scaling statistics come from the imputed, encoded training matrix
+            matrix = self._encode_dense(df)
+            self.means_ = matrix.mean(axis=0)
+            scales = matrix.std(axis=0)
+            self.scales_ = np.where(scales > 0, scales, 1.0)
+        return self
+
+    def _check_columns(self, df):
+        missing = [col for col in self.input_columns_ if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+
+    def _numeric_values(self, df, col):
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.where(np.isnan(values), self.fill_values_[col], values)
+
+    def _categorical_positions(self, df, col):
+        """
+        Column of each row within the block of a categorical column
+
+        Returns:
+            (block width, int array of positions with -1 for rows without a 1)
+        """
+        series = df[col]
+        if self.fill_values_[col] is not None:
+            series = series.astype(object).where(series.notna(), self.fill_values_[col])
+        encoding = self.encodings_[col]
+
+        if encoding == 'hash':
+            positions = (hash_values(series.astype(str)) % np.uint64(self.hash_buckets)).astype(np.int64)
+            return self.hash_buckets, positions
+
+        categories = self.categories_[col]
+        codes = pd.Categorical(series, categories=categories).codes.astype(np.int64)
+        if encoding == 'frequency':
+            # Categories outside the kept vocabulary go to the trailing 'other' column
+            return len(categories) + 1, np.where(codes < 0, len(categories), codes)
+        # Code 0 is the dropped first category, -1 an unknown one
+        return max(len(categories) - 1, 0), codes - 1
+
+    def _encode_dense(self, df):
+        """Impute and encode df into a dense float matrix with the fitted column layout"""
+        self._check_columns(df)
+        matrix = np.zeros((len(df), len(self.feature_names_)), dtype=np.float64)
+        for position, col in enumerate(self.numeric_columns_):
+            matrix[:, position] = self._numeric_values(df, col)
+
+        offset = len(self.numeric_columns_)
+        for col in self.categorical_columns_:
+            width, positions = self._categorical_positions(df, col)
+            rows = np.flatnonzero(positions >= 0)
+            matrix[rows, offset + positions[rows]] = 1.0
+            offset += width
+
+        if self.means_ is not None:
+            matrix -= self.means_
+            matrix /= self.scales_
+        return matrix
+
+    def _encode_sparse(self, df):
+        """Impute and encode df into a CSR matrix, one entry per category instead of a full row"""
+        self._check_columns(df)
+        n_rows = len(df)
+        row_parts, col_parts, value_parts = [], [], []
+        for position, col in enumerate(self.numeric_columns_):
+            values = self._numeric_values(df, col)
+            rows = np.flatnonzero(values)
+            row_parts.append(rows)
+            col_parts.append(np.full(len(rows), position))
+            value_parts.append(values[rows])
+
+        offset = len(self.numeric_columns_)
+        for col in self.categorical_columns_:
+            width, positions = self._categorical_positions(df, col)
+            rows = np.flatnonzero(positions >= 0)
+            row_parts.append(rows)
+            col_parts.append(offset + positions[rows])
+            value_parts.append(np.ones(len(rows)))
+            offset += width
+
+        if not row_parts:
+            return sp.csr_matrix((n_rows, len(self.feature_names_)))
+        return sp.csr_matrix(
+            (np.concatenate(value_parts), (np.concatenate(row_parts), np.concatenate(col_parts))),
+            shape=(n_rows, len(self.feature_names_))
+        )
+
+    def transform(self, df):
+        """
+        Return the feature matrix of df with the fitted columns
+        A DataFrame, or a CSR matrix (columns in feature_names_) for sparse pipelines.
+        """
+        if self.feature_names_ is None:
+            raise ValueError("Pipeline not fitted yet. Call fit() first.")
+        if self.sparse_:
+            return self._encode_sparse(df)
+        return pd.DataFrame(self._encode_dense(df), columns=self.feature_names_, index=df.index)
+
+    def fit_transform(self, df, columns=None):
+        return self.fit(df, columns).transform(df)
+
+    def transform_record(self, values):
+        """
+        Transform a single record for prediction
+        values: dict of raw input column values
+        """
+        missing = [col for col in self.input_columns_ if col not in values]
+        if missing:
+            raise ValueError(f"Missing feature: {missing[0]}")
+        record = pd.DataFrame([{col: values[col] for col in self.input_columns_}])
+        for col in self.numeric_columns_:
+            record[col] = pd.to_numeric(record[col], errors='coerce')
+        return self.transform(record)
+
+    def get_params(self):
+        """Fitted values in a JSON-friendly form"""
+        return {
+            'input_columns': self.input_columns_,
+            'feature_names': self.feature_names_,
+            'fill_values': {col: value if not isinstance(value, np.generic) else value.item()
+                            for col, value in self.fill_values_.items()},
+            'categories': self.categories_,
+            'encodings': self.encodings_,
+            'sparse': self.sparse_,
+            'scaled': self.means_ is not None
+        }
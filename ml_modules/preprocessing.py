@@ -2,21 +2,78 @@
 Data Preprocessing Module
 Handles data validation, cleaning, and preprocessing
 """
+import os
+import uuid
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler, LabelEncoder
-from sklearn.impute import SimpleImputer
+from config import Config
+from utils.row_hash import RowHashIndex, StreamingRowHashes, compute_row_hashes
+from utils.sketches import QuantileSketch
 
 class DataPreprocessor:
-    """Handle all data preprocessing tasks"""
+    """
+    Handle all data preprocessing tasks
     
-    def __init__(self, df):
-        self.df = df.copy()
-        self.original_df = df.copy()
+    lazy: instead of applying each step to a new copy of the frame, record
+          the steps in a plan and run them with execute() in one pass.
+          The input frame is only referenced, never copied; each column the
+          plan rewrites gets one new buffer and untouched columns are shared
+          with the input.
+    row_hashes: precomputed row hashes of df (see utils.row_hash), reused for
+                duplicate detection while the columns are unchanged
+    
+    For CSV files that do not fit in memory use from_csv(): the plan is
+    recorded the same way and execute_chunked(output_path) streams it
+    chunk by chunk from disk to disk.
+    """
+    
+    def __init__(self, df, lazy=False, row_hashes=None):
+        self.lazy = lazy
+        # Row hashes of the current frame, or None once a step changed its columns
+        self.row_hashes = row_hashes
+        self.original_df = df
+        self.df = df if lazy else df.copy()
         self.preprocessing_steps = []
+        # Track what the steps modify so column statistics can be updated incrementally
+        self.changed_columns = set()
+        self.rows_changed = False
+        # Values fitted by the steps (fill values, encodings, scaling), kept for reuse
+        self.fitted_params = {'fill_values': {}, 'categories': {}, 'label_classes': {}, 'scaling': {}}
+        # Recorded steps (lazy mode) and what running them produced
+        self.plan = []
+        self.executed = not lazy
+        self._plan_summary = None
+        # Source CSV in chunked mode
+        self.source_path = None
+        self.chunksize = None
+    
+    @classmethod
+    def from_csv(cls, path, chunksize=None):
+        """
+        Preprocess a CSV file out of core
+        
+        Statistics (means, medians via a quantile sketch, modes, category
+        vocabularies, scaling moments) are fitted over streamed chunks and
+        the transforms are then applied chunk by chunk, so memory depends on
+        the chunk size and the sketches rather than on the file size.
+        """
+        preprocessor = cls(None, lazy=True)
+        preprocessor.source_path = path
+        preprocessor.chunksize = chunksize or Config.PREPROCESS_CHUNK_SIZE
+        return preprocessor
+    
+    def _record(self, step, **params):
+        """Add a step to the plan (lazy mode)"""
+        if self.executed:
+            raise RuntimeError('Preprocessing plan was already executed')
+        self.plan.append((step, params))
+        return self
     
-    def validate_data(self):
-        """Validate the uploaded dataset"""
+    def validate_data(self, column_index=None):
+        """
+        Validate the uploaded dataset
+        column_index: the dataset's ColumnIndex, so the frame is not rescanned
+        """
         validation_results = {
             'is_valid': True,
             'errors': [],
@@ -34,12 +91,19 @@ class DataPreprocessor:
             validation_results['warnings'].append(f"Dataset has only {len(self.df)} rows. Minimum 10 rows recommended.")
         
         # Check for all NaN columns
-        all_nan_cols = self.df.columns[self.df.isnull().all()].tolist()
+        if column_index is not None:
+            all_nan_cols = [col for col in self.df.columns
+                            if column_index.null_count(col) == column_index.n_rows]
+        else:
+            all_nan_cols = self.df.columns[self.df.isnull().all()].tolist()
         if all_nan_cols:
             validation_results['warnings'].append(f"Columns with all missing values: {all_nan_cols}")
         
         # Check for duplicate rows
-        duplicate_count = self.df.duplicated().sum()
+        if column_index is not None:
+            duplicate_count = column_index.duplicate_rows
+        else:
+            duplicate_count = self._row_hash_index(self.df).count_duplicates(self.df)
         if duplicate_count > 0:
             validation_results['warnings'].append(f"Found {duplicate_count} duplicate rows")
         
@@ -51,6 +115,10 @@ class DataPreprocessor:
         strategy: 'mean', 'median', 'mode', 'drop'
         threshold: columns with missing ratio > threshold will be dropped
         """
+        from sklearn.impute import SimpleImputer
+        if self.lazy:
+            return self._record('missing_values', strategy=strategy, threshold=threshold)
+        
         missing_ratio = self.df.isnull().sum() / len(self.df)
         
         # Drop columns with too many missing values
@@ -60,15 +128,19 @@ class DataPreprocessor:
             self.preprocessing_steps.append(f"Dropped columns: {cols_to_drop} (>{threshold*100}% missing)")
         
         # Handle numeric columns
-        numeric_cols = self.df.select_dtypes(include=['int64', 'float64']).columns
+        numeric_cols = self.df.select_dtypes(include='number').columns
         if len(numeric_cols) > 0:
             if strategy == 'drop':
+                initial_rows = len(self.df)
                 self.df = self.df.dropna(subset=numeric_cols)
+                self.rows_changed = self.rows_changed or len(self.df) != initial_rows
                 self.preprocessing_steps.append(f"Dropped rows with missing numeric values")
             else:
                 imputer_strategy = strategy if strategy in ['mean', 'median'] else 'mean'
                 imputer = SimpleImputer(strategy=imputer_strategy)
                 self.df[numeric_cols] = imputer.fit_transform(self.df[numeric_cols])
+                self.changed_columns.update(numeric_cols)
+                self.fitted_params['fill_values'].update(zip(numeric_cols, imputer.statistics_.tolist()))
                 self.preprocessing_steps.append(f"Imputed numeric columns with {imputer_strategy}")
         
         # Handle categorical columns
@@ -76,21 +148,45 @@ class DataPreprocessor:
         if len(categorical_cols) > 0:
             imputer = SimpleImputer(strategy='most_frequent')
             self.df[categorical_cols] = imputer.fit_transform(self.df[categorical_cols])
+            self.changed_columns.update(categorical_cols)
+            self.fitted_params['fill_values'].update(zip(categorical_cols, imputer.statistics_.tolist()))
             self.preprocessing_steps.append(f"Imputed categorical columns with mode")
         
         return self.df
     
     def remove_duplicates(self):
         """Remove duplicate rows"""
-        initial_rows = len(self.df)
-        self.df = self.df.drop_duplicates()
-        removed = initial_rows - len(self.df)
+        if self.lazy:
+            return self._record('duplicates')
+        
+        row_index = self._row_hash_index(self.df)
+        duplicated = row_index.duplicate_mask(self.df)
+        removed = int(duplicated.sum())
         if removed > 0:
+            self.df = self.df[~duplicated]
+            self.rows_changed = True
             self.preprocessing_steps.append(f"Removed {removed} duplicate rows")
+        self.row_hashes = row_index.hashes[~duplicated]
         return self.df
     
+    def _row_hash_index(self, frame):
+        """
+        Row hash index of a frame, reusing self.row_hashes while they still
+        describe it: same columns as the input, none rewritten, same rows
+        """
+        unchanged = (self.row_hashes is not None and not self.changed_columns
+                     and list(frame.columns) == list(self.original_df.columns)
+                     and len(self.row_hashes) == len(frame))
+        if not unchanged:
+            self.row_hashes = compute_row_hashes(frame)
+        return RowHashIndex(self.row_hashes)
+    
     def encode_categorical(self, columns=None):
         """Encode categorical variables"""
+        from sklearn.preprocessing import LabelEncoder
+        if self.lazy:
+            return self._record('encode', columns=columns)
+        
         if columns is None:
             columns = self.df.select_dtypes(include=['object', 'category']).columns
         
@@ -101,34 +197,563 @@ class DataPreprocessor:
                 if unique_values <= 10:
                     # One-hot encoding
                     dummies = pd.get_dummies(self.df[col], prefix=col, drop_first=True)
+                    self.fitted_params['categories'][col] = [str(c)[len(col) + 1:] for c in dummies.columns]
                     self.df = pd.concat([self.df.drop(columns=[col]), dummies], axis=1)
+                    self.changed_columns.update(dummies.columns)
                     self.preprocessing_steps.append(f"One-hot encoded: {col}")
                 else:
                     # Label encoding
                     le = LabelEncoder()
                     self.df[col] = le.fit_transform(self.df[col].astype(str))
+                    self.fitted_params['label_classes'][col] = le.classes_.tolist()
+                    self.changed_columns.add(col)
                     self.preprocessing_steps.append(f"Label encoded: {col}")
         
         return self.df
     
     def scale_features(self, columns=None, method='standard'):
         """Scale numeric features"""
+        from sklearn.preprocessing import StandardScaler
+        if self.lazy:
+            return self._record('scale', columns=columns, method=method)
+        
         if columns is None:
-            columns = self.df.select_dtypes(include=['int64', 'float64']).columns
+            columns = self.df.select_dtypes(include='number').columns
         
         if len(columns) > 0:
             scaler = StandardScaler()
             self.df[columns] = scaler.fit_transform(self.df[columns])
+            self.fitted_params['scaling'].update({
+                col: {'mean': float(mean), 'scale': float(scale)}
+                for col, mean, scale in zip(columns, scaler.mean_, scaler.scale_)
+            })
+            self.changed_columns.update(columns)
             self.preprocessing_steps.append(f"Scaled {len(columns)} numeric columns using {method} scaling")
         
         return self.df
     
+    def execute(self):
+        """
+        Run the recorded plan and return the processed frame
+        
+        Steps run in order over a dict of columns: row filters (dropping
+        rows with missing values, removing duplicates) only narrow a row
+        mask, statistics are fitted on the rows still selected, and a
+        column is copied the first time a step rewrites it. The output
+        frame is assembled once at the end.
+        """
+        if self.executed:
+            return self.df
+        if self.source_path is not None:
+            raise ValueError('Chunked preprocessing writes to disk: use execute_chunked(output_path)')
+        
+        source = self.original_df
+        self._columns = {col: source[col] for col in source.columns}
+        self._owned = set()
+        self._mask = None
+        self._null_counts = {col: int(series.isna().sum()) for col, series in self._columns.items()}
+        self._hashes = self.row_hashes
+        self._hashes_state = (tuple(self._columns), frozenset())
+        missing_before = sum(self._null_counts.values())
+        
+        runners = {
+            'missing_values': self._run_missing_values,
+            'duplicates': self._run_duplicates,
+            'encode': self._run_encode,
+            'scale': self._run_scale
+        }
+        for step, params in self.plan:
+            runners[step](**params)
+        
+        frame = pd.DataFrame(self._columns, index=source.index, copy=False)
+        self.row_hashes = None
+        if self._hashes is not None and self._hashes_state == (tuple(self._columns), frozenset(self.changed_columns)):
+            # Hashes of the output rows come for free while the columns are unchanged
+            self.row_hashes = self._hashes if self._mask is None else self._hashes[self._mask]
+        if self._mask is not None:
+            frame = frame[self._mask]
+        self.df = frame
+        self._plan_summary = {
+            'original_shape': source.shape,
+            'processed_shape': frame.shape,
+            'missing_values_before': missing_before,
+            'missing_values_after': sum(self._null_counts.values())
+        }
+        self.executed = True
+        del self._columns, self._owned, self._mask, self._null_counts, self._hashes, self._hashes_state
+        return self.df
+    
+    def _visible(self, col):
+        """Values of a column in the rows still selected by the plan"""
+        series = self._columns[col]
+        return series if self._mask is None else series[self._mask]
+    
+    def _writable(self, col, dtype=None):
+        """Column buffer that the plan owns and may modify in place"""
+        series = self._columns[col]
+        if col not in self._owned or (dtype is not None and series.dtype != dtype):
+            series = series.astype(dtype) if dtype is not None else series.copy()
+            self._columns[col] = series
+            self._owned.add(col)
+        return series
+    
+    @staticmethod
+    def _column_kind(series):
+        """'numeric', 'categorical' or None (booleans, datetimes) for a column"""
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            return 'numeric'
+        if series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype):
+            return 'categorical'
+        return None
+    
+    def _kind_columns(self, kind):
+        """Current columns of a kind ('numeric' or 'categorical')"""
+        return [col for col, series in self._columns.items() if self._column_kind(series) == kind]
+    
+    def _narrow_rows(self, keep):
+        """Drop rows from the plan's selection and recount nulls in the remaining ones"""
+        previous = len(self.df) if self._mask is None else int(self._mask.sum())
+        self._mask = keep if self._mask is None else self._mask & keep
+        if int(self._mask.sum()) != previous:
+            self.rows_changed = True
+            for col, count in self._null_counts.items():
+                if count:
+                    self._null_counts[col] = int(self._visible(col).isna().sum())
+        return previous - int(self._mask.sum())
+    
+    def _run_missing_values(self, strategy, threshold):
+        n_rows = len(self.df) if self._mask is None else int(self._mask.sum())
+        cols_to_drop = [col for col in self._columns
+                        if n_rows and self._null_counts[col] / n_rows > threshold]
+        if cols_to_drop:
+            for col in cols_to_drop:
+                del self._columns[col], self._null_counts[col]
+            self.preprocessing_steps.append(f"Dropped columns: {cols_to_drop} (>{threshold*100}% missing)")
+        
+        numeric_cols = self._kind_columns('numeric')
+        if numeric_cols:
+            if strategy == 'drop':
+                missing = [col for col in numeric_cols if self._null_counts[col]]
+                if missing:
+                    keep = np.ones(len(self.df), dtype=bool)
+                    for col in missing:
+                        keep &= self._columns[col].notna().to_numpy()
+                    self._narrow_rows(keep)
+                self.preprocessing_steps.append(f"Dropped rows with missing numeric values")
+            else:
+                imputer_strategy = strategy if strategy in ['mean', 'median'] else 'mean'
+                for col in numeric_cols:
+                    if not self._null_counts[col]:
+                        continue
+                    visible = self._visible(col)
+                    fill_value = visible.mean() if imputer_strategy == 'mean' else visible.median()
+                    if pd.isna(fill_value):
+                        continue
+                    self._writable(col, np.float64).fillna(fill_value, inplace=True)
+                    self.fitted_params['fill_values'][col] = float(fill_value)
+                    self._null_counts[col] = 0
+                    self.changed_columns.add(col)
+                self.preprocessing_steps.append(f"Imputed numeric columns with {imputer_strategy}")
+        
+        categorical_cols = self._kind_columns('categorical')
+        if categorical_cols:
+            for col in categorical_cols:
+                if not self._null_counts[col]:
+                    continue
+                modes = self._visible(col).mode()
+                if len(modes) == 0:
+                    continue
+                self._writable(col).fillna(modes.iloc[0], inplace=True)
+                self.fitted_params['fill_values'][col] = modes.iloc[0]
+                self._null_counts[col] = 0
+                self.changed_columns.add(col)
+            self.preprocessing_steps.append(f"Imputed categorical columns with mode")
+    
+    def _plan_row_hashes(self, frame):
+        """Row hashes of the plan's columns over all input rows, reused while no column was rewritten"""
+        state = (tuple(self._columns), frozenset(self.changed_columns))
+        if self._hashes is None or self._hashes_state != state:
+            self._hashes = compute_row_hashes(frame)
+            self._hashes_state = state
+        return self._hashes
+    
+    def _run_duplicates(self):
+        frame = pd.DataFrame(self._columns, copy=False)
+        hashes = self._plan_row_hashes(frame)
+        if self._mask is None:
+            duplicated = RowHashIndex(hashes).duplicate_mask(frame)
+        else:
+            duplicated = np.zeros(len(frame), dtype=bool)
+            duplicated[self._mask] = RowHashIndex(hashes[self._mask]).duplicate_mask(frame[self._mask])
+        if duplicated.any():
+            removed = self._narrow_rows(~duplicated)
+            self.preprocessing_steps.append(f"Removed {removed} duplicate rows")
+    
+    def _run_encode(self, columns):
+        if columns is None:
+            columns = self._kind_columns('categorical')
+        
+        for col in columns:
+            if col not in self._columns:
+                continue
+            series = self._columns[col]
+            visible = self._visible(col)
+            if visible.nunique() <= 10:
+                # Categories come from the selected rows only, as if they had been dropped first
+                if not isinstance(series.dtype, pd.CategoricalDtype):
+                    series = pd.Series(pd.Categorical(series, categories=np.sort(visible.dropna().unique())),
+                                       index=series.index)
+                dummies = pd.get_dummies(series, prefix=col, drop_first=True)
+                self.fitted_params['categories'][col] = series.cat.categories[1:].tolist()
+                del self._columns[col], self._null_counts[col]
+                self._owned.discard(col)
+                for dummy in dummies.columns:
+                    self._columns[dummy] = dummies[dummy]
+                    self._owned.add(dummy)
+                    self._null_counts[dummy] = 0
+                self.changed_columns.update(dummies.columns)
+                self.preprocessing_steps.append(f"One-hot encoded: {col}")
+            else:
+                classes = np.unique(visible.astype(str).to_numpy())
+                codes = np.searchsorted(classes, series.astype(str).to_numpy())
+                self.fitted_params['label_classes'][col] = classes.tolist()
+                self._columns[col] = pd.Series(codes, index=series.index, name=col)
+                self._owned.add(col)
+                self._null_counts[col] = 0
+                self.changed_columns.add(col)
+                self.preprocessing_steps.append(f"Label encoded: {col}")
+    
+    def _run_scale(self, columns, method):
+        if columns is None:
+            columns = self._kind_columns('numeric')
+        
+        if len(columns) > 0:
+            for col in columns:
+                visible = self._visible(col).to_numpy(dtype=np.float64, na_value=np.nan)
+                mean = np.nanmean(visible) if len(visible) else 0.0
+                std = np.nanstd(visible) if len(visible) else 1.0
+                values = self._writable(col, np.float64).to_numpy()
+                values -= mean
+                values /= std if std > 0 else 1.0
+                self.fitted_params['scaling'][col] = {'mean': float(mean), 'scale': float(std if std > 0 else 1.0)}
+                self.changed_columns.add(col)
+            self.preprocessing_steps.append(f"Scaled {len(columns)} numeric columns using {method} scaling")
+    
+    def execute_chunked(self, output_path):
+        """
+        Run the recorded plan over the CSV given to from_csv(), writing the
+        processed rows to output_path (CSV)
+        
+        The file is streamed once to settle a dtype per column, once per
+        step that fits statistics (twice for missing values with the 'drop'
+        strategy, whose modes come from the rows kept), and once to apply
+        every step and write the output. Each pass replays the already
+        fitted steps on its chunks, so statistics see the same rows as in
+        lazy mode. Medians are exact up to Config.APPROX_QUANTILE_SAMPLE_SIZE
+        values and estimated by a quantile sketch beyond that; duplicate
+        rows are found by row hash (see StreamingRowHashes).
+        
+        Returns:
+            output_path
+        """
+        if self.source_path is None:
+            raise ValueError('No source file: create the preprocessor with from_csv()')
+        if self.executed:
+            return output_path
+        
+        n_rows, n_columns, missing_before = self._scan_schema()
+        self._chunk_fitted = [None] * len(self.plan)
+        for index, (step, params) in enumerate(self.plan):
+            fit = {
+                'missing_values': self._fit_chunked_missing_values,
+                'encode': self._fit_chunked_encode,
+                'scale': self._fit_chunked_scale
+            }.get(step)
+            if fit is not None:
+                fit(index, **params)
+        
+        counts = [0] * len(self.plan)
+        rows_written, columns_written, missing_after = 0, 0, 0
+        tmp_path = f'{output_path}.{uuid.uuid4().hex}.tmp'
+        try:
+            for position, chunk in enumerate(self._chunks(len(self.plan), counts)):
+                chunk.to_csv(tmp_path, mode='w' if position == 0 else 'a', header=position == 0, index=False)
+                rows_written += len(chunk)
+                columns_written = chunk.shape[1]
+                missing_after += int(chunk.isna().sum().sum())
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        
+        for index, (step, params) in enumerate(self.plan):
+            self._record_chunked_step(index, step, params, counts[index])
+        self.rows_changed = rows_written != n_rows
+        self._plan_summary = {
+            'original_shape': (n_rows, n_columns),
+            'processed_shape': (rows_written, columns_written),
+            'missing_values_before': missing_before,
+            'missing_values_after': missing_after
+        }
+        self.executed = True
+        del self._chunk_fitted, self._chunk_dtypes
+        return output_path
+    
+    def _scan_schema(self):
+        """
+        First pass over the source: one dtype per column for every chunk
+        (pandas infers dtypes per chunk), plus row and missing value counts
+        """
+        kinds, columns = {}, []
+        n_rows, missing = 0, 0
+        for chunk in pd.read_csv(self.source_path, chunksize=self.chunksize):
+            columns = list(chunk.columns)
+            n_rows += len(chunk)
+            missing += int(chunk.isna().sum().sum())
+            for col in columns:
+                series = chunk[col]
+                if pd.api.types.is_bool_dtype(series):
+                    kind = 'bool'
+                elif pd.api.types.is_integer_dtype(series):
+                    kind = 'int'
+                elif pd.api.types.is_float_dtype(series):
+                    kind = 'float'
+                else:
+                    kind = 'object'
+                kinds.setdefault(col, set()).add(kind)
+        
+        self._chunk_dtypes = {}
+        for col, seen in kinds.items():
+            if seen == {'int'}:
+                self._chunk_dtypes[col] = np.int64
+            elif seen <= {'int', 'float'}:
+                self._chunk_dtypes[col] = np.float64
+            elif seen == {'bool'}:
+                self._chunk_dtypes[col] = bool
+            else:
+                self._chunk_dtypes[col] = object
+        return n_rows, len(columns), missing
+    
+    def _chunks(self, n_steps, counts=None):
+        """
+        Stream the source with the first n_steps fitted steps applied
+        counts: per-step list incremented with the rows each step removes
+        """
+        seen = {index: StreamingRowHashes() for index, (step, _) in enumerate(self.plan[:n_steps])
+                if step == 'duplicates'}
+        for chunk in pd.read_csv(self.source_path, chunksize=self.chunksize, dtype=self._chunk_dtypes):
+            for index, (step, _) in enumerate(self.plan[:n_steps]):
+                rows = len(chunk)
+                chunk = self._apply_chunked_step(chunk, step, self._chunk_fitted[index], seen.get(index))
+                if counts is not None:
+                    counts[index] += rows - len(chunk)
+            yield chunk
+    
+    def _apply_chunked_step(self, chunk, step, fitted, seen=None):
+        """Apply one fitted step to a chunk"""
+        if step == 'missing_values':
+            chunk = chunk.drop(columns=fitted['drop_columns'])
+            if fitted.get('drop_rows'):
+                chunk = chunk.dropna(subset=fitted['drop_rows'])
+            for col, value in fitted.get('fill_values', {}).items():
+                if col in fitted['numeric_columns']:
+                    chunk[col] = chunk[col].astype(np.float64).fillna(value)
+                else:
+                    chunk[col] = chunk[col].fillna(value)
+        elif step == 'duplicates':
+            chunk = chunk[~seen.add(compute_row_hashes(chunk))]
+        elif step == 'encode':
+            for col, (encoding, values) in fitted.items():
+                if encoding == 'onehot':
+                    series = pd.Series(pd.Categorical(chunk[col], categories=values), index=chunk.index)
+                    dummies = pd.get_dummies(series, prefix=col, drop_first=True)
+                    chunk = pd.concat([chunk.drop(columns=[col]), dummies], axis=1)
+                else:
+                    chunk[col] = np.searchsorted(values, chunk[col].astype(str).to_numpy())
+        elif step == 'scale':
+            for col, (mean, scale) in fitted.items():
+                chunk[col] = (chunk[col].astype(np.float64) - mean) / scale
+        return chunk
+    
+    def _fit_chunked_missing_values(self, index, strategy, threshold):
+        n_rows, null_counts = 0, {}
+        kinds, sums, counts, sketches, modes = {}, {}, {}, {}, {}
+        for chunk in self._chunks(index):
+            n_rows += len(chunk)
+            for col in chunk.columns:
+                series = chunk[col]
+                null_counts[col] = null_counts.get(col, 0) + int(series.isna().sum())
+                kinds.setdefault(col, self._column_kind(series))
+                if kinds[col] == 'numeric':
+                    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+                    values = values[~np.isnan(values)]
+                    sums[col] = sums.get(col, 0.0) + float(values.sum())
+                    counts[col] = counts.get(col, 0) + len(values)
+                    if strategy == 'median':
+                        sketches.setdefault(col, QuantileSketch(size=Config.APPROX_QUANTILE_SAMPLE_SIZE)).add(values)
+                elif kinds[col] == 'categorical' and strategy != 'drop':
+                    modes[col] = self._count_values(modes.get(col), series)
+        
+        drop_columns = [col for col in null_counts if n_rows and null_counts[col] / n_rows > threshold]
+        numeric_cols = [col for col, kind in kinds.items() if kind == 'numeric' and col not in drop_columns]
+        categorical_cols = [col for col, kind in kinds.items() if kind == 'categorical' and col not in drop_columns]
+        fitted = {
+            'strategy': strategy,
+            'threshold': threshold,
+            'drop_columns': drop_columns,
+            'numeric_columns': numeric_cols,
+            'categorical_columns': categorical_cols,
+            'fill_values': {}
+        }
+        if strategy == 'drop':
+            fitted['drop_rows'] = [col for col in numeric_cols if null_counts[col]]
+        else:
+            for col in numeric_cols:
+                if not null_counts[col] or not counts[col]:
+                    continue
+                if strategy == 'median':
+                    fitted['fill_values'][col] = sketches[col].quantile(0.5)
+                else:
+                    fitted['fill_values'][col] = sums[col] / counts[col]
+        self._chunk_fitted[index] = fitted
+        
+        filled_categorical = [col for col in categorical_cols if null_counts[col]]
+        if strategy == 'drop' and filled_categorical:
+            # Modes come from the rows left after dropping, which needs another pass
+            for chunk in self._chunks(index + 1):
+                for col in filled_categorical:
+                    modes[col] = self._count_values(modes.get(col), chunk[col])
+        for col in filled_categorical:
+            mode = self._mode(modes.get(col))
+            if mode is not None:
+                fitted['fill_values'][col] = mode
+    
+    @staticmethod
+    def _count_values(counts, series):
+        """
+        Merge the value counts of a chunk into running counts
+        
+        At most Config.PREPROCESS_MODE_COUNTERS values are kept (Misra-Gries):
+        beyond that every count is lowered by the smallest one kept, which
+        bounds memory and still keeps any value frequent enough to be a mode.
+        """
+        chunk_counts = series.value_counts()
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+        if len(counts) > Config.PREPROCESS_MODE_COUNTERS:
+            counts = counts.nlargest(Config.PREPROCESS_MODE_COUNTERS + 1)
+            counts = (counts - counts.iloc[-1])[:-1]
+        return counts
+    
+    @staticmethod
+    def _mode(counts):
+        """Most frequent value of running counts (the smallest one on ties, like Series.mode)"""
+        if counts is None or len(counts) == 0:
+            return None
+        return counts[counts == counts.max()].sort_index().index[0]
+    
+    def _fit_chunked_encode(self, index, columns):
+        selected, raw_values, str_values = None, {}, {}
+        for chunk in self._chunks(index):
+            if selected is None:
+                if columns is None:
+                    selected = [col for col in chunk.columns if self._column_kind(chunk[col]) == 'categorical']
+                else:
+                    selected = [col for col in columns if col in chunk.columns]
+            for col in selected:
+                series = chunk[col]
+                # Distinct values are only needed up to 11 to choose the encoding
+                if len(raw_values.setdefault(col, set())) <= 10:
+                    raw_values[col].update(series.dropna().unique())
+                str_values.setdefault(col, set()).update(series.astype(str).unique())
+        
+        fitted = {}
+        for col in selected or []:
+            if len(raw_values[col]) <= 10:
+                fitted[col] = ('onehot', np.sort(list(raw_values[col])).tolist())
+            else:
+                fitted[col] = ('label', np.sort(list(str_values[col])))
+        self._chunk_fitted[index] = fitted
+    
+    def _fit_chunked_scale(self, index, columns, method):
+        selected, moments = None, {}
+        for chunk in self._chunks(index):
+            if selected is None:
+                selected = columns if columns is not None else \
+                    [col for col in chunk.columns if self._column_kind(chunk[col]) == 'numeric']
+            for col in selected:
+                values = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                values = values[~np.isnan(values)]
+                if len(values) == 0:
+                    continue
+                # Combine count, mean and sum of squared deviations across chunks (Chan et al.)
+                n_b, mean_b = len(values), float(values.mean())
+                m2_b = float(np.square(values - mean_b).sum())
+                n_a, mean_a, m2_a = moments.get(col, (0, 0.0, 0.0))
+                n = n_a + n_b
+                delta = mean_b - mean_a
+                moments[col] = (n, mean_a + delta * n_b / n, m2_a + m2_b + delta ** 2 * n_a * n_b / n)
+        
+        fitted = {}
+        for col in selected or []:
+            n, mean, m2 = moments.get(col, (0, 0.0, 0.0))
+            std = np.sqrt(m2 / n) if n else 1.0
+            fitted[col] = (mean, std if std > 0 else 1.0)
+        self._chunk_fitted[index] = fitted
+    
+    def _record_chunked_step(self, index, step, params, removed_rows):
+        """Fill in preprocessing_steps, fitted_params and changed_columns for a step run in chunks"""
+        fitted = self._chunk_fitted[index]
+        if step == 'missing_values':
+            if fitted['drop_columns']:
+                self.preprocessing_steps.append(
+                    f"Dropped columns: {fitted['drop_columns']} (>{fitted['threshold']*100}% missing)")
+            if fitted['numeric_columns']:
+                if fitted['strategy'] == 'drop':
+                    self.preprocessing_steps.append(f"Dropped rows with missing numeric values")
+                else:
+                    imputer_strategy = fitted['strategy'] if fitted['strategy'] in ['mean', 'median'] else 'mean'
+                    self.preprocessing_steps.append(f"Imputed numeric columns with {imputer_strategy}")
+            if fitted['categorical_columns']:
+                self.preprocessing_steps.append(f"Imputed categorical columns with mode")
+            self.fitted_params['fill_values'].update(fitted['fill_values'])
+            self.changed_columns.update(fitted['fill_values'])
+        elif step == 'duplicates':
+            if removed_rows:
+                self.preprocessing_steps.append(f"Removed {removed_rows} duplicate rows")
+        elif step == 'encode':
+            for col, (encoding, values) in fitted.items():
+                if encoding == 'onehot':
+                    self.fitted_params['categories'][col] = values[1:]
+                    self.changed_columns.update(f'{col}_{value}' for value in values[1:])
+                    self.preprocessing_steps.append(f"One-hot encoded: {col}")
+                else:
+                    self.fitted_params['label_classes'][col] = values.tolist()
+                    self.changed_columns.add(col)
+                    self.preprocessing_steps.append(f"Label encoded: {col}")
+        elif step == 'scale':
+            if fitted:
+                self.fitted_params['scaling'].update(
+                    {col: {'mean': float(mean), 'scale': float(scale)} for col, (mean, scale) in fitted.items()})
+                self.changed_columns.update(fitted)
+                self.preprocessing_steps.append(f"Scaled {len(fitted)} numeric columns using {params['method']} scaling")
+    
     def get_preprocessing_summary(self):
         """Get summary of preprocessing steps"""
+        if self.lazy:
+            # Computed while the plan ran, so neither frame is scanned again
+            if self.source_path is None:
+                self.execute()
+            elif not self.executed:
+                raise ValueError('Run execute_chunked() first')
+            return {
+                **self._plan_summary,
+                'steps': self.preprocessing_steps
+            }
+        
         return {
             'original_shape': self.original_df.shape,
             'processed_shape': self.df.shape,
             'steps': self.preprocessing_steps,
-            'missing_values_before': self.original_df.isnull().sum().sum(),
-            'missing_values_after': self.df.isnull().sum().sum()
+            'missing_values_before': int(self.original_df.isnull().sum().sum()),
+            'missing_values_after': int(self.df.isnull().sum().sum())
         }
@@ -2,40 +2,57 @@
 Regression Algorithms Module
 Implements various regression algorithms
 """
+import copy
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression, Ridge, Lasso
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from scipy import sparse as sp
 from ml_modules.visualization import DataVisualizer
+from ml_modules.pipeline import take_rows
 
 class RegressionModel:
     """Handle regression tasks"""
     
-    def __init__(self, X, y, test_size=0.2, random_state=42):
+    def __init__(self, X, y, test_size=0.2, random_state=42, pipeline=None, feature_names=None,
+                 split_indices=None):
+        # X is a DataFrame, an array, or a scipy sparse matrix whose column names are in feature_names
         self.X = X
         self.y = y
+        # Fitted FeaturePipeline that produced X, used to transform raw prediction inputs
+        self.pipeline = pipeline
+        if feature_names is not None:
+            self.feature_names = list(feature_names)
+        elif hasattr(self.X, 'columns'):
+            self.feature_names = self.X.columns.tolist()
+        else:
+            self.feature_names = [f'Feature_{i}' for i in range(self.X.shape[1])]
         self.test_size = test_size
         self.random_state = random_state
+        # Precomputed (train, test) row positions, e.g. from the feature matrix cache
+        self.split_indices = split_indices
         self.X_train, self.X_test, self.y_train, self.y_test = None, None, None, None
         self.model = None
         self.predictions = None
         
     def split_data(self):
         """Split data into train and test sets"""
-        self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
-            self.X, self.y, test_size=self.test_size, random_state=self.random_state
-        )
+        from sklearn.model_selection import train_test_split
+        if self.split_indices is not None:
+            train_idx, test_idx = self.split_indices
+            self.X_train, self.X_test = take_rows(self.X, train_idx), take_rows(self.X, test_idx)
+            self.y_train, self.y_test = take_rows(self.y, train_idx), take_rows(self.y, test_idx)
+        else:
+            self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
+                self.X, self.y, test_size=self.test_size, random_state=self.random_state
+            )
         return {
-            'train_size': len(self.X_train),
-            'test_size': len(self.X_test),
+            'train_size': self.X_train.shape[0],
+            'test_size': self.X_test.shape[0],
             'feature_count': self.X_train.shape[1]
         }
     
     def linear_regression(self):
         """Train Linear Regression model"""
+        from sklearn.linear_model import LinearRegression
         if self.X_train is None:
             self.split_data()
         
@@ -45,11 +62,7 @@ class RegressionModel:
         
         results = self._calculate_metrics()
         
-        # Get feature names safely
-        if hasattr(self.X, 'columns'):
-            feature_names = self.X.columns.tolist()
-        else:
-            feature_names = [f'Feature_{i}' for i in range(self.X.shape[1])]
+        feature_names = self.feature_names
         
         results['coefficients'] = dict(zip(feature_names, self.model.coef_))
         results['intercept'] = float(self.model.intercept_)
@@ -65,26 +78,24 @@ class RegressionModel:
         results['equation_formatted'] = f"y = {results['equation']}"
         
         # Actual vs Predicted + Residuals plot
-        results['prediction_plot'] = DataVisualizer.plot_regression_results(
+        results['prediction_plot'] = DataVisualizer.submit('plot_regression_results',
             self.y_test, self.predictions, 'Linear Regression'
         )
         
         # Feature importance based on absolute coefficients
         feature_importance = {col: abs(coef) for col, coef in results['coefficients'].items()}
-        results['feature_importance_plot'] = DataVisualizer.plot_feature_importance(feature_importance)
+        results['feature_importance_plot'] = DataVisualizer.submit('plot_feature_importance', feature_importance)
         
         return results
     
     def polynomial_regression(self, degree=2):
         """Train Polynomial Regression model"""
+        from sklearn.linear_model import LinearRegression
+        from sklearn.preprocessing import PolynomialFeatures
         if self.X_train is None:
             self.split_data()
         
-        # Get feature names safely
-        if hasattr(self.X, 'columns'):
-            feature_names = self.X.columns.tolist()
-        else:
-            feature_names = [f'Feature_{i}' for i in range(self.X.shape[1])]
+        feature_names = self.feature_names
         
         # Create polynomial features
         poly = PolynomialFeatures(degree=degree)
@@ -104,7 +115,7 @@ class RegressionModel:
         results['algorithm'] = f'Polynomial Regression (degree={degree})'
         
         # Actual vs Predicted + Residuals plot
-        results['prediction_plot'] = DataVisualizer.plot_regression_results(
+        results['prediction_plot'] = DataVisualizer.submit('plot_regression_results',
             self.y_test, self.predictions, f'Polynomial Regression (degree={degree})'
         )
         
@@ -112,14 +123,11 @@ class RegressionModel:
     
     def random_forest_regression(self, n_estimators=100, max_depth=None):
         """Train Random Forest Regression model"""
+        from sklearn.ensemble import RandomForestRegressor
         if self.X_train is None:
             self.split_data()
         
-        # Get feature names safely
-        if hasattr(self.X, 'columns'):
-            feature_names = self.X.columns.tolist()
-        else:
-            feature_names = [f'Feature_{i}' for i in range(self.X.shape[1])]
+        feature_names = self.feature_names
         
         self.model = RandomForestRegressor(
             n_estimators=n_estimators,
@@ -134,27 +142,24 @@ class RegressionModel:
         results['algorithm'] = 'Random Forest Regression'
         
         # Actual vs Predicted + Residuals plot
-        results['prediction_plot'] = DataVisualizer.plot_regression_results(
+        results['prediction_plot'] = DataVisualizer.submit('plot_regression_results',
             self.y_test, self.predictions, 'Random Forest Regression'
         )
         
         # Feature importance
         feature_importance = dict(zip(feature_names, self.model.feature_importances_))
-        results['feature_importance_plot'] = DataVisualizer.plot_feature_importance(feature_importance)
+        results['feature_importance_plot'] = DataVisualizer.submit('plot_feature_importance', feature_importance)
         results['feature_importance'] = feature_importance
         
         return results
     
     def gradient_boosting_regression(self, n_estimators=100, learning_rate=0.1):
         """Train Gradient Boosting Regression model"""
+        from sklearn.ensemble import GradientBoostingRegressor
         if self.X_train is None:
             self.split_data()
         
-        # Get feature names safely
-        if hasattr(self.X, 'columns'):
-            feature_names = self.X.columns.tolist()
-        else:
-            feature_names = [f'Feature_{i}' for i in range(self.X.shape[1])]
+        feature_names = self.feature_names
         
         self.model = GradientBoostingRegressor(
             n_estimators=n_estimators,
@@ -170,19 +175,20 @@ class RegressionModel:
         results['algorithm'] = 'Gradient Boosting Regression'
         
         # Actual vs Predicted + Residuals plot
-        results['prediction_plot'] = DataVisualizer.plot_regression_results(
+        results['prediction_plot'] = DataVisualizer.submit('plot_regression_results',
             self.y_test, self.predictions, 'Gradient Boosting Regression'
         )
         
         # Feature importance
         feature_importance = dict(zip(feature_names, self.model.feature_importances_))
-        results['feature_importance_plot'] = DataVisualizer.plot_feature_importance(feature_importance)
+        results['feature_importance_plot'] = DataVisualizer.submit('plot_feature_importance', feature_importance)
         results['feature_importance'] = feature_importance
         
         return results
     
     def _calculate_metrics(self):
         """Calculate regression metrics"""
+        from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
         mae = mean_absolute_error(self.y_test, self.predictions)
         mse = mean_squared_error(self.y_test, self.predictions)
         rmse = np.sqrt(mse)
@@ -199,12 +205,24 @@ class RegressionModel:
             }
         }
     
+    def for_prediction(self):
+        """Copy of the trained model without its training data, for the model registry"""
+        if self.model is None:
+            raise ValueError("Model not trained yet. Train a model first.")
+        slim = copy.copy(self)
+        # No rows, but the same layout (frame columns or sparse width) for predict_single
+        slim.X = take_rows(self.X, [])
+        slim.y = slim.X_train = slim.X_test = slim.y_train = slim.y_test = None
+        slim.predictions = slim.split_indices = None
+        return slim
+    
     def predict_single(self, input_values):
         """
         Predict target value for single input
         
         Args:
-            input_values: dict or list/array of feature values
+            input_values: dict or list/array of feature values; with a pipeline,
+                          a dict of raw dataset column values
         
         Returns:
             dict with prediction and feature details
@@ -212,14 +230,13 @@ class RegressionModel:
         if self.model is None:
             raise ValueError("Model not trained yet. Train a model first.")
         
-        # Get feature names
-        if hasattr(self.X, 'columns'):
-            feature_names = self.X.columns.tolist()
-        else:
-            feature_names = [f'Feature_{i}' for i in range(self.X.shape[1])]
+        feature_names = self.feature_names
         
         # Convert input to proper format
-        if isinstance(input_values, dict):
+        if isinstance(input_values, dict) and self.pipeline is not None:
+            # Raw column values: encode them exactly like the training data
+            input_array = self.pipeline.transform_record(input_values)
+        elif isinstance(input_values, dict):
             # Ensure all features are present
             input_array = []
             for feature in feature_names:
@@ -230,14 +247,29 @@ class RegressionModel:
         else:
             input_array = np.array([input_values])
         
+        if sp.issparse(input_array):
+            model_input = input_array
+            input_features = input_values
+        else:
+            input_array = np.asarray(input_array, dtype=np.float64)
+            input_features = dict(zip(feature_names, input_array[0]))
+            if sp.issparse(self.X):
+                model_input = sp.csr_matrix(input_array)
+            elif hasattr(self.X, 'columns'):
+                # Same feature names as the training frame
+                model_input = pd.DataFrame(input_array, columns=feature_names)
+            else:
+                model_input = input_array
+        
         # Check if we need polynomial transformation
         if hasattr(self, 'poly_transformer'):
-            input_array = self.poly_transformer.transform(input_array)
+            model_input = self.poly_transformer.transform(model_input)
+            input_features = input_values
         
         # Make prediction
-        prediction = self.model.predict(input_array)[0]
+        prediction = self.model.predict(model_input)[0]
         
         return {
             'prediction': round(float(prediction), 4),
-            'input_features': dict(zip(feature_names, input_array[0])) if not hasattr(self, 'poly_transformer') else input_values
+            'input_features': input_features
         }
@@ -0,0 +1,110 @@
+"""
+Training Module
+Train the model of an ML request, on the request thread or in a background job process
+"""
+from ml_modules.visualization import DataVisualizer
+from ml_modules.regression import RegressionModel
+from ml_modules.classification import ClassificationModel
+from ml_modules.clustering import ClusteringModel
+from ml_modules.dimensionality import DimensionalityReduction
+
+# task -> algorithm -> callable(model, request data) returning the results dict
+ALGORITHMS = {
+    'regression': {
+        'linear': lambda model, data: model.linear_regression()
+    },
+    'classification': {
+        'decision_tree': lambda model, data: model.decision_tree(max_depth=data.get('max_depth')),
+        'svm': lambda model, data: model.support_vector_machine(kernel=data.get('kernel', 'rbf'),
+                                                                C=data.get('C', 1.0)),
+        'random_forest': lambda model, data: model.random_forest(n_estimators=data.get('n_estimators', 100)),
+        'adaboost': lambda model, data: model.adaboost(data.get('n_estimators', 50),
+                                                       data.get('learning_rate', 1.0)),
+        'gradient_boosting': lambda model, data: model.gradient_boosting(data.get('n_estimators', 100),
+                                                                         data.get('learning_rate', 0.1))
+    },
+    'clustering': {
+        'kmeans': lambda model, data: model.kmeans(n_clusters=data.get('n_clusters', 3)),
+        'kmeans_elbow': lambda model, data: model.kmeans_elbow(k_range=range(2, data.get('max_k', 11))),
+        'dbscan': lambda model, data: model.dbscan(eps=data.get('eps', 0.5),
+                                                   min_samples=data.get('min_samples', 5))
+    },
+    'dimensionality': {
+        'pca': lambda model, data: model.pca_analysis(n_components=data.get('n_components')),
+        'svd': lambda model, data: model.svd_analysis(n_components=data.get('n_components'))
+    }
+}
+
+
+# Set by the app (and in job processes) to a utils.model_registry.ModelRegistry;
+# trained regression and classification models are registered there for predictions
+model_registry = None
+
+
+def is_supported(task, algorithm):
+    return algorithm in ALGORITHMS.get(task, {})
+
+
+def init_job_worker(plot_folder, model_folder=None):
+    """
+    Set up a job process: plots are rendered in the process itself and stored
+    in the app's plot store; models go to the app's model registry folder
+    """
+    global model_registry
+    from utils.plot_store import PlotStore
+    from utils.model_registry import ModelRegistry
+    DataVisualizer.render_workers = 0
+    DataVisualizer.plot_store = PlotStore(plot_folder) if plot_folder else None
+    model_registry = ModelRegistry(model_folder) if model_folder else None
+
+
+def _load_columns(source):
+    """Columns to model: a DataFrame, or (dataset ID, columns) of a stored dataset"""
+    if isinstance(source, tuple):
+        from utils.dataset_store import DatasetStore
+        dataset_id, columns = source
+        # Memory-mapped, so a job process does not need the frame sent over a pipe
+        return DatasetStore().load(dataset_id)[columns]
+    return source
+
+
+def train(task, algorithm, data, X, y=None, pipeline=None, split=None, test_size=0.2, random_state=42,
+          model_key=None):
+    """
+    Train a model for a request and return its results, with plots rendered
+
+    task: 'regression', 'classification', 'clustering' or 'dimensionality'
+    data: the request's JSON, read for hyperparameters
+    X: encoded features for regression and classification (with y, the
+       fitted pipeline and the train/test split); for clustering and
+       dimensionality the raw columns, see _load_columns
+    model_key: key to register a trained regression or classification model
+               under in model_registry; the results then include it
+    """
+    if not is_supported(task, algorithm):
+        raise ValueError(f"Invalid algorithm for {task}: {algorithm}")
+
+    if task in ('regression', 'classification'):
+        model_class = RegressionModel if task == 'regression' else ClassificationModel
+        model = model_class(X, y, test_size=test_size, random_state=random_state,
+                            pipeline=pipeline, feature_names=pipeline.feature_names_,
+                            split_indices=split)
+    elif task == 'clustering':
+        model = ClusteringModel(_load_columns(X), pipeline=pipeline)
+    else:
+        model = DimensionalityReduction(_load_columns(X), pipeline=pipeline)
+
+    results = ALGORITHMS[task][algorithm](model, data)
+    if model_key is not None and model_registry is not None and hasattr(model, 'for_prediction'):
+        info = model_registry.register(model_key, model, {
+            'task': task,
+            'algorithm': results.get('algorithm'),
+            'target_column': data.get('target_column'),
+            'dataset_id': data.get('session_id'),
+            'metrics': results.get('metrics')
+        })
+        results['model_key'] = model_key
+        # Raw columns a prediction needs, as in the prediction form
+        results['feature_names'] = info['input_columns']
+        results['target_column'] = info['target_column']
+    return DataVisualizer.collect(results)
@@ -4,40 +4,290 @@ Generate various plots for data exploration and model results
 """
 import pandas as pd
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import io
 import base64
 import json
+import hashlib
+import inspect
+import functools
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import Config
+from utils.lazy_import import LazyModule
+from utils.jobs import worker_context
+
+# Plotting libraries take most of the app's import time, so they are imported on first use
+@functools.lru_cache(maxsize=None)
+def _import_plotting():
+    import matplotlib
+    matplotlib.use('Agg')  # Use non-interactive backend
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    
+    # Set style
+    sns.set_style("whitegrid")
+    plt.style.use('seaborn-v0_8-darkgrid')
+    return plt, sns
+
+
+plt = LazyModule('matplotlib.pyplot', lambda: _import_plotting()[0])
+sns = LazyModule('seaborn', lambda: _import_plotting()[1])
+px = LazyModule('plotly.express')
+
+def _plot_cache_key(visualizer, method, args, kwargs):
+    """Render cache key of a dataset plot call, or None if the visualizer has no cache"""
+    if visualizer.cache is None or visualizer.dataset_id is None:
+        return None
+    bound = inspect.signature(method).bind(visualizer, *args, **kwargs)
+    bound.apply_defaults()
+    params = tuple(sorted((name, repr(value)) for name, value in bound.arguments.items() if name != 'self'))
+    return ('plot', visualizer.dataset_id, method.__name__, params)
+
+
+def cached_plot(method):
+    """
+    Serve a dataset plot from the visualizer's render cache
+    
+    Renders are keyed by (dataset version, plot type, parameters); dataset
+    IDs are content-addressed, so a key always names the same image.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = _plot_cache_key(self, method, args, kwargs)
+        if key is None:
+            return method(self, *args, **kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached['plot']
+        # Wrapped so plots that come out as None are cached too
+        return self.cache.put(key, {'plot': method(self, *args, **kwargs)}, persist=True)['plot']
+    return wrapper
+
+
+def sample_points(n_points, labels=None, budget=None, random_state=42):
+    """
+    Positions of a representative subset of points for a scatter plot
+    
+    Returns None when all n_points fit in the budget (Config.PLOT_POINT_BUDGET).
+    With labels (clusters, classes) the sample is stratified: each label
+    keeps a share proportional to its size, but never fewer than a few
+    points, so small groups stay visible next to large ones.
+    """
+    budget = budget or Config.PLOT_POINT_BUDGET
+    if n_points <= budget:
+        return None
+    rng = np.random.default_rng(random_state)
+    if labels is None:
+        return np.sort(rng.choice(n_points, budget, replace=False))
+    
+    _, inverse, counts = np.unique(np.asarray(labels), return_inverse=True, return_counts=True)
+    minimum = max(budget // (10 * len(counts)), 1)
+    quotas = np.minimum(np.maximum(counts * budget // n_points, minimum), counts)
+    # Positions grouped by label, in label order
+    groups = np.split(np.argsort(inverse, kind='stable'), np.cumsum(counts)[:-1])
+    return np.sort(np.concatenate([
+        rng.choice(group, quota, replace=False) for group, quota in zip(groups, quotas)
+    ]))
+
+
+def take_positions(data, positions):
+    """Rows of an array or DataFrame at positions (all rows if positions is None)"""
+    if positions is None:
+        return data
+    return data.iloc[positions] if hasattr(data, 'iloc') else data[positions]
+
+
+def tree_depths(tree):
+    """Depth of every node of a fitted sklearn Tree (the root is at depth 0)"""
+    depths = np.zeros(tree.node_count, dtype=np.int64)
+    frontier, depth = np.array([0]), 0
+    while len(frontier):
+        depths[frontier] = depth
+        children = np.concatenate([tree.children_left[frontier], tree.children_right[frontier]])
+        frontier, depth = children[children >= 0], depth + 1
+    return depths
+
+
+def model_fingerprint(models, *params):
+    """Hash of the fitted trees of one or more tree models (and extra parameters), for render cache keys"""
+    digest = hashlib.sha256(repr(params).encode('utf-8'))
+    for model in models:
+        state = model.tree_.__getstate__()
+        digest.update(state['nodes'].tobytes())
+        digest.update(state['values'].tobytes())
+    return digest.hexdigest()
+
+
+def _completed(fn, *args, **kwargs):
+    """Run fn now and return its outcome as a finished Future"""
+    future = Future()
+    try:
+        future.set_result(fn(*args, **kwargs))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _init_render_worker(plot_folder):
+    """Set up a render process: this module (and with it Agg) is already imported"""
+    if plot_folder:
+        from utils.plot_store import PlotStore
+        DataVisualizer.plot_store = PlotStore(plot_folder)
+
+
+def _render_plot(name, args, kwargs):
+    return getattr(DataVisualizer, name)(*args, **kwargs)
+
+
+def _render_dataset_plot(source, name, params):
+    """Render a dataset plot; source is a DataFrame or the ID of a stored dataset"""
+    if isinstance(source, str):
+        from utils.dataset_store import DatasetStore
+        # Memory-mapped, so the worker does not need the frame sent over a pipe
+        source = DatasetStore().load(source)
+    return getattr(DataVisualizer(source), name)(**params)
 
-# Set style
-sns.set_style("whitegrid")
-plt.style.use('seaborn-v0_8-darkgrid')
 
 class DataVisualizer:
-    """Handle all visualization tasks"""
+    """
+    Handle all visualization tasks
+    
+    dataset_id, cache: when both are given, dataset plots are looked up in
+                       cache (a MemoryBudgetCache) before being rendered
+    column_index: the dataset's ColumnIndex; the *_data() methods take
+                  histograms and quartiles from it instead of scanning
+    """
+    
+    # Set by the app (a utils.plot_store.PlotStore) to return plots as image
+    # URLs instead of base64 data URIs
+    plot_store = None
+    plot_url = '/plots/{key}'
+    # Processes rendering plots submitted with submit() (0: render on the calling thread)
+    render_workers = 0
+    # Set by the app (a MemoryBudgetCache) to reuse model plots rendered with submit_cached()
+    render_cache = None
+    _render_pool = None
+    _render_pool_lock = threading.Lock()
     
-    def __init__(self, df):
+    def __init__(self, df, dataset_id=None, cache=None, column_index=None):
         self.df = df
+        self.dataset_id = dataset_id
+        self.cache = cache
+        self.column_index = column_index
+    
+    @classmethod
+    def _get_render_pool(cls):
+        """Process pool for rendering, started on first use"""
+        if cls.render_workers <= 0:
+            return None
+        with cls._render_pool_lock:
+            if cls._render_pool is None:
+                # Workers fork from a server that has already imported matplotlib (where available)
+                context = worker_context()
+                plot_folder = cls.plot_store.folder if cls.plot_store is not None else None
+                cls._render_pool = ProcessPoolExecutor(
+                    max_workers=cls.render_workers, mp_context=context,
+                    initializer=_init_render_worker, initargs=(plot_folder,)
+                )
+            return cls._render_pool
+    
+    @classmethod
+    def _submit(cls, fn, *args):
+        pool = cls._get_render_pool()
+        if pool is not None:
+            try:
+                return pool.submit(fn, *args)
+            except (BrokenProcessPool, RuntimeError):
+                # A worker died: start a fresh pool next time and render here
+                with cls._render_pool_lock:
+                    cls._render_pool = None
+        return _completed(fn, *args)
+    
+    @classmethod
+    def submit(cls, name, *args, **kwargs):
+        """
+        Render a plot (a DataVisualizer.plot_* method) in the render pool
+        Returns a Future; resolve a dict of them with collect().
+        """
+        return cls._submit(_render_plot, name, args, kwargs)
+    
+    @classmethod
+    def submit_cached(cls, key, name, *args, **kwargs):
+        """Like submit(), but reuse the plot stored under key in render_cache (e.g. a model fingerprint)"""
+        if cls.render_cache is None:
+            return cls.submit(name, *args, **kwargs)
+        key = ('plot', key, name)
+        cached = cls.render_cache.get(key)
+        if cached is not None:
+            return _completed(lambda: cached['plot'])
+        
+        future = cls.submit(name, *args, **kwargs)
+        def store(done):
+            if done.exception() is None:
+                cls.render_cache.put(key, {'plot': done.result()}, persist=True)
+        future.add_done_callback(store)
+        return future
+    
+    def submit_dataset_plot(self, name, **params):
+        """Render a dataset plot (e.g. 'boxplots') in the render pool, through the render cache"""
+        key = _plot_cache_key(self, getattr(DataVisualizer, name).__wrapped__, (), params)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return _completed(lambda: cached['plot'])
+        
+        source = self.dataset_id if self.dataset_id is not None else self.df
+        future = self._submit(_render_dataset_plot, source, name, params)
+        if key is not None:
+            def store(done):
+                if done.exception() is None:
+                    self.cache.put(key, {'plot': done.result()}, persist=True)
+            future.add_done_callback(store)
+        return future
     
     @staticmethod
-    def fig_to_base64(fig):
-        """Convert matplotlib figure to base64 string"""
+    def collect(results):
+        """
+        Replace the Futures in a results dict with the plots they rendered
+        A plot that failed to render becomes None (with a warning) instead of failing the request.
+        """
+        collected = {}
+        for key, value in results.items():
+            if isinstance(value, Future):
+                try:
+                    value = value.result()
+                except Exception as e:
+                    print(f"Warning: Could not generate {key}: {str(e)}")
+                    value = None
+            collected[key] = value
+        return collected
+    
+    @staticmethod
+    def fig_to_png(fig):
+        """Render a matplotlib figure to PNG bytes and close it"""
         buf = io.BytesIO()
         fig.savefig(buf, format='png', bbox_inches='tight', dpi=100)
-        buf.seek(0)
-        img_base64 = base64.b64encode(buf.read()).decode('utf-8')
         plt.close(fig)
+        return buf.getvalue()
+    
+    @staticmethod
+    def fig_to_base64(fig):
+        """Convert matplotlib figure to base64 string"""
+        img_base64 = base64.b64encode(DataVisualizer.fig_to_png(fig)).decode('utf-8')
         return f"data:image/png;base64,{img_base64}"
     
+    @classmethod
+    def fig_to_image(cls, fig):
+        """Render a figure to the URL of a stored image, or a base64 data URI without a plot store"""
+        if cls.plot_store is None:
+            return cls.fig_to_base64(fig)
+        return cls.plot_url.format(key=cls.plot_store.put(cls.fig_to_png(fig)))
+    
+    @cached_plot
     def correlation_heatmap(self):
         """Generate correlation heatmap"""
-        numeric_df = self.df.select_dtypes(include=['int64', 'float64'])
+        numeric_df = self.df.select_dtypes(include='number')
         
         if numeric_df.shape[1] < 2:
             return None
@@ -49,11 +299,12 @@ class DataVisualizer:
                    center=0, square=True, ax=ax, cbar_kws={"shrink": 0.8})
         ax.set_title('Correlation Heatmap', fontsize=16, fontweight='bold', pad=20)
         
-        return self.fig_to_base64(fig)
+        return self.fig_to_image(fig)
     
+    @cached_plot
     def distribution_plots(self, max_cols=6):
         """Generate distribution plots for numeric columns"""
-        numeric_cols = self.df.select_dtypes(include=['int64', 'float64']).columns[:max_cols]
+        numeric_cols = self.df.select_dtypes(include='number').columns[:max_cols]
         
         if len(numeric_cols) == 0:
             return None
@@ -82,11 +333,12 @@ class DataVisualizer:
             axes[row, col_idx].axis('off')
         
         plt.tight_layout()
-        return self.fig_to_base64(fig)
+        return self.fig_to_image(fig)
     
+    @cached_plot
     def boxplots(self, max_cols=6):
         """Generate boxplots for numeric columns"""
-        numeric_cols = self.df.select_dtypes(include=['int64', 'float64']).columns[:max_cols]
+        numeric_cols = self.df.select_dtypes(include='number').columns[:max_cols]
         
         if len(numeric_cols) == 0:
             return None
@@ -114,11 +366,106 @@ class DataVisualizer:
             axes[row, col_idx].axis('off')
         
         plt.tight_layout()
-        return self.fig_to_base64(fig)
+        return self.fig_to_image(fig)
+    
+    @staticmethod
+    def encode_float32(values):
+        """Pack an array as base64 little-endian float32 (a Float32Array in the browser)"""
+        return base64.b64encode(np.ascontiguousarray(values, dtype='<f4').tobytes()).decode('ascii')
+    
+    def _numeric_values(self, col):
+        values = self.df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        return values[~np.isnan(values)]
+    
+    @cached_plot
+    def correlation_data(self):
+        """Correlation matrix of the numeric columns, for client-side rendering"""
+        numeric_df = self.df.select_dtypes(include='number')
+        
+        if numeric_df.shape[1] < 2:
+            return None
+        
+        if numeric_df.isna().to_numpy().any():
+            # Pairwise-complete correlations, as in correlation_heatmap
+            correlation = numeric_df.corr().to_numpy()
+        else:
+            correlation = np.corrcoef(numeric_df.to_numpy(dtype=np.float32), rowvar=False, dtype=np.float32)
+        return {
+            'columns': numeric_df.columns.tolist(),
+            'shape': list(correlation.shape),
+            'dtype': 'float32',
+            'data': self.encode_float32(correlation)
+        }
+    
+    @cached_plot
+    def distribution_data(self, max_cols=6):
+        """Histogram bin edges and counts of the numeric columns, for client-side rendering"""
+        numeric_cols = self.df.select_dtypes(include='number').columns[:max_cols]
+        
+        if len(numeric_cols) == 0:
+            return None
+        
+        histograms = {}
+        for col in numeric_cols:
+            histogram = None
+            if self.column_index is not None and self.column_index.has_column(col):
+                histogram = self.column_index.histogram(col)
+            if histogram is None:
+                counts, edges = np.histogram(self._numeric_values(col), bins=Config.HISTOGRAM_BINS)
+                histogram = {'bin_edges': edges.tolist(), 'counts': counts.tolist()}
+            histograms[col] = histogram
+        return {'columns': numeric_cols.tolist(), 'histograms': histograms}
+    
+    @cached_plot
+    def boxplot_data(self, max_cols=6, max_outliers=200):
+        """
+        Box plot statistics of the numeric columns, for client-side rendering
+        
+        Five-number summary (min, quartiles, max), whiskers at the last values
+        within 1.5 IQR of the quartiles, and the points beyond them (an even
+        sample of at most max_outliers, with the total in n_outliers)
+        """
+        numeric_cols = self.df.select_dtypes(include='number').columns[:max_cols]
+        
+        if len(numeric_cols) == 0:
+            return None
+        
+        boxes = {}
+        for col in numeric_cols:
+            values = self._numeric_values(col)
+            if len(values) == 0:
+                continue
+            quartiles = {}
+            if self.column_index is not None and self.column_index.has_column(col):
+                quartiles = self.column_index.quantiles(col)
+            if len(quartiles) < 3:
+                q1, median, q3 = np.percentile(values, [25, 50, 75])
+            else:
+                q1, median, q3 = quartiles['25%'], quartiles['50%'], quartiles['75%']
+            
+            iqr = q3 - q1
+            inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+            outliers = values[~inside]
+            sample = sample_points(len(outliers), budget=max_outliers)
+            if sample is not None:
+                outliers = outliers[sample]
+            boxes[col] = {
+                'min': float(values.min()),
+                'q1': float(q1),
+                'median': float(median),
+                'q3': float(q3),
+                'max': float(values.max()),
+                'lower_whisker': float(values[inside].min()) if inside.any() else float(q1),
+                'upper_whisker': float(values[inside].max()) if inside.any() else float(q3),
+                'n_outliers': int((~inside).sum()),
+                'outliers': outliers.tolist()
+            }
+        return {'columns': list(boxes), 'boxes': boxes}
     
+    @cached_plot
     def pairplot_plotly(self, max_cols=5):
         """Generate interactive pairplot using plotly"""
-        numeric_cols = self.df.select_dtypes(include=['int64', 'float64']).columns[:max_cols]
+        numeric_cols = self.df.select_dtypes(include='number').columns[:max_cols]
         
         if len(numeric_cols) < 2:
             return None
@@ -130,7 +477,7 @@ class DataVisualizer:
         fig.update_traces(diagonal_visible=False, showupperhalf=False)
         fig.update_layout(height=800, width=1000)
         
-        return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+        return fig.to_json()
     
     @staticmethod
     def plot_confusion_matrix(cm, labels=None):
@@ -145,7 +492,7 @@ class DataVisualizer:
         ax.set_ylabel('True Label', fontsize=12)
         ax.set_xlabel('Predicted Label', fontsize=12)
         
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
     def plot_regression_results(y_true, y_pred):
@@ -173,7 +520,7 @@ class DataVisualizer:
         axes[1].grid(True, alpha=0.3)
         
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
     def plot_feature_importance(importance_dict, top_n=10):
@@ -194,7 +541,7 @@ class DataVisualizer:
         ax.grid(True, alpha=0.3, axis='x')
         
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
     def plot_cluster_results(X, labels, centers=None):
@@ -220,7 +567,7 @@ class DataVisualizer:
         ax.grid(True, alpha=0.3)
         
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
     def plot_elbow_curve(inertias, k_range):
@@ -234,7 +581,7 @@ class DataVisualizer:
         ax.grid(True, alpha=0.3)
         
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
     def plot_pca_variance(explained_variance_ratio, cumulative_variance):
@@ -262,7 +609,68 @@ class DataVisualizer:
         axes[1].grid(True, alpha=0.3)
         
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
+    
+    @staticmethod
+    def tree_data(model, feature_names, class_names=None, max_depth=None):
+        """
+        Structure of a fitted decision tree as node arrays, for client-side rendering
+        
+        Node i splits on features[feature[i]] <= threshold[i] and continues at
+        children_left[i] (true) or children_right[i] (false); leaves have
+        feature and children -1. value[i] holds the class proportions of the
+        training samples reaching the node (regression: their mean target).
+        Nodes deeper than max_depth are cut off, making their parents leaves.
+        """
+        tree = model.tree_
+        depths = tree_depths(tree)
+        keep = depths <= max_depth if max_depth is not None else np.ones(tree.node_count, dtype=bool)
+        # New positions of the kept nodes (sklearn numbers nodes depth-first, so order is preserved)
+        new_ids = np.cumsum(keep) - 1
+        
+        def renumber(children):
+            children = children[keep]
+            cut = (children < 0) | ~keep[np.maximum(children, 0)]
+            return np.where(cut, -1, new_ids[np.maximum(children, 0)])
+        
+        children_left = renumber(tree.children_left)
+        children_right = renumber(tree.children_right)
+        is_leaf = children_left < 0
+        
+        # Only the names of the features used in the shown splits are sent
+        feature = np.where(is_leaf, -1, tree.feature[keep])
+        used, codes = np.unique(feature[~is_leaf], return_inverse=True)
+        feature[~is_leaf] = codes
+        
+        value = tree.value[keep, 0, :]
+        if class_names is not None:
+            value = value / np.maximum(value.sum(axis=1, keepdims=True), 1e-12)
+        else:
+            value = value[:, 0]
+        
+        return {
+            'n_nodes': int(keep.sum()),
+            'depth': int(depths.max()),
+            'max_depth': int(depths[keep].max()),
+            'features': [str(feature_names[i]) for i in used],
+            'classes': [str(c) for c in class_names] if class_names is not None else None,
+            'feature': feature.tolist(),
+            'threshold': np.where(is_leaf, 0.0, np.round(tree.threshold[keep], 6)).tolist(),
+            'children_left': children_left.tolist(),
+            'children_right': children_right.tolist(),
+            'n_samples': tree.n_node_samples[keep].tolist(),
+            'impurity': np.round(tree.impurity[keep], 4).tolist(),
+            'value': np.round(value, 4).tolist()
+        }
+    
+    @staticmethod
+    def forest_data(model, feature_names, class_names=None, n_trees_to_show=3, max_depth=None):
+        """Structure of the first few trees of a fitted forest (see tree_data)"""
+        trees = model.estimators_[:n_trees_to_show]
+        return {
+            'n_trees': len(model.estimators_),
+            'trees': [DataVisualizer.tree_data(tree, feature_names, class_names, max_depth) for tree in trees]
+        }
     
     @staticmethod
     def plot_decision_tree(model, feature_names, class_names, max_depth=3):
@@ -295,7 +703,7 @@ class DataVisualizer:
                     fontsize=16, fontweight='bold', pad=20)
         
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
     def plot_random_forest_trees(model, feature_names, class_names, n_trees_to_show=3):
@@ -326,21 +734,21 @@ class DataVisualizer:
         
         plt.suptitle('Random Forest - Sample Trees', fontsize=16, fontweight='bold', y=1.02)
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
-    def plot_feature_importance_detailed(feature_importance_dict, title='Feature Importance'):
+    def plot_feature_importance_detailed(feature_importance_dict, title='Feature Importance', top_n=30):
         """Enhanced feature importance plot with sorted bars and value labels"""
         features = list(feature_importance_dict.keys())
         importances = list(feature_importance_dict.values())
         
-        # Sort by importance
-        indices = np.argsort(importances)[::-1]
+        # Sort by importance (wide one-hot encodings can have thousands of features)
+        indices = np.argsort(importances)[::-1][:top_n]
         features_sorted = [features[i] for i in indices]
         importances_sorted = [importances[i] for i in indices]
         
         # Create figure
-        fig, ax = plt.subplots(figsize=(12, max(6, len(features) * 0.3)))
+        fig, ax = plt.subplots(figsize=(12, max(6, len(features_sorted) * 0.3)))
         
         # Create horizontal bar chart
         colors = plt.cm.viridis(np.linspace(0.3, 0.9, len(features_sorted)))
@@ -359,74 +767,125 @@ class DataVisualizer:
                    va='center', fontsize=9, fontweight='bold')
         
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
     def plot_svm_decision_boundary(X, y, model, feature_names):
-        """Plot SVM decision boundary using first 2 principal components"""
+        """
+        Plot the decision regions of a fitted SVM on the first 2 principal components
+        
+        Mesh points are mapped back to feature space with the PCA inverse
+        transform and classified by the trained model itself. The mesh
+        resolution adapts to the number of support vectors and features so
+        prediction stays within Config.SVM_BOUNDARY_MAX_OPERATIONS, and it
+        is classified in batches of at most Config.SVM_BOUNDARY_BATCH_BYTES.
+        Above Config.PLOT_POINT_BUDGET points the PCA is fitted on, and the
+        plot shows, a sample stratified by class.
+        """
         from sklearn.decomposition import PCA
         
+        y = np.asarray(y)
+        n_points = len(y)
+        sample = sample_points(n_points, y)
+        X_shown = take_positions(X, sample)
+        if hasattr(X_shown, 'toarray'):
+            # Sparse feature matrices are only densified for the rows shown
+            X_shown = X_shown.toarray()
+        y_shown = y if sample is None else y[sample]
+        
         # Reduce to 2D using PCA if needed
+        pca = None
         if X.shape[1] > 2:
             pca = PCA(n_components=2)
-            X_2d = pca.fit_transform(X)
+            X_2d = pca.fit_transform(np.asarray(X_shown, dtype=np.float64))
             x_label = f'PC1 ({pca.explained_variance_ratio_[0]:.1%} var)'
             y_label = f'PC2 ({pca.explained_variance_ratio_[1]:.1%} var)'
         else:
-            X_2d = X.values if hasattr(X, 'values') else X
+            X_2d = np.asarray(X_shown, dtype=np.float64)
             x_label = feature_names[0] if len(feature_names) > 0 else 'Feature 1'
             y_label = feature_names[1] if len(feature_names) > 1 else 'Feature 2'
         
-        # Create coarser mesh for faster rendering
-        h = 0.1  # Increased from 0.02 for speed
-        x_min, x_max = X_2d[:, 0].min() - 1, X_2d[:, 0].max() + 1
-        y_min, y_max = X_2d[:, 1].min() - 1, X_2d[:, 1].max() + 1
-        xx, yy = np.meshgrid(np.arange(x_min, x_max, h), np.arange(y_min, y_max, h))
-        
-        # Train a new model on 2D data for visualization
-        from sklearn.svm import SVC
-        model_2d = SVC(kernel=model.kernel, C=model.C if hasattr(model, 'C') else 1.0, gamma='auto')
-        model_2d.fit(X_2d, y)
-        
-        # Predict on mesh
-        Z = model_2d.predict(np.c_[xx.ravel(), yy.ravel()])
-        Z = Z.reshape(xx.shape)
+        # Mesh over the data range, as fine as the evaluation budget allows
+        # Each mesh point costs one kernel evaluation per support vector and feature
+        n_support = max(len(getattr(model, 'support_', [])), 1)
+        operations = n_support * X.shape[1]
+        resolution = int(np.clip(np.sqrt(Config.SVM_BOUNDARY_MAX_OPERATIONS / operations),
+                                 Config.SVM_BOUNDARY_MIN_RESOLUTION, Config.SVM_BOUNDARY_MAX_RESOLUTION))
+        lows, highs = X_2d.min(axis=0), X_2d.max(axis=0)
+        padding = np.where(highs > lows, (highs - lows) * 0.05, 1.0)
+        xx, yy = np.meshgrid(np.linspace(lows[0] - padding[0], highs[0] + padding[0], resolution),
+                             np.linspace(lows[1] - padding[1], highs[1] + padding[1], resolution))
+        mesh = np.c_[xx.ravel(), yy.ravel()]
+        
+        # Classify the mesh with the trained model in its own feature space, in batches
+        # whose mapped-back points (float64, one value per feature) fit the byte budget
+        classes = model.classes_
+        predictions = []
+        batch_size = max(1, Config.SVM_BOUNDARY_BATCH_BYTES // (8 * X.shape[1]))
+        for start in range(0, len(mesh), batch_size):
+            batch = mesh[start:start + batch_size]
+            if pca is not None:
+                batch = pca.inverse_transform(batch)
+            if hasattr(X, 'columns'):
+                batch = pd.DataFrame(batch, columns=X.columns)
+            predictions.append(model.predict(batch))
+        Z = np.searchsorted(classes, np.concatenate(predictions)).reshape(xx.shape)
         
         # Plot
         fig, ax = plt.subplots(figsize=(12, 8))
         
-        # Decision boundary
-        ax.contourf(xx, yy, Z, alpha=0.3, cmap=plt.cm.RdYlBu, levels=2)
-        ax.contour(xx, yy, Z, colors='black', linewidths=1.5, alpha=0.8, levels=1)
+        # Decision regions, one color per class
+        levels = np.arange(len(classes) + 1) - 0.5
+        ax.contourf(xx, yy, Z, alpha=0.3, cmap=plt.cm.RdYlBu, levels=levels)
+        ax.contour(xx, yy, Z, colors='black', linewidths=1.5, alpha=0.8, levels=levels[1:-1])
         
         # Plot points
-        scatter = ax.scatter(X_2d[:, 0], X_2d[:, 1], c=y, cmap=plt.cm.RdYlBu, 
-                           edgecolors='black', s=100, alpha=0.8, linewidth=1.5)
-        
-        # Support vectors
-        if hasattr(model_2d, 'support_vectors_'):
-            ax.scatter(model_2d.support_vectors_[:, 0], model_2d.support_vectors_[:, 1],
+        scatter = ax.scatter(X_2d[:, 0], X_2d[:, 1], c=np.searchsorted(classes, y_shown),
+                             cmap=plt.cm.RdYlBu, vmin=levels[0], vmax=levels[-1],
+                             edgecolors='black', s=100, alpha=0.8, linewidth=1.5)
+        
+        # Support vectors of the trained model, projected like the points
+        if hasattr(model, 'support_vectors_'):
+            support_vectors = model.support_vectors_
+            shown = sample_points(support_vectors.shape[0])
+            if shown is not None:
+                support_vectors = support_vectors[shown]
+            if hasattr(support_vectors, 'toarray'):
+                support_vectors = support_vectors.toarray()
+            support_2d = pca.transform(support_vectors) if pca is not None else support_vectors
+            ax.scatter(support_2d[:, 0], support_2d[:, 1],
                       s=250, linewidth=3, facecolors='none', edgecolors='lime', 
-                      label=f'Support Vectors ({len(model_2d.support_vectors_)})', zorder=10)
+                      label=f'Support Vectors ({model.support_vectors_.shape[0]})', zorder=10)
         
         ax.set_xlabel(x_label, fontsize=12, fontweight='bold')
         ax.set_ylabel(y_label, fontsize=12, fontweight='bold')
-        ax.set_title(f'SVM Decision Boundary (kernel={model.kernel})', 
+        shown = f' ({len(y_shown):,} of {n_points:,} points shown)' if sample is not None else ''
+        ax.set_title(f'SVM Decision Boundary (kernel={model.kernel}){shown}', 
                     fontsize=14, fontweight='bold', pad=20)
         ax.legend(loc='best', fontsize=11, framealpha=0.9)
         ax.grid(True, alpha=0.3)
         
-        plt.colorbar(scatter, ax=ax, label='Class')
+        colorbar = plt.colorbar(scatter, ax=ax, label='Class', ticks=np.arange(len(classes)))
+        colorbar.ax.set_yticklabels([str(c) for c in classes])
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
     def plot_regression_results(y_true, y_pred, algorithm_name='Regression'):
-        """Plot actual vs predicted and residuals for regression"""
+        """
+        Plot actual vs predicted and residuals for regression
+        Above Config.PLOT_POINT_BUDGET points both panels show point density (hexbin) instead.
+        """
+        y_true, y_pred = np.asarray(y_true, dtype=np.float64), np.asarray(y_pred, dtype=np.float64)
+        dense = len(y_true) > Config.PLOT_POINT_BUDGET
         fig, axes = plt.subplots(1, 2, figsize=(16, 6))
         
         # Plot 1: Actual vs Predicted
-        axes[0].scatter(y_true, y_pred, alpha=0.6, s=80, edgecolors='navy', linewidth=1)
+        if dense:
+            density = axes[0].hexbin(y_true, y_pred, gridsize=60, bins='log', mincnt=1, cmap='Blues')
+            fig.colorbar(density, ax=axes[0], label='Points (log scale)')
+        else:
+            axes[0].scatter(y_true, y_pred, alpha=0.6, s=80, edgecolors='navy', linewidth=1)
         
         # Perfect prediction line
         min_val = min(y_true.min(), y_pred.min())
@@ -441,8 +900,12 @@ class DataVisualizer:
         
         # Plot 2: Residuals
         residuals = y_true - y_pred
-        axes[1].scatter(y_pred, residuals, alpha=0.6, s=80, c=residuals, cmap='coolwarm', 
-                       edgecolors='black', linewidth=1)
+        if dense:
+            density = axes[1].hexbin(y_pred, residuals, gridsize=60, bins='log', mincnt=1, cmap='Blues')
+            fig.colorbar(density, ax=axes[1], label='Points (log scale)')
+        else:
+            axes[1].scatter(y_pred, residuals, alpha=0.6, s=80, c=residuals, cmap='coolwarm', 
+                           edgecolors='black', linewidth=1)
         axes[1].axhline(y=0, color='red', linestyle='--', linewidth=2, label='Zero Residual')
         
         axes[1].set_xlabel('Predicted Values', fontsize=12, fontweight='bold')
@@ -452,22 +915,31 @@ class DataVisualizer:
         axes[1].grid(True, alpha=0.3)
         
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
     
     @staticmethod
     def plot_cluster_results_3d(X, labels, centers=None, title='Cluster Visualization'):
-        """Enhanced 2D/3D cluster visualization"""
+        """
+        Enhanced 2D/3D cluster visualization
+        Above Config.PLOT_POINT_BUDGET points a sample stratified by cluster is drawn.
+        """
         from sklearn.decomposition import PCA
         
-        # If X has more than 2 dimensions, reduce using PCA
+        # If X has more than 2 dimensions, reduce using PCA (fitted on every point)
         if X.shape[1] > 2:
             pca = PCA(n_components=min(3, X.shape[1]))
             X_proj = pca.fit_transform(X)
             var_explained = pca.explained_variance_ratio_
         else:
-            X_proj = X
+            X_proj = np.asarray(X)
             var_explained = [1.0, 1.0]
         
+        labels = np.asarray(labels)
+        sample = sample_points(len(labels), labels)
+        if sample is not None:
+            title = f'{title} ({len(sample):,} of {len(labels):,} points shown)'
+            X_proj, labels = X_proj[sample], labels[sample]
+        
         # Determine if 2D or 3D
         n_components = X_proj.shape[1]
         
@@ -514,4 +986,4 @@ class DataVisualizer:
         plt.title(title, fontsize=14, fontweight='bold', pad=20)
         plt.colorbar(scatter, ax=ax if n_components == 2 else None, label='Cluster')
         plt.tight_layout()
-        return DataVisualizer.fig_to_base64(fig)
+        return DataVisualizer.fig_to_image(fig)
@@ -3,6 +3,9 @@
 let currentSessionId = null;
 let currentDataset = null;
 
+// Files above this size use the resumable chunked upload endpoints
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+
 // Notification System
 function showNotification(message, type = 'success') {
     const notification = document.createElement('div');
@@ -35,6 +38,11 @@ function showLoading(message = 'Processing...') {
     document.body.appendChild(overlay);
 }
 
+function updateLoading(message) {
+    const heading = document.querySelector('#loadingOverlay h4');
+    if (heading) heading.textContent = message;
+}
+
 function hideLoading() {
     const overlay = document.getElementById('loadingOverlay');
     if (overlay) {
@@ -101,18 +109,23 @@ function handleFileSelect(event) {
         return;
     }
     
-    const formData = new FormData();
-    formData.append('file', file);
-    
     // Show loading
     showLoading('Uploading and analyzing dataset...');
     document.getElementById('uploadProgress').style.display = 'block';
     
-    fetch('/upload', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => response.json())
+    let upload;
+    if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+        upload = uploadFileInChunks(file);
+    } else {
+        const formData = new FormData();
+        formData.append('file', file);
+        upload = fetch('/upload', {
+            method: 'POST',
+            body: formData
+        }).then(response => response.json());
+    }
+    
+    upload
     .then(data => {
         hideLoading();
         document.getElementById('uploadProgress').style.display = 'none';
@@ -146,6 +159,47 @@ function handleFileSelect(event) {
     });
 }
 
+async function uploadFileInChunks(file) {
+    // Start the upload and learn the chunk size the server expects
+    const initResponse = await fetch('/upload/chunked/init', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ filename: file.name })
+    });
+    const init = await initResponse.json();
+    if (!init.success) return init;
+    
+    const chunkCount = Math.ceil(file.size / init.chunk_size);
+    let index = 0;
+    let retries = 0;
+    
+    while (index < chunkCount) {
+        const chunk = file.slice(index * init.chunk_size, (index + 1) * init.chunk_size);
+        try {
+            const response = await fetch(`/upload/chunked/${init.upload_id}/${index}`, {
+                method: 'PUT',
+                body: chunk
+            });
+            const status = await response.json();
+            if (!response.ok) throw new Error(status.error);
+            index = status.next_chunk;
+            retries = 0;
+        } catch (error) {
+            // Ask the server where to resume from before retrying
+            if (++retries > 3) return { success: false, error: error.message };
+            const statusResponse = await fetch(`/upload/chunked/${init.upload_id}`);
+            const status = await statusResponse.json();
+            if (!status.success) return status;
+            index = status.next_chunk;
+        }
+        updateLoading(`Uploading dataset... ${Math.round(100 * index / chunkCount)}%`);
+    }
+    
+    updateLoading('Analyzing dataset...');
+    const finalizeResponse = await fetch(`/upload/chunked/${init.upload_id}/finalize`, { method: 'POST' });
+    return finalizeResponse.json();
+}
+
 function displayDatasetInfo(data) {
     // Update stats
     document.getElementById('totalRows').textContent = data.info.shape[0];
@@ -213,7 +267,8 @@ function generateVisualizations() {
             'Content-Type': 'application/json'
         },
         body: JSON.stringify({
-            session_id: currentSessionId
+            session_id: currentSessionId,
+            mode: 'data'
         })
     })
     .then(response => response.json())
@@ -221,7 +276,9 @@ function generateVisualizations() {
         btn.disabled = false;
         btn.innerHTML = '<i class="bi bi-graph-up"></i> Generate Visualizations';
         
-        if (data.success) {
+        if (data.success && data.mode === 'data') {
+            displayVisualizationData(data.visualizations);
+        } else if (data.success) {
             displayVisualizations(data.visualizations);
         } else {
             showAlert('danger', data.error || 'Error generating visualizations');
@@ -253,7 +310,183 @@ function displayVisualizations(visualizations) {
     container.scrollIntoView({ behavior: 'smooth' });
 }
 
+// Client-side rendering of the data returned by /visualize with mode 'data'
+function decodeFloat32(base64) {
+    const bytes = Uint8Array.from(atob(base64), c => c.charCodeAt(0));
+    return new Float32Array(bytes.buffer);
+}
+
+function showChart(imageId, chartId) {
+    document.getElementById(imageId).style.display = 'none';
+    const chart = document.getElementById(chartId);
+    chart.style.display = 'block';
+    return chart;
+}
+
+function gridLayout(count, height) {
+    const columns = Math.min(3, count);
+    const rows = Math.ceil(count / columns);
+    return {
+        grid: { rows: rows, columns: columns, pattern: 'independent' },
+        height: height * rows,
+        showlegend: false,
+        margin: { t: 40, b: 40 }
+    };
+}
+
+function displayVisualizationData(visualizations) {
+    const container = document.getElementById('visualizationsContainer');
+    
+    const correlation = visualizations.correlation;
+    if (correlation) {
+        const values = decodeFloat32(correlation.data);
+        const size = correlation.shape[0];
+        const z = [];
+        for (let i = 0; i < size; i++) {
+            z.push(Array.from(values.slice(i * size, (i + 1) * size), v => Math.round(v * 100) / 100));
+        }
+        Plotly.newPlot(showChart('correlationHeatmap', 'correlationHeatmapChart'), [{
+            type: 'heatmap', z: z, x: correlation.columns, y: correlation.columns,
+            zmin: -1, zmax: 1, colorscale: 'RdBu', reversescale: true,
+            text: z, texttemplate: '%{text:.2f}'
+        }], { height: 600, yaxis: { autorange: 'reversed' } }, { responsive: true });
+    }
+    
+    const distributions = visualizations.distributions;
+    if (distributions) {
+        const traces = distributions.columns.map((col, i) => {
+            const histogram = distributions.histograms[col];
+            const edges = histogram.bin_edges;
+            const axis = i === 0 ? '' : String(i + 1);
+            return {
+                type: 'bar', name: col,
+                x: histogram.counts.map((_, j) => (edges[j] + edges[j + 1]) / 2),
+                y: histogram.counts,
+                width: histogram.counts.map((_, j) => edges[j + 1] - edges[j]),
+                xaxis: 'x' + axis, yaxis: 'y' + axis,
+                marker: { line: { color: 'black', width: 1 } }, opacity: 0.7
+            };
+        });
+        const layout = gridLayout(traces.length, 320);
+        layout.annotations = distributions.columns.map((col, i) => ({
+            text: `<b>Distribution of ${col}</b>`, showarrow: false,
+            xref: `x${i === 0 ? '' : i + 1} domain`, yref: `y${i === 0 ? '' : i + 1} domain`,
+            x: 0.5, y: 1.12
+        }));
+        Plotly.newPlot(showChart('distributionPlots', 'distributionPlotsChart'), traces, layout, { responsive: true });
+    }
+    
+    const boxplots = visualizations.boxplots;
+    if (boxplots) {
+        const traces = [];
+        boxplots.columns.forEach((col, i) => {
+            const box = boxplots.boxes[col];
+            const axis = i === 0 ? '' : String(i + 1);
+            traces.push({
+                type: 'box', name: col, x: [col],
+                q1: [box.q1], median: [box.median], q3: [box.q3],
+                lowerfence: [box.lower_whisker], upperfence: [box.upper_whisker],
+                xaxis: 'x' + axis, yaxis: 'y' + axis
+            });
+            if (box.outliers.length) {
+                traces.push({
+                    type: 'scatter', mode: 'markers', name: `${col} outliers (${box.n_outliers})`,
+                    x: box.outliers.map(() => col), y: box.outliers,
+                    xaxis: 'x' + axis, yaxis: 'y' + axis,
+                    marker: { symbol: 'circle-open', color: '#444' }
+                });
+            }
+        });
+        Plotly.newPlot(showChart('boxplots', 'boxplotsChart'), traces, gridLayout(boxplots.columns.length, 320),
+                       { responsive: true });
+    }
+    
+    container.style.display = 'block';
+    container.scrollIntoView({ behavior: 'smooth' });
+}
+
+// Interactive tree from the node arrays returned by DataVisualizer.tree_data
+function plotTree(chartId, tree, title) {
+    const ids = [], labels = [], parents = [], values = [], colors = [], hover = [];
+    const visit = (node, parent, condition) => {
+        const value = tree.value[node];
+        const isLeaf = tree.children_left[node] < 0;
+        let outcome, color;
+        if (tree.classes) {
+            const best = value.indexOf(Math.max(...value));
+            outcome = `${tree.classes[best]} (${(value[best] * 100).toFixed(1)}%)`;
+            color = best;
+        } else {
+            outcome = value.toFixed(4);
+            color = value;
+        }
+        ids.push(String(node));
+        parents.push(parent);
+        values.push(tree.n_samples[node]);
+        colors.push(color);
+        labels.push(isLeaf ? outcome
+                           : `${tree.features[tree.feature[node]]} <= ${tree.threshold[node]}`);
+        hover.push(`${condition}<br>samples: ${tree.n_samples[node]}<br>impurity: ${tree.impurity[node]}<br>` +
+                   `${tree.classes ? 'class' : 'value'}: ${outcome}`);
+        if (!isLeaf) {
+            const split = `${tree.features[tree.feature[node]]} <= ${tree.threshold[node]}`;
+            visit(tree.children_left[node], String(node), `${split}: true`);
+            visit(tree.children_right[node], String(node), `${split}: false`);
+        }
+    };
+    visit(0, '', 'root');
+    
+    Plotly.newPlot(document.getElementById(chartId), [{
+        type: 'icicle', ids: ids, labels: labels, parents: parents, values: values,
+        branchvalues: 'total', maxdepth: 4, tiling: { orientation: 'v' },
+        text: hover, hoverinfo: 'text', textinfo: 'label',
+        marker: { colors: colors, colorscale: 'RdYlBu' }
+    }], {
+        title: `${title} (depth ${tree.depth}${tree.max_depth < tree.depth ? `, top ${tree.max_depth + 1} levels` : ''})`,
+        height: 500, margin: { t: 50, l: 10, r: 10, b: 10 }
+    }, { responsive: true });
+}
+
 // Machine Learning Functions
+
+// Submit a training request as a background job and poll it until it finishes.
+// Resolves with the same {success, results} / {error} shape as a synchronous request.
+const JOB_POLL_INTERVAL_MS = 1000;
+
+async function runTrainingJob(url, params) {
+    const response = await fetch(url, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ ...params, async: true })
+    });
+    const submitted = await response.json();
+    if (!submitted.job_id) {
+        return submitted;
+    }
+    
+    let delay = JOB_POLL_INTERVAL_MS;
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, delay));
+        const pollResponse = await fetch(`/jobs/${submitted.job_id}`);
+        // The server says how long to wait before polling again
+        const retryAfter = parseFloat(pollResponse.headers.get('Retry-After'));
+        delay = retryAfter > 0 ? retryAfter * 1000 : JOB_POLL_INTERVAL_MS;
+        const data = await pollResponse.json();
+        if (!data.success) {
+            return data;
+        }
+        const job = data.job;
+        if (job.status === 'succeeded') {
+            return { success: true, results: data.results };
+        }
+        if (job.status === 'failed' || job.status === 'timed_out' || job.status === 'cancelled') {
+            return { success: false, error: job.error || `Training ${job.status.replace('_', ' ')}` };
+        }
+        updateLoading(job.status === 'queued' ? 'Waiting for a free training worker...' : 'Training model...');
+    }
+}
 function runRegression(algorithm) {
     const targetColumn = document.getElementById('regressionTarget').value;
     const featureSelect = document.getElementById('regressionFeatures');
@@ -279,14 +512,7 @@ function runRegression(algorithm) {
     closeModal('regressionModal');
     showLoading(`Running linear regression...`);
     
-    fetch('/ml/regression', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        },
-        body: JSON.stringify(params)
-    })
-    .then(response => response.json())
+    runTrainingJob('/ml/regression', params)
     .then(data => {
         hideLoading();
         
@@ -332,14 +558,7 @@ function runClassification(algorithm) {
     closeModal('classificationModal');
     showLoading(`Running ${algorithm.replace('_', ' ')} classification...`);
     
-    fetch('/ml/classification', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        },
-        body: JSON.stringify(params)
-    })
-    .then(response => response.json())
+    runTrainingJob('/ml/classification', params)
     .then(data => {
         hideLoading();
         
@@ -374,14 +593,7 @@ function runClustering(algorithm) {
     closeModal('clusteringModal');
     showLoading(`Running ${algorithm.replace('_', ' ')} clustering...`);
     
-    fetch('/ml/clustering', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        },
-        body: JSON.stringify(params)
-    })
-    .then(response => response.json())
+    runTrainingJob('/ml/clustering', params)
     .then(data => {
         hideLoading();
         
@@ -412,14 +624,7 @@ function runDimensionality(algorithm) {
     closeModal('dimensionalityModal');
     showLoading(`Running ${algorithm.toUpperCase()} dimensionality reduction...`);
     
-    fetch('/ml/dimensionality', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        },
-        body: JSON.stringify(params)
-    })
-    .then(response => response.json())
+    runTrainingJob('/ml/dimensionality', params)
     .then(data => {
         hideLoading();
         
@@ -489,32 +694,38 @@ function displayResults(results, category, additionalData = {}) {
     html += '</div>';
     
     // Display Decision Tree visualization
-    if (results.tree_plot) {
+    if (results.tree || results.tree_plot) {
         html += `
             <div class="mb-4">
                 <h5><i class="bi bi-diagram-3"></i> Decision Tree Structure</h5>
                 <div class="alert alert-info">
                     <i class="bi bi-info-circle"></i> Tree Depth: <strong>${results.tree_depth || 'N/A'}</strong> | 
                     Number of Leaves: <strong>${results.n_leaves || 'N/A'}</strong>
+                    ${results.tree ? ' | Click a node to expand it' : ''}
                 </div>
+                ${results.tree ? '<div id="treeChart"></div>' : ''}
+                ${results.tree_plot ? `
                 <div class="tree-plot-container" style="overflow-x: auto; max-width: 100%;">
                     <img src="${results.tree_plot}" class="img-fluid rounded shadow-sm" alt="Decision Tree" style="max-width: none; width: auto;">
-                </div>
+                </div>` : ''}
             </div>
         `;
     }
     
     // Random Forest Trees
-    if (results.forest_trees_plot) {
+    if (results.forest_trees || results.forest_trees_plot) {
+        const shownTrees = results.forest_trees ? results.forest_trees.trees.length : 3;
         html += `
             <div class="mb-4">
                 <h5><i class="bi bi-trees"></i> Random Forest - Sample Trees</h5>
                 <div class="alert alert-info">
-                    <i class="bi bi-info-circle"></i> Showing 3 sample trees from ${results.n_trees || 'N/A'} total trees
+                    <i class="bi bi-info-circle"></i> Showing ${shownTrees} sample trees from ${results.n_trees || 'N/A'} total trees
                 </div>
+                ${results.forest_trees ? results.forest_trees.trees.map((_, i) => `<div id="forestTreeChart${i}"></div>`).join('') : ''}
+                ${results.forest_trees_plot ? `
                 <div class="tree-plot-container" style="overflow-x: auto; max-width: 100%;">
                     <img src="${results.forest_trees_plot}" class="img-fluid rounded shadow-sm" alt="Random Forest Trees" style="max-width: none; width: auto;">
-                </div>
+                </div>` : ''}
             </div>
         `;
     }
@@ -627,38 +838,38 @@ function displayResults(results, category, additionalData = {}) {
         html += '</ul></div>';
     }
     
+    if (results.model_key) {
+        html += `
+            <div class="mb-4">
+                <h5><i class="bi bi-magic"></i> Make a Prediction</h5>
+                <div id="predictionInputs"></div>
+                <button class="btn btn-primary" onclick="makePrediction()">
+                    <i class="bi bi-play-fill"></i> Predict
+                </button>
+                <div id="predictionResult" class="mt-3"></div>
+            </div>
+        `;
+    }
+    
     html += '</div></div>';
     
     container.innerHTML = html;
     section.style.display = 'block';
     section.scrollIntoView({ behavior: 'smooth' });
     
-    // Generate prediction inputs after HTML is rendered (for regression only)
-    if (results.algorithm && results.algorithm.includes('Regression')) {
-        // Get feature_names from backend response (already processed correctly)
-        // Backend has already excluded target, outcomes, and handled categorical encoding
-        let featureNames = [];
-        
-        // Priority 1: Get from additionalData (sent from backend)
-        if (additionalData && additionalData.feature_names) {
-            featureNames = additionalData.feature_names;
-            console.log('✅ Using feature names from backend:', featureNames);
-        }
-        // Priority 2: Get from results
-        else if (results.feature_names) {
-            featureNames = results.feature_names;
-            console.log('✅ Using feature names from results:', featureNames);
-        }
-        // Priority 3: Try to extract from coefficients/importance
-        else if (results.coefficients) {
-            featureNames = Object.keys(results.coefficients);
-            console.log('⚠️ Extracted from coefficients:', featureNames);
-        } else if (results.feature_importance) {
-            featureNames = Object.keys(results.feature_importance);
-            console.log('⚠️ Extracted from feature_importance:', featureNames);
-        }
-        
-        // No prediction inputs needed anymore - removed feature
+    if (results.tree) {
+        plotTree('treeChart', results.tree, 'Decision Tree');
+    }
+    if (results.forest_trees) {
+        results.forest_trees.trees.forEach((tree, i) => {
+            plotTree(`forestTreeChart${i}`, tree, `Tree ${i + 1} of ${results.forest_trees.n_trees}`);
+        });
+    }
+    
+    // Prediction form for a registered regression or classification model (/ml/predict)
+    window.currentModelKey = results.model_key || null;
+    if (results.model_key) {
+        loadPredictionForm(results.model_key);
     }
 }
 
@@ -945,31 +1156,51 @@ function updateModalSelects() {
 // PREDICTION FUNCTIONS
 // ==========================================
 
-// Store feature names globally
-window.currentFeatureNames = [];
+// Input columns of the current model: {name, kind, categories}
+window.currentInputColumns = [];
+
+// Fetch the input columns of a registered model and build its prediction form
+async function loadPredictionForm(modelKey) {
+    try {
+        const data = await (await fetch(`/ml/models/${modelKey}`)).json();
+        if (data.success) {
+            generatePredictionInputs(data.model.columns);
+        }
+    } catch (error) {
+        console.error('Could not load the prediction form:', error);
+    }
+}
 
-// Generate input fields for prediction
-function generatePredictionInputs(featureNames) {
-    window.currentFeatureNames = featureNames;
+// Generate input fields for prediction: numbers for numeric columns,
+// a select for columns with known categories and text for other categoricals
+function generatePredictionInputs(columns) {
+    window.currentInputColumns = columns;
     const container = document.getElementById('predictionInputs');
     if (!container) return;
     
     let html = '<p class="mb-3"><i class="bi bi-info-circle-fill text-primary"></i> <strong>Enter values for all features below:</strong></p>';
     html += '<div class="row">';
     
-    featureNames.forEach((feature, index) => {
+    columns.forEach((column, index) => {
+        let input;
+        if (column.kind === 'numeric') {
+            input = `<input type="number" class="form-control" id="feature_${index}" placeholder="Enter ${column.name}" step="any" required>`;
+        } else if (column.categories) {
+            // Option values are indexes into column.categories, so the original values are sent
+            input = `<select class="form-select" id="feature_${index}" required>
+                        <option value="">Select ${column.name}</option>
+                        ${column.categories.map((category, i) => `<option value="${i}">${category}</option>`).join('')}
+                     </select>`;
+        } else {
+            input = `<input type="text" class="form-control" id="feature_${index}" placeholder="Enter ${column.name}" required>`;
+        }
         html += `
             <div class="col-md-6 col-lg-4 mb-3">
                 <label for="feature_${index}" class="form-label">
-                    <strong>${feature}</strong>
-                    <span class="text-muted" style="font-size: 0.85em;"> (numeric)</span>
+                    <strong>${column.name}</strong>
+                    <span class="text-muted" style="font-size: 0.85em;"> (${column.kind})</span>
                 </label>
-                <input type="number" 
-                       class="form-control" 
-                       id="feature_${index}" 
-                       placeholder="Enter ${feature}"
-                       step="any"
-                       required>
+                ${input}
             </div>
         `;
     });
@@ -984,7 +1215,7 @@ async function makePrediction() {
     const resultDiv = document.getElementById('predictionResult');
     
     if (!window.currentModelKey) {
-        resultDiv.innerHTML = '<div class="alert alert-danger">No trained model found. Please run a regression analysis first.</div>';
+        resultDiv.innerHTML = '<div class="alert alert-danger">No trained model found. Please train a regression or classification model first.</div>';
         return;
     }
     
@@ -992,13 +1223,19 @@ async function makePrediction() {
     const inputValues = {};
     let allFilled = true;
     
-    window.currentFeatureNames.forEach((feature, index) => {
+    window.currentInputColumns.forEach((column, index) => {
         const input = document.getElementById(`feature_${index}`);
         if (!input || input.value === '') {
             allFilled = false;
             return;
         }
-        inputValues[feature] = parseFloat(input.value);
+        if (column.kind === 'numeric') {
+            inputValues[column.name] = parseFloat(input.value);
+        } else if (column.categories) {
+            inputValues[column.name] = column.categories[parseInt(input.value)];
+        } else {
+            inputValues[column.name] = input.value;
+        }
     });
     
     if (!allFilled) {
@@ -1025,6 +1262,15 @@ async function makePrediction() {
         
         if (data.success) {
             const prediction = data.prediction;
+            // Regression predicts a number, classification a class label
+            const predicted = typeof prediction.prediction === 'number' && !Number.isInteger(prediction.prediction)
+                ? prediction.prediction.toFixed(4) : prediction.prediction;
+            let probabilities = '';
+            if (prediction.probabilities) {
+                probabilities = '<ul class="list-unstyled mb-2">' + Object.entries(prediction.probabilities).map(([label, p]) =>
+                    `<li>${label}: ${(p * 100).toFixed(1)}%</li>`
+                ).join('') + '</ul>';
+            }
             resultDiv.innerHTML = `
                 <div class="alert alert-success">
                     <h5><i class="bi bi-check-circle"></i> Prediction Result</h5>
@@ -1040,7 +1286,8 @@ async function makePrediction() {
                         </div>
                         <div class="col-md-6">
                             <h6>Predicted ${prediction.target_column}:</h6>
-                            <h3 class="text-success">${prediction.prediction.toFixed(4)}</h3>
+                            <h3 class="text-success">${predicted}</h3>
+                            ${probabilities}
                             <small class="text-muted">Algorithm: ${prediction.algorithm}</small>
                         </div>
                     </div>
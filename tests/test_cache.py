@@ -0,0 +1,25 @@
+"""
+Tests for utils.cache
+"""
+import numpy as np
+from utils.cache import MemoryBudgetCache
+
+
+def test_oversized_entry_is_not_rewritten_on_get(tmp_path):
+    cache = MemoryBudgetCache(1024, spill_folder=str(tmp_path))
+    cache.put('large', np.zeros(10000))
+    assert cache.spills == 1
+
+    for _ in range(3):
+        assert cache.get('large').shape == (10000,)
+    assert cache.spill_loads == 3
+    assert cache.spills == 1
+
+
+def test_persisted_entry_is_replaced_on_disk(tmp_path):
+    cache = MemoryBudgetCache(1024 * 1024, spill_folder=str(tmp_path))
+    cache.put('model', {'version': 1}, persist=True)
+    cache.put('model', {'version': 2}, persist=True)
+
+    other_worker = MemoryBudgetCache(1024 * 1024, spill_folder=str(tmp_path))
+    assert other_worker.get('model') == {'version': 2}
@@ -0,0 +1,195 @@
+"""
+In-memory caching for SmartML Dashboard
+LRU caches bounded by an estimated byte budget, spilling evicted entries to disk
+"""
+import os
+import sys
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import joblib
+
+
+def estimate_size(obj, _seen=None, _depth=0):
+    """
+    Estimate the memory footprint of an object in bytes
+
+    DataFrames and Series use memory_usage(deep=True), NumPy arrays their
+    buffer size, and other objects (e.g. fitted estimators) are walked
+    through their attributes, summing the arrays they hold.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or _depth > 8:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        items = list(obj.keys()) + list(obj.values())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = list(obj)
+    elif hasattr(obj, '__getstate__') and not isinstance(obj, type):
+        # Cython objects such as sklearn's Tree expose their arrays through __getstate__
+        try:
+            state = obj.__getstate__()
+        except Exception:
+            state = getattr(obj, '__dict__', {})
+        items = list(state.values()) if isinstance(state, dict) else []
+    else:
+        items = list(getattr(obj, '__dict__', {}).values())
+
+    for item in items:
+        size += estimate_size(item, _seen, _depth + 1)
+    return size
+
+
+class MemoryBudgetCache:
+    """
+    Least-recently-used cache bounded by an estimated memory budget
+
+    max_bytes: total estimated size of the entries kept in memory
+    spill_folder: if set, evicted entries are written there with joblib and
+                  transparently reloaded on the next access
+    loader: optional callable(key) used on a miss to rebuild an entry that
+            already lives elsewhere on disk (e.g. in the dataset store)
+    """
+
+    def __init__(self, max_bytes, spill_folder=None, loader=None):
+        self.max_bytes = max_bytes
+        self.spill_folder = spill_folder
+        self.loader = loader
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spills = 0
+        self.spill_loads = 0
+        if spill_folder:
+            os.makedirs(spill_folder, exist_ok=True)
+
+    def _spill_path(self, key):
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.spill_folder, f'{digest}.joblib')
+
+    def _spill(self, key, value, replace=False):
+        """
+        Write an entry to the spill folder
+        replace: overwrite a file already there (a new value for the key);
+                 otherwise an existing file is kept, as evictions do
+        """
+        if not self.spill_folder:
+            return
+        path = self._spill_path(key)
+        if replace or not os.path.exists(path):
+            tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            joblib.dump(value, tmp_path)
+            os.replace(tmp_path, path)
+            self.spills += 1
+
+    def _evict(self):
+        """Evict least-recently-used entries until the budget is respected"""
+        while self.current_bytes > self.max_bytes and self._entries:
+            key, (value, size) = self._entries.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+            self._spill(key, value)
+
+    def put(self, key, value, size=None, persist=False):
+        """
+        Add or replace an entry, evicting older entries if needed
+        persist: also write the entry to the spill folder right away, so
+                 other workers can load it without recomputing it
+        """
+        if size is None:
+            size = estimate_size(value)
+        with self._lock:
+            if persist:
+                self._spill(key, value, replace=True)
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                # Too large to keep in memory at all
+                self.evictions += 1
+                self._spill(key, value, replace=not persist)
+            else:
+                self._entries[key] = (value, size)
+                self.current_bytes += size
+            self._evict()
+        return value
+
+    def get(self, key, default=None):
+        """Return an entry, reloading it from disk if it was evicted"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            self.misses += 1
+
+            value, spilled = None, False
+            if self.spill_folder and os.path.exists(self._spill_path(key)):
+                value = joblib.load(self._spill_path(key))
+                self.spill_loads += 1
+                spilled = True
+            elif self.loader is not None:
+                value = self.loader(key)
+
+            if value is None:
+                return default
+            size = estimate_size(value)
+            if spilled and size > self.max_bytes:
+                # Too large to keep in memory, and already on disk: nothing to write
+                return value
+            return self.put(key, value, size=size)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._entries:
+                return True
+        return bool(self.spill_folder) and os.path.exists(self._spill_path(key))
+
+    def pop(self, key, default=None):
+        """Remove an entry from memory and from the spill folder"""
+        with self._lock:
+            value, size = self._entries.pop(key, (default, 0))
+            self.current_bytes -= size
+            if self.spill_folder and os.path.exists(self._spill_path(key)):
+                os.remove(self._spill_path(key))
+            return value
+
+    def clear(self):
+        """Drop every in-memory entry (spilled entries are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        """Return usage and hit/miss/eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'current_bytes': int(self.current_bytes),
+                'max_bytes': int(self.max_bytes),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'spills': self.spills,
+                'spill_loads': self.spill_loads
+            }
@@ -0,0 +1,205 @@
+"""
+Resumable chunked uploads for SmartML Dashboard
+Chunks are appended to disk as they arrive and complete CSV records are parsed incrementally
+"""
+import io
+import os
+import re
+import json
+import uuid
+import time
+import hashlib
+import pandas as pd
+import pyarrow.feather as feather
+from config import Config
+from utils.ingest import CSVIngest
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+STREAM_BLOCK_SIZE = 1024 * 1024  # Bytes copied per block from the request body
+LOCK_TIMEOUT = 600  # Seconds after which a lock left by a crashed worker is ignored
+
+
+class UploadConflict(Exception):
+    """Raised when a chunk arrives out of order or the upload is busy"""
+
+
+class ChunkedUpload:
+    """
+    A CSV upload assembled from numbered chunks
+
+    All state lives in Config.UPLOAD_CHUNK_FOLDER, so any worker can accept
+    the next chunk. After each chunk the newly completed CSV records are
+    parsed and saved as an Arrow part file, so finalizing only has to
+    optimize dtypes and combine the parts.
+    """
+
+    def __init__(self, upload_id, folder=None):
+        if not isinstance(upload_id, str) or not UPLOAD_ID_PATTERN.match(upload_id):
+            raise ValueError(f"Invalid upload id: {upload_id!r}")
+        self.upload_id = upload_id
+        self.folder = folder or Config.UPLOAD_CHUNK_FOLDER
+        self.data_path = os.path.join(self.folder, f'{upload_id}.part')
+        self.state_path = os.path.join(self.folder, f'{upload_id}.json')
+        self.lock_path = os.path.join(self.folder, f'{upload_id}.lock')
+
+    @classmethod
+    def create(cls, filename, folder=None):
+        """Start a new upload and return it"""
+        upload = cls(uuid.uuid4().hex, folder)
+        os.makedirs(upload.folder, exist_ok=True)
+        open(upload.data_path, 'wb').close()
+        upload._write_state({
+            'filename': filename,
+            'next_chunk': 0,
+            'bytes_received': 0,
+            'parsed_offset': 0,
+            'columns': None,
+            'n_parts': 0
+        })
+        return upload
+
+    def exists(self):
+        """Check whether the upload has been started and not yet finalized"""
+        return os.path.exists(self.state_path)
+
+    def _read_state(self):
+        with open(self.state_path) as f:
+            return json.load(f)
+
+    def _write_state(self, state):
+        tmp_path = f'{self.state_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _part_path(self, index):
+        return os.path.join(self.folder, f'{self.upload_id}.{index}.arrow')
+
+    def _acquire(self):
+        """Take an exclusive lock so two workers never append to the same upload"""
+        if os.path.exists(self.lock_path) and time.time() - os.path.getmtime(self.lock_path) > LOCK_TIMEOUT:
+            self._release()
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise UploadConflict('Another chunk of this upload is being processed')
+        os.close(fd)
+
+    def _release(self):
+        if os.path.exists(self.lock_path):
+            os.remove(self.lock_path)
+
+    def status(self):
+        """Return the progress needed to resume the upload"""
+        state = self._read_state()
+        return {
+            'upload_id': self.upload_id,
+            'filename': state['filename'],
+            'next_chunk': state['next_chunk'],
+            'bytes_received': state['bytes_received'],
+            'rows_parsed': state.get('rows_parsed', 0)
+        }
+
+    def append_chunk(self, index, stream):
+        """
+        Append chunk number `index` read from a file-like stream
+
+        Chunks must arrive in order; re-sending a chunk that was already
+        stored is a no-op so clients can safely retry after a failure.
+        """
+        self._acquire()
+        try:
+            state = self._read_state()
+            if index < state['next_chunk']:
+                return self.status()
+            if index > state['next_chunk']:
+                raise UploadConflict(f"Expected chunk {state['next_chunk']}, got {index}")
+
+            # Copy the request body to disk block by block
+            written = 0
+            with open(self.data_path, 'ab') as out:
+                out.truncate(state['bytes_received'])
+                while True:
+                    block = stream.read(STREAM_BLOCK_SIZE)
+                    if not block:
+                        break
+                    out.write(block)
+                    written += len(block)
+
+            state['next_chunk'] += 1
+            state['bytes_received'] += written
+            self._parse_records(state, final=False)
+            self._write_state(state)
+            return self.status()
+        finally:
+            self._release()
+
+    @staticmethod
+    def _record_boundary(segment):
+        """Return the end of the last complete CSV record in a byte segment"""
+        pos = segment.rfind(b'\n')
+        while pos != -1:
+            # A newline only ends a record if it is outside a quoted field
+            if segment.count(b'"', 0, pos) % 2 == 0:
+                return pos + 1
+            pos = segment.rfind(b'\n', 0, pos)
+        return 0
+
+    def _parse_records(self, state, final):
+        """Parse the records received since the last call into an Arrow part"""
+        with open(self.data_path, 'rb') as f:
+            f.seek(state['parsed_offset'])
+            segment = f.read(state['bytes_received'] - state['parsed_offset'])
+
+        end = len(segment) if final else self._record_boundary(segment)
+        if end == 0 or not segment[:end].strip():
+            return
+
+        buffer = io.BytesIO(segment[:end])
+        if state['columns'] is None:
+            part = pd.read_csv(buffer)
+            state['columns'] = part.columns.tolist()
+        else:
+            part = pd.read_csv(buffer, header=None, names=state['columns'])
+
+        feather.write_feather(part, self._part_path(state['n_parts']), compression='uncompressed')
+        state['n_parts'] += 1
+        state['parsed_offset'] += end
+        state['rows_parsed'] = state.get('rows_parsed', 0) + len(part)
+
+    def content_hash(self):
+        """Compute the SHA-256 of the assembled file in a streaming pass"""
+        digest = hashlib.sha256()
+        with open(self.data_path, 'rb') as f:
+            for block in iter(lambda: f.read(STREAM_BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def finalize(self):
+        """
+        Parse any remaining bytes and combine all parts
+
+        Returns:
+            (DataFrame, ingest stats) with the same compact dtypes as read_csv_optimized
+        """
+        self._acquire()
+        try:
+            state = self._read_state()
+            self._parse_records(state, final=True)
+            self._write_state(state)
+
+            ingest = CSVIngest()
+            for index in range(state['n_parts']):
+                ingest.add_chunk(feather.read_feather(self._part_path(index)))
+            return ingest.finalize()
+        finally:
+            self._release()
+
+    def cleanup(self):
+        """Remove every file belonging to the upload"""
+        state = self._read_state() if self.exists() else {'n_parts': 0}
+        paths = [self.data_path, self.state_path, self.lock_path]
+        paths += [self._part_path(index) for index in range(state['n_parts'])]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,120 @@
+"""
+Column statistics index for SmartML Dashboard
+Per-dataset column statistics built once at upload and read by every endpoint
+"""
+import pandas as pd
+from utils.profiler import profile_dataset, profile_column, profile_column_approximate
+from utils.row_hash import RowHashIndex
+
+
+class ColumnIndex:
+    """
+    Per-column statistics of one dataset version
+
+    Holds dtype, null count, distinct count, min/max, quartiles and a
+    histogram for every column (the profile built by utils.profiler), so
+    validation and routing never have to rescan the frame.
+    """
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.columns = profile['columns']
+
+    @classmethod
+    def build(cls, df, ingest_stats=None, row_hashes=None):
+        """Build the index for a dataset (row_hashes: its precomputed row hashes, if any)"""
+        return cls(profile_dataset(df, ingest_stats=ingest_stats, row_hashes=row_hashes))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data)
+
+    def to_dict(self):
+        return self.profile
+
+    def update(self, df, changed_columns=None, rows_changed=True, row_hashes=None):
+        """
+        Return the index of a modified version of the dataset
+
+        Only the columns in changed_columns are profiled again, the others
+        are carried over. When rows were added or removed every column is
+        affected and the index is rebuilt.
+        row_hashes: row hashes of df, if already computed
+        """
+        if rows_changed or changed_columns is None:
+            return ColumnIndex.build(df, row_hashes=row_hashes)
+
+        approximate = 'approximate' in self.profile
+        profile_fn = profile_column_approximate if approximate else profile_column
+        columns = {}
+        for col in df.columns:
+            if col in changed_columns or col not in self.columns:
+                columns[col] = profile_fn(df[col])
+            else:
+                columns[col] = self.columns[col]
+
+        profile = dict(self.profile)
+        profile.update({
+            'n_columns': int(df.shape[1]),
+            'memory_bytes': int(sum(p['memory_bytes'] for p in columns.values()) + df.index.memory_usage()),
+            'columns': columns
+        })
+        if changed_columns or set(df.columns) != set(self.columns):
+            # Duplicates depend on every column, so recount them
+            row_index = RowHashIndex.from_frame(df) if row_hashes is None else RowHashIndex(row_hashes)
+            profile['duplicate_rows'] = row_index.count_duplicates(df)
+        if approximate:
+            profile['approximate'] = dict(profile['approximate'], columns={
+                col: p['approximate'] for col, p in columns.items() if p.get('approximate')
+            })
+        return ColumnIndex(profile)
+
+    @property
+    def n_rows(self):
+        return self.profile['n_rows']
+
+    @property
+    def duplicate_rows(self):
+        return self.profile['duplicate_rows']
+
+    def has_column(self, col):
+        return col in self.columns
+
+    def dtype(self, col):
+        return self.columns[col]['dtype']
+
+    def is_numeric(self, col):
+        return self.columns[col]['is_numeric']
+
+    def is_integer(self, col):
+        return self.is_numeric(col) and pd.api.types.is_integer_dtype(self.dtype(col))
+
+    def nunique(self, col):
+        return self.columns[col]['nunique']
+
+    def null_count(self, col):
+        return self.columns[col]['null_count']
+
+    def min(self, col):
+        return self.columns[col].get('min')
+
+    def max(self, col):
+        return self.columns[col].get('max')
+
+    def quantiles(self, col):
+        """Quartiles of a numeric column, keyed '25%', '50%', '75%'"""
+        return {q: self.columns[col][q] for q in ('25%', '50%', '75%') if q in self.columns[col]}
+
+    def histogram(self, col):
+        """Histogram ({'bin_edges', 'counts'}) of a numeric column"""
+        return self.columns[col].get('histogram')
+
+    def numeric_columns(self):
+        return [col for col, stats in self.columns.items() if stats['is_numeric']]
+
+    def categorical_columns(self):
+        return [col for col, stats in self.columns.items() if stats['is_categorical']]
+
+    def regression_columns(self, min_unique=10):
+        """Numeric columns with more than min_unique distinct values (continuous-like)"""
+        return [col for col in self.numeric_columns() if self.nunique(col) > min_unique]
@@ -0,0 +1,256 @@
+"""
+Dataset storage for SmartML Dashboard
+Keeps uploaded datasets on disk as Arrow IPC files so every worker can reuse them
+"""
+import os
+import re
+import json
+import time
+import uuid
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from config import Config
+
+DATASET_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+# Columns pyarrow adds to hold a pandas index
+PANDAS_INDEX_COLUMNS = {'__index_level_0__'}
+
+
+class DatasetStore:
+    """
+    Persist datasets as uncompressed Arrow IPC files and reopen them memory-mapped
+
+    A dataset derived from another one with the same rows can be saved
+    copy-on-write: its own file only holds the columns that changed and a
+    column manifest (<id>.columns.json) points every other column at the
+    file that already holds it.
+    """
+
+    def __init__(self, folder=None):
+        self.folder = folder or Config.DATASET_FOLDER
+        os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def is_valid_id(dataset_id):
+        """Check that a dataset ID is safe to use as a file name"""
+        return isinstance(dataset_id, str) and bool(DATASET_ID_PATTERN.match(dataset_id))
+
+    def _path(self, dataset_id, extension):
+        if not self.is_valid_id(dataset_id):
+            raise ValueError(f"Invalid dataset id: {dataset_id!r}")
+        return os.path.join(self.folder, f'{dataset_id}.{extension}')
+
+    def _atomic_write(self, path, write):
+        """Write to a temporary file and rename it so readers never see partial files"""
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def exists(self, dataset_id):
+        """Check whether a dataset has been stored"""
+        return self.is_valid_id(dataset_id) and os.path.exists(self._path(dataset_id, 'arrow'))
+
+    def column_sources(self, dataset_id):
+        """
+        Map each column of a stored dataset to the ID of the file holding its data
+
+        Returns:
+            list of (column, dataset ID) pairs in column order
+        """
+        path = self._path(dataset_id, 'columns.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                return [tuple(pair) for pair in json.load(f)]
+        with pa.memory_map(self._path(dataset_id, 'arrow'), 'r') as source:
+            names = pa.ipc.open_file(source).schema.names
+        return [(col, dataset_id) for col in names if col not in PANDAS_INDEX_COLUMNS]
+
+    def n_rows(self, dataset_id):
+        """Number of rows of a stored dataset, read from file metadata only"""
+        sources = self.column_sources(dataset_id)
+        file_id = sources[0][1] if sources else dataset_id
+        with pa.memory_map(self._path(file_id, 'arrow'), 'r') as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+    def save(self, dataset_id, df, meta=None, base=None, changed_columns=None):
+        """
+        Write a dataset (and optional JSON metadata) to the store
+
+        base, changed_columns: the dataset df was derived from and the
+        columns that differ from it. If the rows are the same, only those
+        columns are written and the rest are shared with base.
+        """
+        df = df.reset_index(drop=True)
+        manifest_path = self._path(dataset_id, 'columns.json')
+        if (base is not None and changed_columns is not None and len(df.columns) > 0
+                and self.exists(base) and self.n_rows(base) == len(df)):
+            base_sources = dict(self.column_sources(base))
+            manifest = [
+                [col, base_sources[col] if col in base_sources and col not in changed_columns else dataset_id]
+                for col in df.columns
+            ]
+            own_columns = [col for col, source in manifest if source == dataset_id]
+
+            def write_manifest(path):
+                with open(path, 'w') as f:
+                    json.dump(manifest, f)
+            # The manifest goes first so the data file never appears without it
+            self._atomic_write(manifest_path, write_manifest)
+            self._atomic_write(
+                self._path(dataset_id, 'arrow'),
+                lambda path: feather.write_feather(df[own_columns], path, compression='uncompressed')
+            )
+        else:
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            self._atomic_write(
+                self._path(dataset_id, 'arrow'),
+                lambda path: feather.write_feather(df, path, compression='uncompressed')
+            )
+        if meta is not None:
+            self.save_meta(dataset_id, meta)
+
+    def load(self, dataset_id, columns=None):
+        """
+        Load a dataset from its memory-mapped Arrow file
+
+        Uncompressed numeric columns without nulls are handed to pandas
+        without copying, so their pages are shared between workers
+        through the OS page cache. Columns shared with other datasets are
+        read from the files that hold them.
+        columns: load only these columns (default: all)
+        """
+        if not os.path.exists(self._path(dataset_id, 'columns.json')):
+            with pa.memory_map(self._path(dataset_id, 'arrow'), 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(list(columns))
+            return table.to_pandas(split_blocks=True)
+
+        sources = self.column_sources(dataset_id)
+        if columns is not None:
+            file_ids = dict(sources)
+            sources = [(col, file_ids[col]) for col in columns]
+        tables = {}
+        for file_id in dict.fromkeys(source for _, source in sources):
+            with pa.memory_map(self._path(file_id, 'arrow'), 'r') as source:
+                tables[file_id] = pa.ipc.open_file(source).read_all()
+        table = pa.Table.from_arrays(
+            [tables[file_id].column(col) for col, file_id in sources],
+            names=[col for col, _ in sources]
+        )
+        return table.to_pandas(split_blocks=True)
+
+    def save_meta(self, dataset_id, meta):
+        """Write JSON metadata stored next to a dataset"""
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(meta, f, default=str)
+        self._atomic_write(self._path(dataset_id, 'json'), write)
+
+    def load_meta(self, dataset_id):
+        """Read the JSON metadata of a dataset, or an empty dict if there is none"""
+        path = self._path(dataset_id, 'json')
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def save_row_hashes(self, dataset_id, hashes):
+        """Write the 64-bit row hashes of a dataset (see utils.row_hash)"""
+        def write(path):
+            with open(path, 'wb') as f:
+                np.save(f, np.asarray(hashes, dtype=np.uint64))
+        self._atomic_write(self._path(dataset_id, 'rowhash.npy'), write)
+
+    def load_row_hashes(self, dataset_id):
+        """Memory-map the row hashes of a dataset, or None if they were never saved"""
+        path = self._path(dataset_id, 'rowhash.npy')
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r')
+
+    def delete(self, dataset_id):
+        """
+        Remove a dataset and its metadata from the store
+        Datasets sharing its columns have to be deleted first.
+        """
+        for extension in ('arrow', 'json', 'columns.json', 'rowhash.npy'):
+            path = self._path(dataset_id, extension)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def add_version(self, root_id, version):
+        """
+        Record a version in the lineage of an uploaded dataset
+
+        version: dict with at least 'session_id', 'parent' and 'operation'.
+        Entries are appended one JSON line at a time, so concurrent
+        workers never overwrite each other.
+        """
+        line = json.dumps(dict(version, created_at=version.get('created_at', time.time())), default=str)
+        with open(self._path(root_id, 'versions.jsonl'), 'a') as f:
+            f.write(line + '\n')
+
+    def versions(self, root_id):
+        """List the recorded versions of a dataset lineage, oldest first"""
+        path = self._path(root_id, 'versions.jsonl')
+        if not os.path.exists(path):
+            return []
+        versions = {}
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    version = json.loads(line)
+                    versions.setdefault(version['session_id'], version)
+        return list(versions.values())
+
+    def diff(self, base_id, target_id):
+        """
+        Compare two stored datasets column by column
+
+        The manifests are compared first: columns backed by the same file
+        are identical and never read, and only the columns whose files
+        differ are loaded, so the cost grows with the number of changed
+        columns only.
+        """
+        base_sources = dict(self.column_sources(base_id))
+        target_sources = dict(self.column_sources(target_id))
+        base_rows, target_rows = self.n_rows(base_id), self.n_rows(target_id)
+        common = [col for col in target_sources if col in base_sources]
+        candidates = [col for col in common if base_sources[col] != target_sources[col]]
+
+        changed = {}
+        if candidates:
+            base_df, target_df = self.load(base_id, candidates), self.load(target_id, candidates)
+            for col in candidates:
+                before, after = base_df[col], target_df[col]
+                dtypes = {'dtype_before': str(before.dtype), 'dtype_after': str(after.dtype)}
+                if base_rows != target_rows:
+                    # Rows were added or removed, values cannot be matched up
+                    changed[col] = dtypes
+                    continue
+                if isinstance(before.dtype, pd.CategoricalDtype) or isinstance(after.dtype, pd.CategoricalDtype):
+                    before, after = before.astype(object), after.astype(object)
+                differs = (before != after) & ~(before.isna() & after.isna())
+                n_changed = int(differs.sum())
+                if n_changed or dtypes['dtype_before'] != dtypes['dtype_after']:
+                    changed[col] = dict(dtypes, changed_values=n_changed)
+
+        return {
+            'base': base_id,
+            'target': target_id,
+            'rows_before': base_rows,
+            'rows_after': target_rows,
+            'columns_added': [col for col in target_sources if col not in base_sources],
+            'columns_removed': [col for col in base_sources if col not in target_sources],
+            'columns_changed': changed,
+            'columns_shared': [col for col in common if base_sources[col] == target_sources[col]]
+        }
@@ -2,68 +2,104 @@
 Helper utilities for SmartML Dashboard
 """
 import os
-import pandas as pd
+import json
+import uuid
+import hashlib
 from werkzeug.utils import secure_filename
 from config import Config
+from utils.column_index import ColumnIndex
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
+HASH_BLOCK_SIZE = 1024 * 1024  # Bytes read per block while hashing uploads
+
 def save_uploaded_file(file):
-    """Save uploaded file and return path"""
+    """
+    Save uploaded file and return (path, content hash)
+    The file is streamed to disk in blocks while its SHA-256 is computed,
+    so the hash costs no extra pass over the data.
+    """
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
+        filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
         filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
-        file.save(filepath)
-        return filepath
-    return None
+        digest = hashlib.sha256()
+        with open(filepath, 'wb') as out:
+            while True:
+                block = file.stream.read(HASH_BLOCK_SIZE)
+                if not block:
+                    break
+                digest.update(block)
+                out.write(block)
+        return filepath, digest.hexdigest()
+    return None, None
+
+def dataset_id_from_hash(content_hash):
+    """Build a dataset ID from the SHA-256 of the uploaded bytes"""
+    return content_hash[:32]
+
+def derive_dataset_id(parent_id, operation, params=None):
+    """Build a deterministic dataset ID for data derived from another dataset"""
+    key = json.dumps([parent_id, operation, params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
 
-def get_dataset_info(df):
-    """Get comprehensive dataset information"""
-    numeric_cols = df.select_dtypes(include=['int64', 'float64']).columns.tolist()
+def get_dataset_info(df, column_index=None):
+    """
+    Get comprehensive dataset information
+    column_index: the dataset's ColumnIndex, so the frame is not rescanned
+    """
+    if column_index is None:
+        column_index = ColumnIndex.build(df)
+    profile = column_index.profile
     
-    # Filter numeric columns suitable for regression (exclude binary/low-cardinality columns)
-    regression_cols = []
-    for col in numeric_cols:
-        n_unique = df[col].nunique()
-        # Include only if has more than 10 unique values (continuous-like)
-        if n_unique > 10:
-            regression_cols.append(col)
+    n_rows = column_index.n_rows
+    missing = {col: column_index.null_count(col) for col in df.columns}
     
     info = {
-        'shape': df.shape,
+        'shape': (n_rows, profile['n_columns']),
         'columns': df.columns.tolist(),
-        'dtypes': df.dtypes.astype(str).to_dict(),
-        'missing_values': df.isnull().sum().to_dict(),
-        'missing_percentage': (df.isnull().sum() / len(df) * 100).round(2).to_dict(),
-        'numeric_columns': numeric_cols,
-        'regression_columns': regression_cols,  # New: columns suitable for regression
-        'categorical_columns': df.select_dtypes(include=['object', 'category']).columns.tolist(),
-        'memory_usage': f"{df.memory_usage(deep=True).sum() / 1024**2:.2f} MB"
+        'dtypes': {col: column_index.dtype(col) for col in df.columns},
+        'missing_values': missing,
+        'missing_percentage': {col: round(count / n_rows * 100, 2) if n_rows else 0.0
+                               for col, count in missing.items()},
+        'numeric_columns': column_index.numeric_columns(),
+        # Numeric columns suitable for regression (exclude binary/low-cardinality columns)
+        'regression_columns': column_index.regression_columns(),
+        'categorical_columns': column_index.categorical_columns(),
+        'memory_usage': f"{profile['memory_bytes'] / 1024**2:.2f} MB"
     }
+    
+    # Large datasets are profiled with sketches: report which figures are estimates
+    if 'approximate' in profile:
+        info['approximate'] = profile['approximate']
     return info
 
-def get_summary_statistics(df):
+def get_summary_statistics(df, column_index=None):
     """Get summary statistics for dataset"""
-    numeric_df = df.select_dtypes(include=['int64', 'float64'])
-    if not numeric_df.empty:
-        return numeric_df.describe().to_dict()
-    return {}
+    if column_index is None:
+        column_index = ColumnIndex.build(df)
+    stat_names = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+    return {
+        col: {name: column_index.columns[col][name] for name in stat_names if name in column_index.columns[col]}
+        for col in column_index.numeric_columns()
+    }
 
-def detect_problem_type(df, target_column):
-    """Detect if problem is classification or regression"""
-    if target_column not in df.columns:
+def detect_problem_type(df, target_column, column_index=None):
+    """
+    Detect if problem is classification or regression
+    column_index: the dataset's ColumnIndex; when given, df is not read at all
+    """
+    if column_index is None:
+        column_index = ColumnIndex.build(df[[target_column]]) if target_column in df.columns else None
+    if column_index is None or not column_index.has_column(target_column):
         return None
     
-    target = df[target_column]
-    
     # Check if numeric
-    if pd.api.types.is_numeric_dtype(target):
+    if column_index.is_numeric(target_column):
         # If unique values are less than 10 and all integers, likely classification
-        unique_values = target.nunique()
-        if unique_values <= 10 and target.dtype in ['int64', 'int32']:
+        if column_index.nunique(target_column) <= 10 and column_index.is_integer(target_column):
             return 'classification'
         return 'regression'
     else:
@@ -75,11 +111,8 @@ def format_metric(value, decimals=4):
         return round(value, decimals)
     return value
 
-def get_feature_target_split(df, target_column):
-    """Split dataframe into features and target"""
-    if target_column not in df.columns:
-        raise ValueError(f"Target column '{target_column}' not found in dataset")
-    
+def select_feature_columns(columns, target_column):
+    """Columns usable as features: everything except the target and outcome/derived columns"""
     # List of common outcome/derived columns that should be excluded as features
     outcome_patterns = [
         'Grade', 'grade',
@@ -93,23 +126,12 @@ def get_feature_target_split(df, target_column):
         'LoyaltyTier', 'loyalty_tier'
     ]
     
-    # Columns to drop: target + outcome/derived columns
-    cols_to_drop = [target_column]
-    
-    for col in df.columns:
+    features = []
+    for col in columns:
         if col == target_column:
             continue
         # Check if column name matches outcome patterns
         col_lower = col.lower()
-        for pattern in outcome_patterns:
-            if pattern.lower() in col_lower:
-                cols_to_drop.append(col)
-                break
-    
-    X = df.drop(columns=cols_to_drop)
-    y = df[target_column]
-    
-    # Handle categorical features
-    X = pd.get_dummies(X, drop_first=True)
-    
-    return X, y
+        if not any(pattern.lower() in col_lower for pattern in outcome_patterns):
+            features.append(col)
+    return features
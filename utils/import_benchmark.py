@@ -0,0 +1,95 @@
+"""
+Import-time benchmark for SmartML Dashboard
+Measures how long a fresh worker takes to import the app, and how much memory it holds
+
+Usage: python -m utils.import_benchmark [--module app] [--runs 5] [--top 15] [--warm]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries that should only be imported when a request needs them
+HEAVY_MODULES = ['sklearn', 'matplotlib', 'seaborn', 'plotly', 'scipy.stats']
+
+_PROBE = '''
+import sys, time, json, resource
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter() - start
+warm = None
+if {warm}:
+    from utils.lazy_import import warm_up
+    from config import Config
+    start = time.perf_counter()
+    warm_up(Config.PRELOAD_MODULES)
+    warm = time.perf_counter() - start
+print(json.dumps({{
+    'seconds': imported,
+    'warm_up_seconds': warm,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy_modules': [name for name in {heavy!r} if name in sys.modules]
+}}))
+'''
+
+
+def run_once(module, warm=False):
+    """Import module in a fresh interpreter; return its measurements and the -X importtime log"""
+    code = _PROBE.format(module=module, warm=warm, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+
+def slowest_imports(importtime_log, top=15, max_level=1):
+    """
+    (cumulative microseconds, module) of the slowest imports in an -X importtime log
+    Level 0 is what the probe imports (the module itself), level 1 what that imports directly.
+    """
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level <= max_level:
+            rows.append((int(cumulative), '  ' * level + name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--module', default='app', help='module to import (default: app)')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to time')
+    parser.add_argument('--top', type=int, default=15, help='slowest imports to list')
+    parser.add_argument('--warm', action='store_true',
+                        help='also time warm_up(), as done before forking in gunicorn preload mode')
+    args = parser.parse_args(argv)
+
+    results, log = [], ''
+    for _ in range(args.runs):
+        result, log = run_once(args.module, args.warm)
+        results.append(result)
+
+    seconds = [r['seconds'] for r in results]
+    print(f"import {args.module}: median {statistics.median(seconds):.3f}s "
+          f"(min {min(seconds):.3f}s, max {max(seconds):.3f}s over {args.runs} runs)")
+    print(f"max RSS: {max(r['max_rss_kb'] for r in results) / 1024:.1f} MB")
+    if args.warm:
+        warm = [r['warm_up_seconds'] for r in results]
+        print(f"warm_up: median {statistics.median(warm):.3f}s")
+    else:
+        heavy = results[-1]['heavy_modules']
+        print(f"heavy modules imported at startup: {', '.join(heavy) if heavy else 'none'}")
+
+    print("\nslowest imports (cumulative, last run):")
+    for cumulative, name in slowest_imports(log, args.top):
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
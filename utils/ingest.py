@@ -0,0 +1,153 @@
+"""
+Dataset ingest utilities for SmartML Dashboard
+Streams CSV files in chunks and stores columns with compact dtypes
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from config import Config
+
+
+def downcast_numeric(series):
+    """Downcast a numeric series to the smallest dtype that holds it losslessly"""
+    if pd.api.types.is_bool_dtype(series):
+        return series
+
+    if pd.api.types.is_integer_dtype(series):
+        return pd.to_numeric(series, downcast='integer')
+
+    if pd.api.types.is_float_dtype(series) and series.dtype != np.float32:
+        values = series.to_numpy()
+        as_float32 = values.astype(np.float32)
+        # Only keep float32 if every value survives the round trip
+        if np.array_equal(as_float32.astype(values.dtype), values, equal_nan=True):
+            return pd.Series(as_float32, index=series.index, name=series.name)
+
+    return series
+
+
+class CSVIngest:
+    """Incrementally build a compact DataFrame and its column stats from CSV chunks"""
+
+    def __init__(self, max_categories=None, max_category_ratio=None):
+        self.max_categories = max_categories or Config.CATEGORY_MAX_UNIQUE
+        self.max_category_ratio = max_category_ratio or Config.CATEGORY_MAX_RATIO
+        self.chunks = []
+        self.n_rows = 0
+        self.column_stats = {}
+        self.high_cardinality = set()
+
+    def add_chunk(self, chunk):
+        """Optimize dtypes of a raw chunk and fold it into the running stats"""
+        chunk = chunk.reset_index(drop=True)
+
+        for col in chunk.columns:
+            series = chunk[col]
+            if pd.api.types.is_numeric_dtype(series):
+                series = downcast_numeric(series)
+            elif series.dtype == object and col not in self.high_cardinality:
+                series = series.astype('category')
+            chunk[col] = series
+            self._update_stats(col, series)
+
+        self.n_rows += len(chunk)
+        self.chunks.append(chunk)
+        self._check_cardinality()
+        return chunk
+
+    def _update_stats(self, col, series):
+        """Accumulate null counts and numeric moments for one column chunk"""
+        stats = self.column_stats.setdefault(col, {
+            'null_count': 0, 'count': 0, 'mean': 0.0, 'm2': 0.0,
+            'min': None, 'max': None, 'categories': set()
+        })
+
+        null_count = int(series.isna().sum())
+        stats['null_count'] += null_count
+
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if len(values) > 0:
+                # Combine count, mean and sum of squared deviations across chunks (Chan et al.);
+                # a raw sum of squares cancels catastrophically for large, tightly spread values
+                n_a, n_b = stats['count'], len(values)
+                chunk_mean = float(values.mean())
+                chunk_m2 = float(np.square(values - chunk_mean).sum())
+                n = n_a + n_b
+                delta = chunk_mean - stats['mean']
+                stats['mean'] += delta * n_b / n
+                stats['m2'] += chunk_m2 + delta ** 2 * n_a * n_b / n
+                stats['count'] = n
+                chunk_min, chunk_max = float(values.min()), float(values.max())
+                stats['min'] = chunk_min if stats['min'] is None else min(stats['min'], chunk_min)
+                stats['max'] = chunk_max if stats['max'] is None else max(stats['max'], chunk_max)
+        else:
+            stats['count'] += len(series) - null_count
+            if isinstance(series.dtype, pd.CategoricalDtype) and col not in self.high_cardinality:
+                stats['categories'].update(series.cat.categories)
+
+    def _check_cardinality(self):
+        """Turn categorical columns back to strings once they stop being low-cardinality"""
+        for col, stats in self.column_stats.items():
+            if col in self.high_cardinality:
+                continue
+            n_categories = len(stats['categories'])
+            if n_categories > self.max_categories or \
+               (self.n_rows >= self.max_categories and n_categories > self.n_rows * self.max_category_ratio):
+                self.high_cardinality.add(col)
+                stats['categories'] = set()
+                for chunk in self.chunks:
+                    if col in chunk.columns and isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                        chunk[col] = chunk[col].astype(object)
+
+    def _combine_column(self, parts):
+        """Concatenate the chunks of a single column, unifying categoricals"""
+        if all(isinstance(p.dtype, pd.CategoricalDtype) for p in parts):
+            return pd.Series(union_categoricals(parts, ignore_order=True))
+        parts = [p.astype(object) if isinstance(p.dtype, pd.CategoricalDtype) else p for p in parts]
+        return pd.concat(parts, ignore_index=True)
+
+    def get_stats(self):
+        """Finalize the running stats into per-column summaries"""
+        columns = {}
+        for col, stats in self.column_stats.items():
+            summary = {'null_count': stats['null_count'], 'count': stats['count']}
+            if stats['min'] is not None:
+                variance = stats['m2'] / (stats['count'] - 1) if stats['count'] > 1 else 0.0
+                summary.update({
+                    'mean': stats['mean'],
+                    'std': float(np.sqrt(variance)),
+                    'min': stats['min'],
+                    'max': stats['max']
+                })
+            columns[col] = summary
+        return {'rows': self.n_rows, 'columns': columns}
+
+    def finalize(self):
+        """Combine all chunks into the final frame and return it with its stats"""
+        if not self.chunks:
+            return pd.DataFrame(), self.get_stats()
+
+        columns = self.chunks[0].columns
+        combined = {col: self._combine_column([chunk[col] for chunk in self.chunks]) for col in columns}
+        self.chunks = []
+        df = pd.DataFrame(combined, columns=columns)
+        return df, self.get_stats()
+
+
+def read_csv_optimized(filepath, chunksize=None):
+    """
+    Read a CSV file chunk by chunk with compact dtypes
+
+    Numeric columns are downcast (int8/int16/float32 where lossless) and
+    low-cardinality string columns become categoricals while reading, so
+    the full object-typed frame is never materialized.
+
+    Returns:
+        (DataFrame, stats) where stats holds per-column null counts and moments
+    """
+    ingest = CSVIngest()
+    for chunk in pd.read_csv(filepath, chunksize=chunksize or Config.INGEST_CHUNK_SIZE):
+        ingest.add_chunk(chunk)
+    return ingest.finalize()
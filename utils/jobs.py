@@ -0,0 +1,289 @@
+"""
+Background jobs for SmartML Dashboard
+Long-running work (model training) runs in separate processes and is polled by job ID
+"""
+import os
+import re
+import json
+import time
+import uuid
+import threading
+import multiprocessing
+from collections import deque
+import joblib
+from config import Config
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+FINISHED_STATES = ('succeeded', 'failed', 'cancelled', 'timed_out')
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit when the queue of waiting jobs is full"""
+
+
+def worker_context():
+    """
+    multiprocessing context for worker processes (plot rendering, jobs)
+
+    forkserver where available: workers fork from a server that has already
+    imported Config.WORKER_PRELOAD_MODULES. Otherwise spawn.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(Config.WORKER_PRELOAD_MODULES)
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _run_job(conn, fn, args, kwargs, initializer, initargs):
+    """Body of a job process: run fn and send back ('succeeded', result) or ('failed', message)"""
+    try:
+        if initializer is not None:
+            initializer(*initargs)
+        outcome = ('succeeded', fn(*args, **kwargs))
+    except Exception as e:
+        outcome = ('failed', str(e))
+    try:
+        conn.send(outcome)
+    except Exception as e:
+        conn.send(('failed', f"Could not return the job result: {str(e)}"))
+    conn.close()
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobManager:
+    """
+    Run functions as background jobs, each in its own process
+
+    At most max_workers jobs run at once; up to max_queue more wait for a
+    process, and submit() raises JobQueueFull beyond that. A running job
+    is terminated when it is cancelled or exceeds its time limit.
+
+    The state of every job (and its result) is written to folder, so any
+    app worker can report on a job started by another one. Cancellation
+    requests for jobs of another worker are left there as marker files.
+    Limits apply per app worker.
+    """
+
+    def __init__(self, folder=None, max_workers=None, max_queue=None, time_limit=None,
+                 initializer=None, initargs=()):
+        self.folder = folder or Config.JOB_FOLDER
+        self.max_workers = max_workers or Config.JOB_WORKERS
+        self.max_queue = Config.JOB_MAX_QUEUE if max_queue is None else max_queue
+        self.time_limit = time_limit or Config.JOB_TIME_LIMIT
+        self.initializer = initializer
+        self.initargs = initargs
+        self._queue = deque()  # (job_id, fn, args, kwargs), oldest first
+        self._running = {}  # job_id -> (process, connection, deadline)
+        self._states = {}  # job_id -> state of the jobs owned by this manager
+        self._cond = threading.Condition()
+        self._dispatcher = None
+        self._context = None
+        os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def is_valid_id(job_id):
+        return bool(job_id) and bool(JOB_ID_PATTERN.match(job_id))
+
+    def _path(self, job_id, suffix):
+        if not self.is_valid_id(job_id):
+            raise ValueError(f"Invalid job ID: {job_id!r}")
+        return os.path.join(self.folder, f'{job_id}.{suffix}')
+
+    def _write_state(self, job_id, **changes):
+        state = self._states[job_id]
+        state.update(changes, updated_at=time.time())
+        path = self._path(job_id, 'json')
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+        self._cond.notify_all()
+
+    def submit(self, fn, args=(), kwargs=None, info=None, time_limit=None):
+        """
+        Queue fn(*args, **kwargs) to run in a job process; return the job ID
+
+        info: JSON-serializable description stored with the job (e.g. the algorithm)
+        time_limit: seconds the job may run, capped at Config.JOB_MAX_TIME_LIMIT
+        """
+        time_limit = min(time_limit or self.time_limit, Config.JOB_MAX_TIME_LIMIT)
+        job_id = uuid.uuid4().hex
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                raise JobQueueFull(f"Too many jobs waiting ({len(self._queue)}), try again later")
+            self._states[job_id] = {
+                'job_id': job_id,
+                'status': 'queued',
+                'info': info or {},
+                'time_limit': time_limit,
+                'submitted_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'error': None,
+                'owner_pid': os.getpid()
+            }
+            self._write_state(job_id)
+            self._queue.append((job_id, fn, args, kwargs or {}))
+            if self._dispatcher is None or not self._dispatcher.is_alive():
+                self._dispatcher = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+                self._dispatcher.start()
+        self._remove_expired()
+        return job_id
+
+    def status(self, job_id):
+        """State of a job (from any app worker), or None if there is no such job"""
+        if not self.is_valid_id(job_id):
+            return None
+        try:
+            with open(self._path(job_id, 'json')) as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if state['status'] not in FINISHED_STATES and not _process_alive(state['owner_pid']):
+            # The app worker that owned the job was restarted, and its job processes with it
+            state.update(status='failed', error='The job was lost when its worker restarted')
+        state['cancel_requested'] = os.path.exists(self._path(job_id, 'cancel'))
+        return state
+
+    def result(self, job_id):
+        """Return value of a succeeded job, or None"""
+        path = self._path(job_id, 'result.joblib')
+        return joblib.load(path) if os.path.exists(path) else None
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job
+
+        Returns the job state, or None if there is no such job. Jobs of
+        another app worker are cancelled by that worker shortly after.
+        """
+        state = self.status(job_id)
+        if state is None or state['status'] in FINISHED_STATES:
+            return state
+        with open(self._path(job_id, 'cancel'), 'w'):
+            pass
+        with self._cond:
+            self._cond.notify_all()
+            if job_id in self._states:
+                self._check_cancelled()
+        return self.status(job_id)
+
+    def _dispatch(self):
+        """Dispatcher thread: start queued jobs and watch running ones"""
+        with self._cond:
+            while True:
+                self._check_cancelled()
+                self._check_running()
+                self._start_queued()
+                self._cond.wait(Config.JOB_POLL_INTERVAL if self._queue or self._running else None)
+
+    def _start_queued(self):
+        while self._queue and len(self._running) < self.max_workers:
+            job_id, fn, args, kwargs = self._queue.popleft()
+            if self._context is None:
+                self._context = worker_context()
+            parent_conn, child_conn = self._context.Pipe(duplex=False)
+            process = self._context.Process(
+                target=_run_job, name=f'job-{job_id}', daemon=True,
+                args=(child_conn, fn, args, kwargs, self.initializer, self.initargs)
+            )
+            try:
+                process.start()
+            except Exception as e:
+                self._finish(job_id, 'failed', f"Could not start the job: {str(e)}")
+                continue
+            finally:
+                child_conn.close()
+            deadline = time.monotonic() + self._states[job_id]['time_limit']
+            self._running[job_id] = (process, parent_conn, deadline)
+            self._write_state(job_id, status='running', started_at=time.time())
+
+    def _check_cancelled(self):
+        for job_id, *_ in list(self._queue):
+            if os.path.exists(self._path(job_id, 'cancel')):
+                self._queue = deque(job for job in self._queue if job[0] != job_id)
+                self._finish(job_id, 'cancelled', None)
+        for job_id in list(self._running):
+            if os.path.exists(self._path(job_id, 'cancel')):
+                self._stop(job_id)
+                self._finish(job_id, 'cancelled', None)
+
+    def _check_running(self):
+        for job_id, (process, conn, deadline) in list(self._running.items()):
+            # Checked before polling: a process that has exited has sent everything it will send
+            alive = process.is_alive()
+            if conn.poll():
+                try:
+                    status, payload = conn.recv()
+                except (EOFError, OSError):
+                    status, payload = 'failed', f"The job process exited with code {process.exitcode}"
+                process.join(1)
+                self._finish(job_id, status, payload)
+            elif not alive:
+                self._finish(job_id, 'failed', f"The job process exited with code {process.exitcode}")
+            elif time.monotonic() > deadline:
+                self._stop(job_id)
+                self._finish(job_id, 'timed_out',
+                             f"The job exceeded its time limit of {self._states[job_id]['time_limit']}s")
+
+    def _stop(self, job_id):
+        process = self._running[job_id][0]
+        process.terminate()
+        process.join(1)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def _finish(self, job_id, status, payload):
+        running = self._running.pop(job_id, None)
+        if running is not None:
+            running[1].close()
+        error = None
+        if status == 'succeeded':
+            path = self._path(job_id, 'result.joblib')
+            tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            joblib.dump(payload, tmp_path)
+            os.replace(tmp_path, path)
+        else:
+            error = payload
+        if os.path.exists(self._path(job_id, 'cancel')):
+            os.remove(self._path(job_id, 'cancel'))
+        self._write_state(job_id, status=status, error=error, finished_at=time.time())
+        # Finished jobs are served from disk from now on
+        del self._states[job_id]
+
+    def _remove_expired(self):
+        """Delete the files of jobs that finished more than Config.JOB_RETENTION seconds ago"""
+        cutoff = time.time() - Config.JOB_RETENTION
+        for name in os.listdir(self.folder):
+            job_id = name.split('.', 1)[0]
+            if not name.endswith('.json') or not self.is_valid_id(job_id):
+                continue
+            state = self.status(job_id)
+            if state is None or state['status'] not in FINISHED_STATES:
+                continue
+            if (state['finished_at'] or state['updated_at']) < cutoff:
+                for suffix in ('json', 'result.joblib', 'cancel'):
+                    if os.path.exists(self._path(job_id, suffix)):
+                        os.remove(self._path(job_id, suffix))
+
+    def stats(self):
+        """Jobs of this app worker and its limits"""
+        with self._cond:
+            return {
+                'queued': len(self._queue),
+                'running': len(self._running),
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'time_limit': self.time_limit
+            }
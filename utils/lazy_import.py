@@ -0,0 +1,58 @@
+"""
+Deferred imports for SmartML Dashboard
+Heavy libraries (matplotlib, seaborn, plotly, scikit-learn) are imported on
+first use, so workers that only serve uploads start fast and stay small
+"""
+import importlib
+import threading
+
+_lazy_modules = []
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access
+
+    name: module to import
+    loader: optional callable returning the module, for imports that need
+            setup (e.g. selecting the matplotlib backend first)
+    """
+
+    def __init__(self, name, loader=None):
+        self._name = name
+        self._loader = loader or (lambda: importlib.import_module(name))
+        self._module = None
+        self._lock = threading.Lock()
+        _lazy_modules.append(self)
+
+    def load(self):
+        """Import the module now (once) and return it"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = self._loader()
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f'<LazyModule {self._name!r} ({state})>'
+
+
+def warm_up(names=()):
+    """
+    Import every lazy module created so far and the modules in names
+
+    Called before forking workers (gunicorn preload mode) so they share the
+    imported modules copy-on-write instead of each importing them again.
+    """
+    for module in list(_lazy_modules):
+        module.load()
+    for name in names:
+        importlib.import_module(name)
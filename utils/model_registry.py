@@ -0,0 +1,90 @@
+"""
+Model registry for SmartML Dashboard
+Trained models kept by key for predictions, on disk and in a warm in-memory LRU
+"""
+import time
+import numpy as np
+from config import Config
+from utils.cache import MemoryBudgetCache
+
+
+class ModelRegistry:
+    """
+    Trained models that can serve predictions without retraining
+
+    An entry is a trained RegressionModel or ClassificationModel stripped
+    of its training data (see for_prediction()), so it still holds the
+    fitted estimator, the feature pipeline that encodes raw column values
+    and the feature names, plus a JSON-friendly description. Entries are
+    written to folder with joblib as soon as they are registered (so every
+    worker and job process shares them) and kept in memory up to max_bytes.
+    """
+
+    def __init__(self, folder=None, max_bytes=None):
+        self.folder = folder or Config.MODEL_CACHE_FOLDER
+        self.cache = MemoryBudgetCache(max_bytes or Config.MODEL_CACHE_MAX_BYTES, spill_folder=self.folder)
+
+    def register(self, key, model, info=None):
+        """
+        Store a trained model under key and return the description kept with it
+        key: stable ID of the model (e.g. derived from the dataset version and
+             training parameters), so retraining the same model replaces it
+        """
+        pipeline = model.pipeline
+        description = dict(info or {})
+        description.update(
+            model_key=key,
+            input_columns=list(pipeline.input_columns_) if pipeline is not None else list(model.feature_names),
+            columns=self._input_schema(model),
+            n_features=len(model.feature_names),
+            registered_at=time.time()
+        )
+        self.cache.put(key, {'model': model.for_prediction(), 'info': description}, persist=True)
+        return description
+
+    @staticmethod
+    def _input_schema(model):
+        """
+        Kind ('numeric' or 'categorical') of every input column, for a prediction form
+        Categories are listed for one-hot encoded columns, whose values are a
+        closed set; other categorical columns take any value.
+        """
+        pipeline = model.pipeline
+        if pipeline is None:
+            return [{'name': name, 'kind': 'numeric', 'categories': None} for name in model.feature_names]
+        schema = []
+        for col in pipeline.input_columns_:
+            if col in pipeline.numeric_columns_:
+                schema.append({'name': col, 'kind': 'numeric', 'categories': None})
+                continue
+            categories = None
+            if pipeline.encodings_.get(col) == 'onehot':
+                categories = [value.item() if isinstance(value, np.generic) else value
+                              for value in pipeline.categories_[col]]
+            schema.append({'name': col, 'kind': 'categorical', 'categories': categories})
+        return schema
+
+    def get(self, key):
+        """Entry ({'model', 'info'}) of a registered model, or None"""
+        return self.cache.get(key)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def predict(self, key, input_values):
+        """
+        Predict a single record with a registered model
+
+        input_values: dict of raw column values (the model's input_columns)
+        Raises KeyError for an unknown model and ValueError for bad input.
+        """
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        result = entry['model'].predict_single(input_values)
+        info = entry['info']
+        result.update(model_key=key, algorithm=info.get('algorithm'), target_column=info.get('target_column'))
+        return result
+
+    def stats(self):
+        return self.cache.stats()
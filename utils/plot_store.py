@@ -0,0 +1,74 @@
+"""
+Plot image storage for SmartML Dashboard
+Rendered plots are kept on disk as content-addressed artifacts and served by URL
+"""
+import os
+import re
+import io
+import uuid
+import hashlib
+from config import Config
+
+try:
+    from PIL import Image
+except ImportError:  # WebP variants need Pillow
+    Image = None
+
+PLOT_KEY_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class PlotStore:
+    """
+    Store of rendered plot images
+
+    Every image is named after the hash of its bytes, so a key always
+    refers to the same image and can be cached by browsers forever.
+    A WebP copy of a PNG is made the first time it is requested.
+    """
+
+    def __init__(self, folder=None):
+        self.folder = folder or Config.PLOT_FOLDER
+        os.makedirs(self.folder, exist_ok=True)
+
+    @staticmethod
+    def is_valid_key(key):
+        return bool(key) and bool(PLOT_KEY_PATTERN.match(key))
+
+    def path(self, key, image_format='png'):
+        if not self.is_valid_key(key):
+            raise ValueError(f"Invalid plot key: {key!r}")
+        return os.path.join(self.folder, f'{key}.{image_format}')
+
+    def _write(self, path, data):
+        if os.path.exists(path):
+            return
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def put(self, data):
+        """Store PNG bytes and return their key"""
+        key = hashlib.sha256(data).hexdigest()[:32]
+        self._write(self.path(key), data)
+        return key
+
+    def exists(self, key):
+        return self.is_valid_key(key) and os.path.exists(self.path(key))
+
+    def webp_path(self, key):
+        """Path of the WebP copy of a plot, made on first use; None without Pillow"""
+        if Image is None:
+            return None
+        path = self.path(key, 'webp')
+        if not os.path.exists(path):
+            buf = io.BytesIO()
+            with Image.open(self.path(key)) as image:
+                # Lossless keeps text and lines as sharp as the PNG
+                image.save(buf, format='WEBP', lossless=True, method=4)
+            self._write(path, buf.getvalue())
+        return path
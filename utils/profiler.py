@@ -0,0 +1,192 @@
+"""
+Dataset profiling for SmartML Dashboard
+Computes every per-column statistic used by the dashboard in a single pass
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from config import Config
+from utils.sketches import HyperLogLog, QuantileSketch, hash_values
+from utils.row_hash import RowHashIndex
+
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _sorted_quantile(sorted_values, q):
+    """Linear-interpolated quantile of an already sorted array (same as pandas)"""
+    position = (len(sorted_values) - 1) * q
+    lower = int(np.floor(position))
+    upper = min(lower + 1, len(sorted_values) - 1)
+    fraction = position - lower
+    return float(sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * fraction)
+
+
+def _histogram(values):
+    """Histogram of valid numeric values with Config.HISTOGRAM_BINS equal-width bins"""
+    counts, edges = np.histogram(values, bins=Config.HISTOGRAM_BINS)
+    return {'bin_edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+def profile_column(series, column_stats=None):
+    """
+    Profile one column
+
+    Numeric columns are sorted once; null count, distinct count, min/max,
+    quartiles and the histogram all come from that single sorted copy.
+    column_stats can carry null counts of non-numeric columns already
+    gathered at ingest time.
+    """
+    is_numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+    profile = {
+        'dtype': str(series.dtype),
+        'is_numeric': bool(is_numeric),
+        'is_categorical': bool(series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype)),
+        'memory_bytes': int(series.memory_usage(deep=True, index=False))
+    }
+
+    if is_numeric:
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = np.sort(values[~np.isnan(values)])
+        count = len(valid)
+        profile['null_count'] = int(len(values) - count)
+        profile['count'] = int(count)
+        if count == 0:
+            profile['nunique'] = 0
+            return profile
+
+        profile['nunique'] = int(1 + np.count_nonzero(np.diff(valid)))
+        # Moments come from the values themselves so the exact profile stays exact
+        profile['mean'] = float(valid.mean())
+        profile['std'] = float(np.std(valid, ddof=1)) if count > 1 else float('nan')
+        profile['min'] = float(valid[0])
+        for q in QUANTILES:
+            profile[f'{int(q * 100)}%'] = _sorted_quantile(valid, q)
+        profile['max'] = float(valid[-1])
+        profile['histogram'] = _histogram(valid)
+    else:
+        if column_stats and 'null_count' in column_stats:
+            profile['null_count'] = int(column_stats['null_count'])
+        else:
+            profile['null_count'] = int(series.isna().sum())
+        profile['count'] = int(len(series) - profile['null_count'])
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            profile['nunique'] = int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+        else:
+            profile['nunique'] = int(series.nunique())
+
+    return profile
+
+
+def profile_column_approximate(series, column_stats=None):
+    """
+    Profile one column with sketches instead of sorting or exact hashing
+
+    Distinct counts come from a HyperLogLog and quartiles from a sampled
+    quantile sketch; null counts, moments and min/max stay exact since
+    they are cheap linear reductions.
+    """
+    is_numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+    is_categorical = series.dtype == object or isinstance(series.dtype, pd.CategoricalDtype)
+    profile = {
+        'dtype': str(series.dtype),
+        'is_numeric': bool(is_numeric),
+        'is_categorical': bool(is_categorical),
+        'approximate': []
+    }
+
+    if series.dtype == object and len(series) > Config.APPROX_QUANTILE_SAMPLE_SIZE:
+        # Measuring every Python object is slow: extrapolate from a sample
+        sample = series.sample(Config.APPROX_QUANTILE_SAMPLE_SIZE, random_state=42)
+        per_value = sample.memory_usage(deep=True, index=False) / len(sample)
+        profile['memory_bytes'] = int(per_value * len(series))
+        profile['approximate'].append('memory_bytes')
+    else:
+        profile['memory_bytes'] = int(series.memory_usage(deep=True, index=False))
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Category codes give an exact distinct count at no extra cost
+        codes = series.cat.codes.to_numpy()
+        profile['null_count'] = int(np.count_nonzero(codes < 0))
+        profile['count'] = int(len(codes) - profile['null_count'])
+        profile['nunique'] = int(np.count_nonzero(np.bincount(codes[codes >= 0], minlength=1)))
+        return profile
+
+    valid = series.dropna()
+    profile['null_count'] = int(len(series) - len(valid))
+    profile['count'] = int(len(valid))
+    profile['nunique'] = HyperLogLog().add_hashes(hash_values(valid)).count() if len(valid) else 0
+    profile['approximate'].append('nunique')
+
+    if is_numeric and len(valid):
+        values = valid.to_numpy(dtype=np.float64)
+        if column_stats and 'mean' in column_stats:
+            profile['mean'] = float(column_stats['mean'])
+            profile['std'] = float(column_stats['std']) if len(values) > 1 else float('nan')
+        else:
+            profile['mean'] = float(values.mean())
+            profile['std'] = float(values.std(ddof=1)) if len(values) > 1 else float('nan')
+        sketch = QuantileSketch(size=Config.APPROX_QUANTILE_SAMPLE_SIZE).add(values)
+        profile['min'] = sketch.min
+        for q in QUANTILES:
+            profile[f'{int(q * 100)}%'] = sketch.quantile(q)
+        profile['max'] = sketch.max
+        profile['histogram'] = _histogram(values)
+        if sketch.rank_error() > 0:
+            profile['approximate'] += [f'{int(q * 100)}%' for q in QUANTILES]
+
+    return profile
+
+
+def profile_dataset(df, ingest_stats=None, max_workers=None, approximate=None, row_hashes=None):
+    """
+    Profile a whole dataset
+
+    Columns are profiled independently, across a thread pool for large
+    frames (NumPy sorting and pandas hashing release the GIL).
+    approximate: use sketches for distinct counts and quartiles;
+                 by default switched on for frames with at least
+                 Config.APPROX_PROFILE_MIN_ROWS rows
+    row_hashes: precomputed row hashes of df (see utils.row_hash), used for
+                the exact duplicate row count
+
+    Returns:
+        dict with row/column counts, duplicate rows, memory usage and a
+        per-column profile, in the form stored with each dataset
+    """
+    max_workers = max_workers or Config.PROFILE_MAX_WORKERS
+    column_stats = (ingest_stats or {}).get('columns', {})
+    if approximate is None:
+        approximate = len(df) >= Config.APPROX_PROFILE_MIN_ROWS
+    profile_fn = profile_column_approximate if approximate else profile_column
+
+    def run(col):
+        return profile_fn(df[col], column_stats.get(col))
+
+    if max_workers > 1 and df.size >= Config.PROFILE_PARALLEL_MIN_CELLS:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            column_profiles = list(pool.map(run, df.columns))
+    else:
+        column_profiles = [run(col) for col in df.columns]
+
+    columns = dict(zip(df.columns, column_profiles))
+    profile = {
+        'n_rows': int(len(df)),
+        'n_columns': int(df.shape[1]),
+        'memory_bytes': int(sum(p['memory_bytes'] for p in column_profiles) + df.index.memory_usage()),
+        'columns': columns
+    }
+
+    row_index = RowHashIndex.from_frame(df) if row_hashes is None else RowHashIndex(row_hashes)
+    profile['duplicate_rows'] = row_index.count_duplicates(df)
+    if not approximate:
+        return profile
+
+    profile['approximate'] = {
+        'columns': {col: p['approximate'] for col, p in columns.items() if p['approximate']},
+        'error_bounds': {
+            'nunique_relative_error': round(float(HyperLogLog().relative_error), 4),
+            'quantile_rank_error': round(QuantileSketch(size=Config.APPROX_QUANTILE_SAMPLE_SIZE).rank_error_for(len(df)), 4)
+        }
+    }
+    return profile
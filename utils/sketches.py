@@ -0,0 +1,142 @@
+"""
+Probabilistic sketches for SmartML Dashboard
+Approximate distinct counts and quantiles for very large datasets
+"""
+import numpy as np
+import pandas as pd
+
+
+def hash_values(values):
+    """Hash a Series, Index or DataFrame (row-wise) to 64-bit integers"""
+    # categorize=False hashes strings directly instead of factorizing them first,
+    # which is much faster for the high-cardinality columns sketches are used for
+    return pd.util.hash_pandas_object(values, index=False, categorize=False).to_numpy()
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter over 64-bit hashes
+
+    With 2**precision registers the relative standard error of the
+    estimate is about 1.04 / sqrt(2**precision) (0.8% for the default).
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(self.m)
+
+    def add_hashes(self, hashes):
+        """Add an array of uint64 hashes"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if len(hashes) == 0:
+            return self
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << width) - 1)
+        # frexp gives the exact bit length since remainder < 2**53
+        bit_length = np.frexp(remainder.astype(np.float64))[1]
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def add(self, values):
+        """Hash and add a Series of values (nulls are ignored)"""
+        values = values.dropna() if hasattr(values, 'dropna') else values
+        return self.add_hashes(hash_values(pd.Series(values)))
+
+    def merge(self, other):
+        """Combine with another sketch of the same precision"""
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """Estimated number of distinct values"""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * self.m and zeros > 0:
+            # Linear counting is more accurate for small cardinalities
+            estimate = self.m * np.log(self.m / zeros)
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch based on a uniform sample
+
+    At most `size` values are kept and they always form a uniform sample
+    (without replacement) of everything added; merging two samples draws
+    from each in proportion to how many values it stands for. By the DKW
+    inequality the rank error of any quantile is at most
+    sqrt(ln(2 / delta) / (2 * size)) with probability 1 - delta.
+    """
+
+    def __init__(self, size=100000, seed=42):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.values = np.empty(0, dtype=np.float64)
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def rank_error(self, delta=0.01):
+        """Bound on the quantile rank error holding with probability 1 - delta"""
+        return self.rank_error_for(self.n, delta)
+
+    def rank_error_for(self, n, delta=0.01):
+        """Rank error bound after adding n values"""
+        if n <= self.size:
+            return 0.0
+        return float(np.sqrt(np.log(2 / delta) / (2 * self.size)))
+
+    def _subsample(self, values, k):
+        if len(values) <= k:
+            return values
+        return values[self.rng.choice(len(values), k, replace=False)]
+
+    def _merge_sample(self, values, n):
+        """Merge a uniform sample standing for n values into this sketch"""
+        total = self.n + n
+        if len(self.values) + len(values) <= self.size:
+            self.values = np.concatenate([self.values, values])
+        else:
+            # Number of kept values coming from the existing side
+            k_self = int(self.rng.hypergeometric(self.n, n, self.size))
+            k_self = min(k_self, len(self.values))
+            k_other = min(self.size - k_self, len(values))
+            self.values = np.concatenate([self._subsample(self.values, k_self),
+                                          self._subsample(values, k_other)])
+        self.n = total
+
+    def add(self, values):
+        """Add an array of numeric values (NaNs are ignored)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._merge_sample(self._subsample(values, self.size), len(values))
+        return self
+
+    def merge(self, other):
+        """Combine with another sketch"""
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._merge_sample(other.values, other.n)
+        return self
+
+    def quantile(self, q):
+        """Estimated q-quantile (exact when fewer than `size` values were added)"""
+        if len(self.values) == 0:
+            return float('nan')
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        return float(np.quantile(self.values, q))